@@ -0,0 +1,235 @@
+"""
+Benchmark do cliente da API do YouTube: googleapiclient x cliente assíncrono (AsyncYouTubeClient).
+
+Os dois clientes recebem as mesmas respostas prontas (geradas pelo
+FakeYouTubeService e servidas sem rede), de modo que a medição isola o custo
+de cada cliente: montar a requisição, ler o JSON e entregar o resultado. Para
+cada endpoint são medidos o tempo de CPU e o tempo decorrido por chamada, e
+para a página de uploads (playlistItems.list com 50 itens) a memória
+retida por página, em dicionários aninhados (googleapiclient) e em registros
+(UploadsPage). Também mede o tempo de importação de cada cliente em um
+processo novo.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.client
+    python -m benchmarks.client --calls 5000 --json
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+import httplib2
+
+from src.api_client import ENDPOINT_PATHS, AsyncYouTubeClient, ClientLoop
+from src.discovery import load_discovery_document
+from src.fields import shape_request
+from src.records import UploadsPage
+
+from .fakes import FakeYouTubeService
+
+# Importação de cada cliente, medida em um processo novo
+IMPORTS = {
+    'googleapiclient': 'import googleapiclient.discovery',
+    'async': 'import aiohttp, src.api_client',
+}
+
+def sample_requests(service, page_size):
+    """Parâmetros de uma chamada típica da varredura para cada endpoint"""
+    channel_ids = [service.channel_id(index) for index in range(page_size)]
+    video_ids = [video['id'] for video in service.uploads[channel_ids[0]][:page_size]]
+    return {
+        'channels.list': {'id': ','.join(channel_ids)},
+        'playlistItems.list': {'playlistId': f"UU{channel_ids[0][2:]}", 'maxResults': page_size},
+        'videos.list': {'id': ','.join(video_ids)},
+        'search.list': {'q': 'canal1', 'type': 'channel', 'maxResults': 1},
+    }
+
+class CannedHttp:
+    """Transporte httplib2 do googleapiclient que devolve a resposta pronta do endpoint"""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def request(self, uri, method='GET', body=None, headers=None, **_):
+        path = urlparse(uri).path.rstrip('/').rsplit('/', 1)[-1]
+        return httplib2.Response({'status': '200', 'content-type': 'application/json'}), self.bodies[path]
+
+class CannedSession:
+    """ClientSession do aiohttp que devolve a resposta pronta do endpoint"""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def get(self, url, params=None, headers=None):
+        return _CannedResponse(self.bodies[url.rstrip('/').rsplit('/', 1)[-1]])
+
+    async def close(self):
+        pass
+
+class _CannedResponse:
+    status = 200
+    reason = 'OK'
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, body):
+        self._body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+    async def read(self):
+        return self._body
+
+def _measure(call, calls):
+    """Tempo de CPU e tempo decorrido médios de uma chamada, em microssegundos"""
+    call()
+    gc.collect()
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(calls):
+        call()
+    return {
+        'cpu_us': (time.process_time() - cpu_started) / calls * 1e6,
+        'wall_us': (time.perf_counter() - wall_started) / calls * 1e6,
+    }
+
+def _retained_bytes(build, pages):
+    """Memória retida por página, mantendo pages páginas vivas ao mesmo tempo"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(pages)]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return retained / pages
+
+def import_seconds(client):
+    """Tempo de importação do cliente em um processo novo (None se a biblioteca não estiver instalada)"""
+    code = f"import time; started = time.perf_counter(); {IMPORTS[client]}; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+def run(options):
+    service = FakeYouTubeService(options.page_size, uploads_per_channel=options.page_size, seed=options.seed)
+    requests = {
+        endpoint: shape_request(endpoint, params)
+        for endpoint, params in sample_requests(service, options.page_size).items()
+    }
+    bodies = {
+        ENDPOINT_PATHS[endpoint]: json.dumps(service._handlers[endpoint](**params)).encode('utf-8')
+        for endpoint, params in requests.items()
+    }
+
+    from googleapiclient.discovery import build_from_document
+    started = time.perf_counter()
+    google_client = build_from_document(load_discovery_document(), developerKey='benchmark', http=CannedHttp(bodies))
+    google_build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    client_loop = ClientLoop(AsyncYouTubeClient(session=CannedSession(bodies)))
+    async_build = time.perf_counter() - started
+
+    def google_call(endpoint):
+        resource = getattr(google_client, endpoint.split('.')[0])()
+        return lambda: resource.list(**requests[endpoint]).execute()
+
+    def async_call(endpoint):
+        return lambda: client_loop.list(endpoint, requests[endpoint], api_key='benchmark')
+
+    results = []
+    try:
+        for endpoint in requests:
+            google = _measure(google_call(endpoint), options.calls)
+            native = _measure(async_call(endpoint), options.calls)
+            results.append({
+                'endpoint': endpoint,
+                'googleapiclient_cpu_us': google['cpu_us'],
+                'async_cpu_us': native['cpu_us'],
+                'googleapiclient_wall_us': google['wall_us'],
+                'async_wall_us': native['wall_us'],
+            })
+
+        # Antes, a varredura guardava a resposta inteira; agora guarda a UploadsPage
+        uploads = async_call('playlistItems.list')
+        memory = {
+            'page_size': options.page_size,
+            'dict_bytes': _retained_bytes(google_call('playlistItems.list'), options.pages),
+            'record_bytes': _retained_bytes(lambda: UploadsPage.from_api(uploads()), options.pages),
+        }
+    finally:
+        client_loop.close()
+
+    return {
+        'calls': results,
+        'memory': memory,
+        'build_seconds': {'googleapiclient': google_build, 'async': async_build},
+        'import_seconds': {client: import_seconds(client) for client in IMPORTS} if options.imports else None,
+    }
+
+def _format(value, unit=''):
+    return '-' if value is None else f"{value:.1f}{unit}"
+
+def print_report(report):
+    header = ('endpoint', 'CPU google', 'CPU async', 'tempo google', 'tempo async', 'redução CPU')
+    rows = [header]
+    for result in report['calls']:
+        reduction = 1 - result['async_cpu_us'] / result['googleapiclient_cpu_us']
+        rows.append((
+            result['endpoint'],
+            _format(result['googleapiclient_cpu_us'], 'µs'),
+            _format(result['async_cpu_us'], 'µs'),
+            _format(result['googleapiclient_wall_us'], 'µs'),
+            _format(result['async_wall_us'], 'µs'),
+            f"{reduction * 100:.0f}%",
+        ))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    for row in rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+    memory = report['memory']
+    print()
+    print(f"Página de uploads ({memory['page_size']} itens): "
+          f"{memory['dict_bytes'] / 1024:.1f}KB em dicionários, {memory['record_bytes'] / 1024:.1f}KB em registros "
+          f"({(1 - memory['record_bytes'] / memory['dict_bytes']) * 100:.0f}% menos)")
+    build = report['build_seconds']
+    print(f"Criação do cliente: googleapiclient {build['googleapiclient'] * 1000:.1f}ms, "
+          f"async {build['async'] * 1000:.1f}ms")
+    if report['import_seconds']:
+        imports = {client: seconds and seconds * 1000 for client, seconds in report['import_seconds'].items()}
+        print(f"Importação: googleapiclient {_format(imports['googleapiclient'], 'ms')}, "
+              f"async {_format(imports['async'], 'ms')}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do cliente da API do YouTube (googleapiclient x assíncrono)")
+    parser.add_argument('--calls', type=int, default=2000, help="chamadas medidas por endpoint e cliente (padrão: 2000)")
+    parser.add_argument('--page-size', type=int, default=50,
+                        help="itens por resposta: canais, uploads e vídeos (padrão: 50, o máximo da API)")
+    parser.add_argument('--pages', type=int, default=200,
+                        help="páginas de uploads mantidas vivas na medição de memória (padrão: 200)")
+    parser.add_argument('--no-imports', dest='imports', action='store_false',
+                        help="não mede o tempo de importação dos clientes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="imprime os resultados em JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    report = run(options)
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from src.quota import ENDPOINT_COSTS
+
+def _timestamp(moment):
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class FakeYouTubeService:
+    """Substituto local da API de Dados do YouTube, no formato dos objetos do googleapiclient.
+
+    Atende channels, playlistItems, videos e search com dados sintéticos,
+    com latência, taxa de erros e cota diária configuráveis, e conta as
+    chamadas e as unidades de cota gastas em cada endpoint. Pode ser usado no
+    lugar do cliente criado por YouTubeAPI._build_client; client(chave)
+    devolve um cliente cuja cota diária é contada separadamente por chave.
+    FakeClientSession atende o cliente assíncrono (AsyncYouTubeClient) com
+    os mesmos dados.
+    """
+
+    def __init__(self, channel_count, uploads_per_channel=60, latency=0.0, error_rate=0.0, daily_quota=None,
+                 shorts_ratio=0.1, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.daily_quota = daily_quota
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.units = 0
+        self.key_units = {}
+        self.errors = 0
+        self.upload_times = {}  # ID do vídeo -> horário (time.time) da publicação sintética
+        self.shorts_ratio = shorts_ratio
+        self._video_count = 0
+        self._handlers = {
+            'channels.list': self._channels_list,
+            'playlistItems.list': self._playlist_items_list,
+            'videos.list': self._videos_list,
+            'search.list': self._search_list,
+        }
+
+        # ID do canal -> uploads do mais novo para o mais antigo
+        now = datetime.now(timezone.utc)
+        self.uploads = {}
+        self.handles = {}
+        self.durations = {}
+        for index in range(channel_count):
+            channel_id = self.channel_id(index)
+            self.handles[f'canal{index}'] = channel_id
+            self.uploads[channel_id] = [
+                self._video(now - timedelta(hours=6 * (position + 1)))
+                for position in range(uploads_per_channel)
+            ]
+
+    @staticmethod
+    def channel_id(index):
+        return f"UC{index:022d}"
+
+    def _video(self, published):
+        self._video_count += 1
+        video_id = f"v{self._video_count:010d}"
+        self.durations[video_id] = 45 if self._random.random() < self.shorts_ratio else 600
+        return {'id': video_id, 'title': f"Vídeo {video_id}", 'publishedAt': _timestamp(published)}
+
+    def upload(self, channel_id):
+        """Publica um vídeo novo no canal; retorna o ID do vídeo"""
+        video = self._video(datetime.now(timezone.utc))
+        with self._lock:
+            self.uploads[channel_id].insert(0, video)
+            self.upload_times[video['id']] = time.time()
+        return video['id']
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = {}
+            self.units = 0
+            self.errors = 0
+
+    def client(self, key):
+        """Cliente que usa a chave informada (a cota diária vale por chave)"""
+        return _FakeClient(self, key)
+
+    # Recursos no formato do googleapiclient: service.channels().list(...).execute()
+    def channels(self):
+        return _FakeClient(self, None).channels()
+
+    def playlistItems(self):
+        return _FakeClient(self, None).playlistItems()
+
+    def videos(self):
+        return _FakeClient(self, None).videos()
+
+    def search(self):
+        return _FakeClient(self, None).search()
+
+    def _execute(self, key, endpoint, params):
+        if self.latency:
+            time.sleep(self.latency)
+        self._account(key, endpoint)
+        return self._handlers[endpoint](**params)
+
+    async def _execute_async(self, key, endpoint, params):
+        """Atende uma chamada do cliente assíncrono sem bloquear o event loop durante a latência"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._account(key, endpoint)
+        return self._handlers[endpoint](**params)
+
+    def _account(self, key, endpoint):
+        """Conta a chamada e a cota da chave, e sorteia as falhas"""
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            units = ENDPOINT_COSTS.get(endpoint, 1)
+            if self.daily_quota is not None and self.key_units.get(key, 0) + units > self.daily_quota:
+                self.errors += 1
+                raise _http_error(403, 'quotaExceeded')
+            self.units += units
+            self.key_units[key] = self.key_units.get(key, 0) + units
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                raise _http_error(500, 'backendError')
+
+    def _channels_list(self, id, **_):
+        items = []
+        for channel_id in id.split(','):
+            if channel_id not in self.uploads:
+                continue
+            items.append({
+                'id': channel_id,
+                'snippet': {
+                    'title': f"Canal {channel_id[-6:]}",
+                    'thumbnails': {'default': {'url': f"https://yt3.example/{channel_id}.jpg"}}
+                },
+                'contentDetails': {'relatedPlaylists': {'uploads': f"UU{channel_id[2:]}"}}
+            })
+        return {'items': items}
+
+    def _playlist_items_list(self, playlistId, maxResults=50, pageToken=None, **_):
+        with self._lock:
+            uploads = list(self.uploads.get(f"UC{playlistId[2:]}", []))
+        start = int(pageToken or 0)
+        page = uploads[start:start + maxResults]
+        response = {'items': [
+            {'snippet': {
+                'publishedAt': video['publishedAt'],
+                'title': video['title'],
+                'resourceId': {'videoId': video['id']},
+                'thumbnails': {'high': {'url': f"https://i.ytimg.com/vi/{video['id']}/hqdefault.jpg"}}
+            }}
+            for video in page
+        ]}
+        if start + maxResults < len(uploads):
+            response['nextPageToken'] = str(start + maxResults)
+        return response
+
+    def _videos_list(self, id, **_):
+        return {'items': [
+            {'id': video_id, 'contentDetails': {'duration': f"PT{self.durations[video_id]}S"}}
+            for video_id in id.split(',') if video_id in self.durations
+        ]}
+
+    def _search_list(self, q, **_):
+        channel_id = self.handles.get(q)
+        return {'items': [{'id': {'channelId': channel_id}}] if channel_id else []}
+
+class _FakeClient:
+    def __init__(self, service, key):
+        self.service = service
+        self.key = key
+
+    def channels(self):
+        return _FakeResource(self, 'channels.list')
+
+    def playlistItems(self):
+        return _FakeResource(self, 'playlistItems.list')
+
+    def videos(self):
+        return _FakeResource(self, 'videos.list')
+
+    def search(self):
+        return _FakeResource(self, 'search.list')
+
+class _FakeResource:
+    def __init__(self, client, endpoint):
+        self.client = client
+        self.endpoint = endpoint
+
+    def list(self, **params):
+        return _FakeRequest(self.client, self.endpoint, params)
+
+class _FakeRequest:
+    def __init__(self, client, endpoint, params):
+        self.client = client
+        self.endpoint = endpoint
+        self.params = params
+
+    def execute(self):
+        return self.client.service._execute(self.client.key, self.endpoint, self.params)
+
+class FakeClientSession:
+    """Substituto da ClientSession do aiohttp que responde pelo FakeYouTubeService.
+
+    Passado para AsyncYouTubeClient(session=...), faz o cliente assíncrono
+    real montar as requisições e ler as respostas em JSON (e os erros HTTP)
+    sem acessar a rede.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, url, params=None, headers=None):
+        return _FakeHTTPResponse(self.service, url, dict(params or {}))
+
+    async def close(self):
+        pass
+
+class _FakeHTTPResponse:
+    def __init__(self, service, url, params):
+        self.service = service
+        self.url = url
+        self.params = params
+        self.status = 200
+        self.reason = 'OK'
+        self.headers = {'Content-Type': 'application/json'}
+        self._body = b''
+
+    async def __aenter__(self):
+        key = self.params.pop('key', None)
+        for name in ('part', 'fields'):
+            self.params.pop(name, None)
+        if 'maxResults' in self.params:
+            self.params['maxResults'] = int(self.params['maxResults'])
+        endpoint = f"{self.url.rstrip('/').rsplit('/', 1)[-1]}.list"
+        try:
+            self._body = json.dumps(await self.service._execute_async(key, endpoint, self.params)).encode('utf-8')
+        except HttpError as e:
+            self.status = int(e.resp.status)
+            self.reason = e.resp.reason
+            self._body = e.content
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+    async def read(self):
+        return self._body
+
+def _http_error(status, reason):
+    content = json.dumps({'error': {'code': status, 'errors': [{'reason': reason}]}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status, 'reason': reason}), content)
+
+class FakeDiscordSink:
+    """Substituto dos canais do Discord para a fila de despacho.
+
+    get_channel(id) devolve um canal falso cujo send() apenas registra os
+    embeds, com latência e taxa de erros configuráveis. A latência de cada
+    notificação é medida da publicação sintética do vídeo até o envio.
+    """
+
+    def __init__(self, upload_times, latency=0.0, error_rate=0.0, seed=0):
+        self.upload_times = upload_times
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.messages = 0
+        self.embeds = 0
+        self.latencies = []
+        self._channels = {}
+
+    def get_channel(self, channel_id):
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _FakeChannel(self, channel_id)
+        return channel
+
+    async def _send(self, embeds):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise OSError("Falha simulada de envio ao Discord")
+
+        now = time.time()
+        self.messages += 1
+        self.embeds += len(embeds)
+        for embed in embeds:
+            video_id = (embed.url or '').rsplit('v=', 1)[-1]
+            if video_id in self.upload_times:
+                self.latencies.append(now - self.upload_times[video_id])
+
+class _FakeChannel:
+    def __init__(self, sink, channel_id):
+        self.sink = sink
+        self.id = channel_id
+
+    async def send(self, embeds=None, **_):
+        await self.sink._send(embeds or [])
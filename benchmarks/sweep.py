@@ -0,0 +1,287 @@
+"""
+Benchmark da verificação de canais (ChannelPoller) com a API do YouTube e o Discord simulados.
+
+Cada frota (quantidade de servidores) roda em um processo próprio, com um
+banco SQLite temporário, e mede o tempo de cada varredura, as chamadas à API,
+as unidades de cota, o pico de memória (RSS) e a latência das notificações,
+da publicação do vídeo até o envio ao Discord.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.sweep --fleet 10 1000 100000
+    python -m benchmarks.sweep --fleet 1000 --json > baseline.json
+    python -m benchmarks.sweep --fleet 1000 --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Métricas comparadas com o baseline: maior é pior em todas
+GATED_METRICS = ('sweep_seconds', 'api_calls', 'quota_units', 'peak_rss_mb', 'latency_p99')
+
+def percentile(values, fraction):
+    """Percentil pelo método do posto mais próximo"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em kilobytes no Linux
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+def run_fleet(guilds, options):
+    """Executa o benchmark de uma frota (no processo filho) e retorna as métricas"""
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({
+            'STORAGE_BACKEND': 'sqlite',
+            'STORAGE_PATH': os.path.join(directory, 'benchmark.db'),
+            'YOUTUBE_API_KEYS': ','.join(f'benchmark{index}' for index in range(options.keys)),
+            'DETECTION_BACKEND': 'api',
+            'YOUTUBE_DAILY_QUOTA': str(options.quota or 10 ** 12),
+            'YOUTUBE_API_CLIENT': options.client,
+            'SWEEP_CONCURRENCY': str(options.concurrency),
+            'PAYLOAD_MEASURE': '0',
+        })
+        from src.logs import setup_logging
+        setup_logging(level='INFO' if options.verbose else 'CRITICAL')
+        return asyncio.run(_run_fleet(guilds, options))
+
+async def _run_fleet(guilds, options):
+    # Importados aqui para que as variáveis de ambiente acima já valham
+    from src.storage import get_storage
+    from src.config import Config
+    from src.youtube_api import YouTubeAPI
+    from src.api_client import AsyncYouTubeClient, ClientLoop
+    from src.poller import ChannelPoller
+    from src.dispatch import DispatchQueue
+    from src.utils import create_video_embed
+    from .fakes import FakeYouTubeService, FakeDiscordSink, FakeClientSession
+
+    rng = random.Random(options.seed)
+    channel_count = max(1, round(guilds * options.channel_ratio))
+    setup_started = time.perf_counter()
+
+    service = FakeYouTubeService(
+        channel_count,
+        latency=options.api_latency / 1000,
+        error_rate=options.api_error_rate,
+        daily_quota=options.quota,
+        seed=options.seed
+    )
+    sink = FakeDiscordSink(
+        service.upload_times,
+        latency=options.discord_latency / 1000,
+        error_rate=options.discord_error_rate,
+        seed=options.seed
+    )
+
+    class BenchmarkYouTubeAPI(YouTubeAPI):
+        def _build_client(self, credential):
+            return service.client(credential.api_key)
+
+        def _build_client_loop(self):
+            return ClientLoop(AsyncYouTubeClient(session=FakeClientSession(service)))
+
+    storage = get_storage()
+    config = Config(storage)
+    with storage.batch():
+        for index in range(guilds):
+            channel_index = index % channel_count
+            if rng.random() < options.handle_ratio:
+                channel_url = f"https://www.youtube.com/@canal{channel_index}"
+            else:
+                channel_url = f"https://www.youtube.com/channel/{service.channel_id(channel_index)}"
+            config.save_server_config(str(index), {
+                'notification_channel': 10 ** 9 + index,
+                'youtube_channel_url': channel_url,
+                'include_shorts': rng.random() < options.shorts_guilds
+            })
+
+    dispatcher = DispatchQueue(
+        sink.get_channel,
+        workers=options.dispatch_workers,
+        global_rate=10 ** 9,
+        channel_rate=10 ** 9,
+        channel_burst=10 ** 9,
+        max_retries=3
+    )
+
+    async def notify(subscribers, videos, detected_at):
+        for subscriber in subscribers:
+            embeds = [
+                create_video_embed(channel_info)
+                for channel_info in videos.get(subscriber.include_shorts, [])
+                if channel_info
+            ]
+            dispatcher.enqueue(subscriber.notification_channel, embeds, detected_at=detected_at)
+
+    poller = ChannelPoller(notify, storage=storage, config=config, youtube=BenchmarkYouTubeAPI(storage=storage))
+    # Canais novos entram na agenda já vencidos, em vez de espalhados ao longo de POLL_MIN_INTERVAL
+    poller.scheduler.min_interval = 0
+    setup_seconds = time.perf_counter() - setup_started
+
+    dispatcher.start()
+    sweeps = []
+    channel_ids = [service.channel_id(index) for index in range(channel_count)]
+    try:
+        # A varredura 0 é a primeira verificação de todos os canais (resolução, metadados, watermarks)
+        for number in range(options.sweeps + 1):
+            if number:
+                for channel_id in rng.sample(channel_ids, math.ceil(channel_count * options.upload_ratio)):
+                    service.upload(channel_id)
+                # Todos os canais vencem a cada varredura, independentemente do intervalo aprendido
+                for channel_id in poller.scheduler.snapshot()['due']:
+                    poller.scheduler.reschedule(channel_id, delay=0)
+
+            service.reset_counters()
+            embeds_before = sink.embeds
+            started = time.perf_counter()
+            await poller.tick()
+            sweep_seconds = time.perf_counter() - started
+            while not dispatcher.idle():
+                await asyncio.sleep(0.005)
+
+            sweeps.append({
+                'sweep': number,
+                'sweep_seconds': sweep_seconds,
+                'end_to_end_seconds': time.perf_counter() - started,
+                'api_calls': sum(service.calls.values()),
+                'api_calls_by_endpoint': dict(service.calls),
+                'quota_units': service.units,
+                'api_errors': service.errors,
+                'notifications': sink.embeds - embeds_before,
+            })
+    finally:
+        await dispatcher.stop()
+        poller.close()
+        storage.close()
+
+    steady = sweeps[1:] or sweeps
+    return {
+        'guilds': guilds,
+        'channels': channel_count,
+        'setup_seconds': setup_seconds,
+        'cold_sweep_seconds': sweeps[0]['sweep_seconds'],
+        'sweep_seconds': statistics.median(sweep['sweep_seconds'] for sweep in steady),
+        'end_to_end_seconds': statistics.median(sweep['end_to_end_seconds'] for sweep in steady),
+        'api_calls': statistics.mean(sweep['api_calls'] for sweep in steady),
+        'quota_units': statistics.mean(sweep['quota_units'] for sweep in steady),
+        'notifications': sum(sweep['notifications'] for sweep in steady),
+        'peak_rss_mb': peak_rss_mb(),
+        'latency_p50': percentile(sink.latencies, 0.50),
+        'latency_p90': percentile(sink.latencies, 0.90),
+        'latency_p99': percentile(sink.latencies, 0.99),
+        'latency_max': max(sink.latencies) if sink.latencies else None,
+        'sweeps': sweeps,
+    }
+
+def _format(value, unit=''):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.3f}{unit}"
+    return f"{value}{unit}"
+
+def print_report(results):
+    columns = [
+        ('servidores', 'guilds', ''), ('canais', 'channels', ''),
+        ('varredura fria', 'cold_sweep_seconds', 's'), ('varredura', 'sweep_seconds', 's'),
+        ('até o envio', 'end_to_end_seconds', 's'), ('chamadas', 'api_calls', ''),
+        ('cota', 'quota_units', ''), ('RSS', 'peak_rss_mb', 'MB'),
+        ('lat. p50', 'latency_p50', 's'), ('lat. p90', 'latency_p90', 's'), ('lat. p99', 'latency_p99', 's'),
+    ]
+    rows = [[title for title, _, _ in columns]]
+    for result in results:
+        rows.append([_format(result[key], unit) for _, key, unit in columns])
+    widths = [max(len(row[column]) for row in rows) for column in range(len(columns))]
+    for row in rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+def compare(results, baseline, tolerance):
+    """Compara as métricas com o baseline; retorna a lista de regressões encontradas"""
+    previous = {result['guilds']: result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = previous.get(result['guilds'])
+        if reference is None:
+            continue
+        for metric in GATED_METRICS:
+            current, before = result.get(metric), reference.get(metric)
+            if current is None or not before:
+                continue
+            if current > before * (1 + tolerance):
+                regressions.append(
+                    f"{result['guilds']} servidores: {metric} subiu de {before:.3f} para {current:.3f} "
+                    f"({(current / before - 1) * 100:+.0f}%)"
+                )
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da verificação de canais com serviços simulados")
+    parser.add_argument('--fleet', type=int, nargs='+', default=[10, 100, 1000],
+                        help="quantidades de servidores a medir (padrão: 10 100 1000)")
+    parser.add_argument('--channel-ratio', type=float, default=0.8,
+                        help="canais do YouTube por servidor; servidores excedentes repetem canais (padrão: 0.8)")
+    parser.add_argument('--sweeps', type=int, default=3, help="varreduras medidas após a primeira (padrão: 3)")
+    parser.add_argument('--upload-ratio', type=float, default=0.1,
+                        help="fração dos canais que publica um vídeo antes de cada varredura (padrão: 0.1)")
+    parser.add_argument('--handle-ratio', type=float, default=0.0,
+                        help="fração dos servidores configurados com URL @canal, que exige search.list (padrão: 0)")
+    parser.add_argument('--shorts-guilds', type=float, default=0.3,
+                        help="fração dos servidores que recebem shorts (padrão: 0.3)")
+    parser.add_argument('--api-latency', type=float, default=20, help="latência de cada chamada à API, em ms (padrão: 20)")
+    parser.add_argument('--api-error-rate', type=float, default=0.0, help="fração das chamadas que falham com 500")
+    parser.add_argument('--quota', type=int, default=None,
+                        help="cota diária de cada chave da API simulada, em unidades (padrão: ilimitada)")
+    parser.add_argument('--keys', type=int, default=1, help="chaves da API usadas pelo bot (padrão: 1)")
+    parser.add_argument('--client', choices=('async', 'googleapiclient'), default='googleapiclient',
+                        help="cliente da API do YouTube (YOUTUBE_API_CLIENT; padrão: googleapiclient)")
+    parser.add_argument('--discord-latency', type=float, default=0, help="latência de cada envio ao Discord, em ms")
+    parser.add_argument('--discord-error-rate', type=float, default=0.0, help="fração dos envios que falham")
+    parser.add_argument('--concurrency', type=int, default=8, help="SWEEP_CONCURRENCY usado na varredura (padrão: 8)")
+    parser.add_argument('--dispatch-workers', type=int, default=4, help="workers da fila de despacho (padrão: 4)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="imprime os resultados em JSON (formato do --baseline)")
+    parser.add_argument('--baseline', help="arquivo JSON de uma execução anterior; sai com código 1 se houver regressão")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="aumento tolerado em relação ao baseline antes de acusar regressão (padrão: 0.2)")
+    parser.add_argument('--verbose', action='store_true', help="mostra as mensagens do bot durante as varreduras")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    results = []
+    for guilds in options.fleet:
+        # Um processo por frota, para que o pico de RSS e os singletons (armazenamento, transporte) não se misturem
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results.append(executor.submit(run_fleet, guilds, options).result())
+        if not options.json:
+            print(f"Frota de {guilds} servidores concluída", file=sys.stderr)
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        for regression in regressions:
+            print(f"Regressão: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -3,19 +3,49 @@ TubeBot de Notificação do YouTube
 Desenvolvido por Prolldevs - https://developers.prollabe.com
 """
 
+from src.startup import startup
+import logging
 import os
+import sys
 from dotenv import load_dotenv
-from src.bot import YouTubeBot
+from src.logs import setup_logging
 
 def main():
     # Carrega as variáveis de ambiente
     load_dotenv()
-    
+    setup_logging()
+    logger = logging.getLogger('tubebot')
+
+    # Modos: bot (padrão, detecção e Discord no mesmo processo), gateway (só Discord)
+    # e poller (só detecção, enviando os vídeos ao gateway)
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'bot'
+
+    # O canal entre pollers e gateway só é aberto com uma chave secreta
+    if mode in ('gateway', 'poller'):
+        from src.ipc import ipc_authkey
+        try:
+            ipc_authkey()
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
+    if mode == 'poller':
+        from src.poller import run_pollers
+        run_pollers()
+        return
+
+    from src.bot import YouTubeBot
+    from src.metrics import serve_metrics
+    startup.mark('imports')
+
     # Inicializa o bot
-    bot = YouTubeBot()
+    bot = YouTubeBot(mode=mode)
+    startup.mark('configuração')
+    logger.info(startup.report())
+    serve_metrics()
     
-    # Inicia o bot
-    bot.run(os.getenv('DISCORD_TOKEN'))
+    # Inicia o bot; o logging já foi configurado por setup_logging
+    bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
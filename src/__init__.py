@@ -1,6 +1,18 @@
-from .bot import YouTubeBot
-from .config import Config
-from .youtube import YouTubeScraper
-from .utils import create_embed
+import importlib
 
-__all__ = ['YouTubeBot', 'Config', 'YouTubeScraper', 'create_embed'] 
\ No newline at end of file
+# Os módulos são importados só quando usados: o modo poller não carrega o discord.py,
+# e o main.py consegue medir o tempo dos imports
+_exports = {
+    'YouTubeBot': '.bot',
+    'Config': '.config',
+    'YouTubeScraper': '.youtube',
+    'create_embed': '.utils',
+    'create_video_embed': '.utils',
+}
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_exports[name], __name__), name)
+
+__all__ = ['YouTubeBot', 'Config', 'YouTubeScraper', 'create_embed', 'create_video_embed']
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Mesma raiz do documento de descoberta, para que os dois clientes usem o mesmo host (e o mesmo HTTP_HOST_POOL_SIZES)
+API_HOST = 'youtube.googleapis.com'
+API_URL = f'https://{API_HOST}/youtube/v3/'
+
+# Caminho REST de cada endpoint da API de Dados usado pelo bot
+ENDPOINT_PATHS = {
+    'channels.list': 'channels',
+    'playlistItems.list': 'playlistItems',
+    'videos.list': 'videos',
+    'search.list': 'search',
+}
+
+class AsyncYouTubeClient:
+    """Cliente assíncrono mínimo da API de Dados do YouTube, sobre o aiohttp.
+
+    Substitui o googleapiclient nas chamadas da varredura: a URL de cada
+    endpoint é montada diretamente, sem o documento de descoberta nem os
+    objetos de requisição criados a cada list(), e a resposta JSON é
+    devolvida como veio. As conexões ficam em um pool keep-alive próprio,
+    dimensionado pela mesma configuração do HTTPTransport (HTTP_POOL_SIZE,
+    HTTP_HOST_POOL_SIZES e HTTP_TIMEOUT); o aiohttp só fala HTTP/1.1, então
+    HTTP2 não vale para este cliente.
+    Erros HTTP são levantados como HttpError, como no googleapiclient, para
+    que a cota, as novas tentativas e os circuitos funcionem da mesma forma.
+    """
+
+    def __init__(self, session=None, pool_size=None, timeout=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = session
+
+    def _pool_config(self):
+        """Tamanho do pool e timeout do transporte compartilhado, salvo quando informados no construtor"""
+        from .transport import get_transport
+        transport = get_transport()
+        if transport.http2:
+            logger.warning("HTTP2 não se aplica ao cliente assíncrono da API (aiohttp usa HTTP/1.1)")
+        pool_size = self.pool_size or transport.host_pool_sizes.get(API_HOST, transport.pool_size)
+        return pool_size, self.timeout or transport.timeout
+
+    def _get_session(self):
+        if self._session is None:
+            from aiohttp import ClientSession, ClientTimeout, TCPConnector
+            pool_size, timeout = self._pool_config()
+            self._session = ClientSession(
+                connector=TCPConnector(limit=pool_size, limit_per_host=pool_size, ttl_dns_cache=300),
+                timeout=ClientTimeout(total=timeout),
+                headers={'Accept-Encoding': 'gzip'}
+            )
+        return self._session
+
+    async def list(self, endpoint, params, api_key=None, headers=None):
+        """Executa o list() de um endpoint e retorna o JSON da resposta"""
+        url = API_URL + ENDPOINT_PATHS[endpoint]
+        query = {name: str(value) for name, value in params.items() if value is not None}
+        if api_key:
+            query['key'] = api_key
+
+        async with self._get_session().get(url, params=query, headers=headers) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise _http_error(response, body, url)
+        return json.loads(body)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+def _http_error(response, body, url):
+    """HttpError do googleapiclient para uma resposta de erro, com os cabeçalhos (Retry-After) preservados"""
+    # Importados aqui porque só são necessários quando a API responde com erro
+    import httplib2
+    from googleapiclient.errors import HttpError
+    info = {key.lower(): value for key, value in response.headers.items()}
+    info['status'] = str(response.status)
+    info['reason'] = response.reason or ''
+    return HttpError(httplib2.Response(info), body, uri=url)
+
+class ClientLoop:
+    """Event loop em uma thread própria, onde roda o cliente assíncrono.
+
+    Os workers da varredura são threads: cada chamada é entregue ao loop e o
+    worker espera o resultado, enquanto todas as requisições em andamento
+    compartilham o mesmo loop e o mesmo pool de conexões. O loop só é
+    criado na primeira chamada.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or AsyncYouTubeClient()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='tubebot-api-client', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coroutine):
+        """Executa a corrotina no loop do cliente e aguarda o resultado na thread atual"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._start()).result()
+
+    def list(self, endpoint, params, api_key=None, headers=None):
+        """Versão bloqueante de AsyncYouTubeClient.list, para os workers da varredura"""
+        return self.run(self.client.list(endpoint, params, api_key=api_key, headers=headers))
+
+    def close(self):
+        """Fecha as conexões e encerra o loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.client.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Erro ao fechar o cliente da API: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
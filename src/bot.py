@@ -1,96 +1,240 @@
+import asyncio
+import logging
+import os
 import discord
 from discord.ext import commands, tasks
 from .config import Config
+from .storage import get_storage
 from .youtube_api import YouTubeAPI
-from .utils import create_embed
+from .sweep import SweepEngine
+from .poller import ChannelPoller, POLL_TICK
+from .subscriptions import Subscriber
+from .websub import WebSubServer
+from .transport import get_transport
+from .dispatch import DispatchQueue
+from .cluster import Cluster
+from .ipc import EventListener
+from .utils import create_video_embed
+from .startup import startup
+from .snapshot import SnapshotStore, SNAPSHOT_INTERVAL
 
-class YouTubeBot(commands.Bot):
-    def __init__(self):
+logger = logging.getLogger(__name__)
+
+# Frequência de sincronização e renovação das inscrições WebSub no modo push
+WEBSUB_SYNC_INTERVAL = 3600
+
+# Frequência com que cada processo renova a sua presença no cluster
+CLUSTER_HEARTBEAT_INTERVAL = 10
+
+class YouTubeBot(commands.AutoShardedBot):
+    def __init__(self, mode='bot'):
         intents = discord.Intents.default()
         intents.message_content = True
-        super().__init__(command_prefix='!', intents=intents)
+
+        # Com SHARD_COUNT e SHARD_IDS, cada processo conecta apenas os shards (e servidores) indicados;
+        # sem eles, o discord.py usa a quantidade de shards recomendada pelo Discord
+        shard_options = {}
+        if os.getenv('SHARD_COUNT'):
+            shard_options['shard_count'] = int(os.getenv('SHARD_COUNT'))
+            if os.getenv('SHARD_IDS'):
+                shard_options['shard_ids'] = [int(shard_id) for shard_id in os.getenv('SHARD_IDS').split(',')]
+        super().__init__(command_prefix='!', intents=intents, **shard_options)
         
         # Inicializa componentes
-        self.config = Config()
-        self.youtube = YouTubeAPI()
+        self.storage = get_storage()
+        self.config = Config(self.storage)
+        self.dispatcher = DispatchQueue(self._notification_channel)
+
+        # No modo gateway a detecção roda nos processos poller (python main.py poller), que enviam
+        # os vídeos encontrados por um canal local; este processo só atende o Discord
+        if mode not in ('bot', 'gateway'):
+            raise ValueError(f"Modo inválido: {mode}. Use 'bot' ou 'gateway'")
+        self.mode = mode
+        self.ipc = None
+
+        # No modo cluster, vários processos dividem os canais do YouTube por hashing consistente
+        self.cluster = None
+        if mode == 'bot' and os.getenv('CLUSTER_ENABLED', '0').lower() in ('1', 'true', 'yes'):
+            self.cluster = Cluster(self.storage)
+
+        self.poller = None
+        if mode == 'bot':
+            self.poller = ChannelPoller(
+                self._notify_subscribers,
+                storage=self.storage,
+                config=self.config,
+                cluster=self.cluster
+            )
+            self.youtube = self.poller.youtube
+            self.sweeper = self.poller.sweeper
+        else:
+            # O gateway ainda consulta o YouTube na configuração de um servidor (!start)
+            self.youtube = YouTubeAPI(storage=self.storage)
+            self.sweeper = SweepEngine()
+
+        # No modo push os vídeos chegam pelo hub WebSub e o polling vira apenas uma reconciliação diária
+        self.detection_mode = os.getenv('DETECTION_MODE', 'poll').lower()
+        self.websub = None
+        if self.detection_mode == 'push':
+            if not self.poller or self.cluster:
+                raise ValueError("O modo push não pode ser usado com CLUSTER_ENABLED ou no modo gateway; use DETECTION_MODE=poll")
+            self.poller.scheduler.fixed_interval = self.poller.scheduler.max_interval
+            self.websub = WebSubServer(self._on_pushed_video, storage=self.storage)
+        elif self.detection_mode != 'poll':
+            raise ValueError(f"DETECTION_MODE inválido: {self.detection_mode}. Use 'poll' ou 'push'")
         self.temp_configs = {}
         self.setup_channels = {}  # Armazena os canais onde o bot foi configurado
         
+        # Retoma a agenda, as notificações pendentes e as configurações em andamento do último snapshot
+        self.snapshots = SnapshotStore(name=self.cluster.node_id if self.cluster else None)
+        self._restore_snapshot()
+
         # Carrega os comandos
         self.load_commands()
-        
-    @tasks.loop(seconds=14400)  # Verifica a cada 4 horas
+
+    @tasks.loop(seconds=POLL_TICK)
     async def check_new_videos(self):
-        for server_id, config in self.config.get_all_configs().items():
-            try:
-                # Primeiro tenta obter o vídeo mais recente
-                channel_info = self.youtube.get_channel_info(
-                    config['youtube_channel_url'],
-                    include_shorts=config.get('include_shorts', False)
-                )
+        # Uma exceção não tratada encerraria o tasks.loop de vez; o próximo ciclo tenta de novo
+        try:
+            await self.poller.tick()
+        except Exception as e:
+            logger.error(f"Erro no ciclo de verificação: {str(e)}")
 
-                # Se não houver vídeo novo ou se o vídeo já foi enviado, tenta obter um vídeo antigo
-                if not channel_info or (channel_info and channel_info.get('already_sent', False)):
-                    channel_info = self.youtube.get_old_video(
-                        config['youtube_channel_url'],
-                        include_shorts=config.get('include_shorts', False)
-                    )
+    def _snapshot_state(self):
+        state = {
+            'dispatch': self.dispatcher.snapshot(),
+            'temp_configs': {server_id: dict(config) for server_id, config in self.temp_configs.items()},
+            'setup_channels': dict(self.setup_channels)
+        }
+        if self.poller:
+            state['poller'] = self.poller.snapshot()
+        return state
 
-                if channel_info:  # Se encontrou qualquer vídeo (novo ou antigo)
-                    # Obtém o canal do Discord
-                    channel = self.get_channel(config['notification_channel'])
-                    if channel:
-                        # Define o título baseado se é um novo vídeo ou não
-                        status = "🎥 Novo Vídeo!" if channel_info.get('is_new_video', False) else "📺 Vídeo Anterior"
-                        
-                        # Cria o embed bonito
-                        embed = discord.Embed(
-                            url=channel_info['video_url'],
-                            color=discord.Color.red() if channel_info.get('is_new_video', False) else discord.Color.blue()
-                        )
-                        
-                        # Adiciona a thumbnail como imagem principal
-                        embed.set_image(url=channel_info['thumbnail_url'])
-                        
-                        # Adiciona o autor (canal do YouTube) com logo
-                        embed.set_author(
-                            name=channel_info['channel_name'],
-                            url=f"https://www.youtube.com/@{channel_info['channel_name'].replace(' ', '')}",
-                            icon_url=channel_info['channel_icon']
-                        )
-                        
-                        # Adiciona o título do vídeo com link
-                        embed.add_field(
-                            name="",
-                            value=f"[{channel_info['video_title']}]({channel_info['video_url']})",
-                            inline=False
-                        )
-                        
-                        # Adiciona informações do vídeo
-                        embed.add_field(
-                            name="",
-                            value=f"**{status}** • {channel_info['published_text']}",
-                            inline=False
-                        )
-                        
-                        # Adiciona o footer apenas com o ícone
-                        embed.set_footer(
-                            text="",
-                            icon_url="https://www.youtube.com/favicon.ico"
-                        )
-                        
-                        # Envia apenas o embed
-                        await channel.send(embed=embed)
-                        
+    def _restore_snapshot(self):
+        state = self.snapshots.load()
+        if not state:
+            return
+        try:
+            if self.poller:
+                self.poller.restore(state.get('poller', {}))
+            self.dispatcher.restore(state.get('dispatch', {}))
+            self.temp_configs.update(state.get('temp_configs', {}))
+            self.setup_channels.update(state.get('setup_channels', {}))
+            logger.info(f"Estado retomado do snapshot {self.snapshots.path}: "
+                  f"{len(self.poller.scheduler) if self.poller else 0} canais agendados, "
+                  f"{len(self.dispatcher)} notificações pendentes")
+        except Exception as e:
+            logger.error(f"Erro ao retomar o snapshot: {str(e)}")
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def save_snapshot(self):
+        """Grava periodicamente o estado em memória para uma reinicialização sem varredura completa"""
+        try:
+            await self.sweeper.run(self.snapshots.save, self._snapshot_state())
+        except Exception as e:
+            logger.error(f"Erro ao gravar o snapshot: {str(e)}")
+
+    def _notification_channel(self, channel_id):
+        """Canal do Discord para envio; canais de shards de outros processos são usados pela API REST"""
+        channel = self.get_channel(channel_id)
+        if channel is None and (self.cluster or self.mode == 'gateway'):
+            channel = self.get_partial_messageable(channel_id)
+        return channel
+
+    @tasks.loop(seconds=CLUSTER_HEARTBEAT_INTERVAL)
+    async def cluster_heartbeat(self):
+        """Renova a presença deste processo no cluster e atualiza a divisão dos canais"""
+        try:
+            await self.sweeper.run(self.cluster.heartbeat)
+        except Exception as e:
+            logger.error(f"Erro ao renovar a presença no cluster: {str(e)}")
+
+    def _on_poller_event(self, event):
+        """Recebe um evento de um processo poller (modo gateway)"""
+        if event.get('type') == 'videos':
+            subscribers = [Subscriber(*subscriber) for subscriber in event['subscribers']]
+            asyncio.ensure_future(
+                self._notify_subscribers(subscribers, dict(event['videos']), event.get('detected_at'))
+            )
+
+    @tasks.loop(seconds=WEBSUB_SYNC_INTERVAL)
+    async def sync_websub(self):
+        """Inscreve no hub os canais configurados e renova os leases perto de expirar"""
+        try:
+            index = self.poller.subscriptions.rebuild(self.config.get_all_configs())
+            await self.poller.resolve_channels(index)
+            await self.websub.sync(index.bind(self.poller.resolved_ids))
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar as inscrições WebSub: {str(e)}")
+
+    async def _on_pushed_video(self, video):
+        """Repassa um vídeo recebido pelo hub WebSub aos servidores inscritos no canal"""
+        subscribers = self.poller.subscriptions.subscribers(video.channel_id)
+        if not subscribers:
+            return
+
+        include_shorts_options = sorted({subscriber.include_shorts for subscriber in subscribers})
+        videos = await self.sweeper.run(self.youtube.get_pushed_video, video, include_shorts_options)
+        await self._notify_subscribers(subscribers, videos, video.received_at)
+
+    async def _notify_subscribers(self, subscribers, videos, detected_at=None):
+        """Enfileira as notificações de um canal para todos os servidores inscritos.
+
+        O envio fica a cargo da fila de despacho, então um canal lento ou
+        limitado pelo Discord não atrasa a verificação dos demais.
+        """
+        for subscriber in subscribers:
+            try:
+                embeds = [
+                    create_video_embed(channel_info)
+                    for channel_info in videos.get(subscriber.include_shorts, [])
+                    if channel_info  # Se encontrou qualquer vídeo (novo ou antigo)
+                ]
+                self.dispatcher.enqueue(subscriber.notification_channel, embeds, detected_at=detected_at)
             except Exception as e:
-                print(f"Erro ao verificar vídeos para o servidor {server_id}: {str(e)}")
-        
+                logger.error(f"Erro ao notificar o servidor {subscriber.server_id}: {str(e)}")
+
+    async def close(self):
+        """Encerra o bot e o pool de workers da varredura"""
+        if self.websub:
+            await self.websub.stop()
+        if self.ipc:
+            self.ipc.stop()
+        await self.dispatcher.stop()
+        self.save_snapshot.cancel()
+        try:
+            self.snapshots.save(self._snapshot_state())
+        except Exception as e:
+            logger.error(f"Erro ao gravar o snapshot: {str(e)}")
+        if self.cluster:
+            self.cluster.leave()
+        await super().close()
+        if self.poller:
+            self.poller.close()
+        else:
+            self.sweeper.shutdown()
+            get_transport().close()
+            self.youtube.close()
+        self.storage.close()
+
     def load_commands(self):
         """Carrega todos os comandos do bot"""
         @self.event
         async def on_ready():
-            print(f'{self.user} está online!')
-            self.check_new_videos.start()
+            logger.info(f'{self.user} está online! ({startup.elapsed():.2f}s desde o início)')
+            self.dispatcher.start()
+            if not self.save_snapshot.is_running():
+                self.save_snapshot.start()
+            if self.cluster and not self.cluster_heartbeat.is_running():
+                self.cluster_heartbeat.start()
+            if self.poller and not self.check_new_videos.is_running():
+                self.check_new_videos.start()
+            if self.mode == 'gateway' and not self.ipc:
+                self.ipc = EventListener(self._on_poller_event, asyncio.get_running_loop())
+                self.ipc.start()
+            if self.websub and not self.sync_websub.is_running():
+                await self.websub.start()
+                self.sync_websub.start()
             
         @self.command(name='start')
         async def start(ctx):
@@ -210,7 +354,7 @@ class YouTubeBot(commands.Bot):
                     # Verifica se é uma URL do YouTube
                     if "youtube.com" in message.content or "youtu.be" in message.content:
                         channel_url = message.content.strip()
-                        channel_info = self.youtube.get_channel_info(channel_url)
+                        channel_info = await self.sweeper.run(self.youtube.get_channel_info, channel_url)
                         
                         if channel_info:
                             config['youtube_channel_url'] = channel_url
@@ -262,6 +406,10 @@ class YouTubeBot(commands.Bot):
                         
                         # Remove a configuração temporária
                         del self.temp_configs[server_id]
+
+                        # No modo push, inscreve o novo canal no hub imediatamente
+                        if self.websub:
+                            await self.sync_websub()
                         
                         embed = discord.Embed(
                             title="🎉 Configuração Concluída!",
@@ -295,59 +443,18 @@ class YouTubeBot(commands.Bot):
                         
                         await message.channel.send(embed=embed)
 
-                        # Faz uma verificação imediata após a configuração
+                        # Mostra o último vídeo do canal se ele já foi enviado a outros servidores; senão
+                        # a primeira verificação do poller responsável pelo canal o envia
                         try:
-                            channel_info = self.youtube.get_channel_info(
+                            channel_info = await self.sweeper.run(
+                                self.youtube.get_channel_info,
                                 config['youtube_channel_url'],
                                 include_shorts=config['include_shorts']
                             )
-                            if channel_info:  # Se encontrou qualquer vídeo (novo ou antigo)
-                                # Obtém o canal do Discord
-                                channel = self.get_channel(config['notification_channel'])
-                                if channel:
-                                    # Define o título baseado se é um novo vídeo ou não
-                                    status = "🎥 Novo Vídeo!" if channel_info.get('is_new_video', False) else "📺 Vídeo Anterior"
-                                    
-                                    # Cria o embed bonito
-                                    embed = discord.Embed(
-                                        url=channel_info['video_url'],
-                                        color=discord.Color.red() if channel_info.get('is_new_video', False) else discord.Color.blue()
-                                    )
-                                    
-                                    # Adiciona a thumbnail como imagem principal
-                                    embed.set_image(url=channel_info['thumbnail_url'])
-                                    
-                                    # Adiciona o autor (canal do YouTube) com logo
-                                    embed.set_author(
-                                        name=channel_info['channel_name'],
-                                        url=f"https://www.youtube.com/@{channel_info['channel_name'].replace(' ', '')}",
-                                        icon_url=channel_info['channel_icon']
-                                    )
-                                    
-                                    # Adiciona o título do vídeo com link
-                                    embed.add_field(
-                                        name="",
-                                        value=f"[{channel_info['video_title']}]({channel_info['video_url']})",
-                                        inline=False
-                                    )
-                                    
-                                    # Adiciona informações do vídeo
-                                    embed.add_field(
-                                        name="",
-                                        value=f"**{status}** • {channel_info['published_text']}",
-                                        inline=False
-                                    )
-                                    
-                                    # Adiciona o footer apenas com o ícone
-                                    embed.set_footer(
-                                        text="",
-                                        icon_url="https://www.youtube.com/favicon.ico"
-                                    )
-                                    
-                                    # Envia apenas o embed
-                                    await channel.send(embed=embed)
+                            if channel_info and 'video_url' in channel_info:  # Se encontrou qualquer vídeo (novo ou antigo)
+                                self.dispatcher.enqueue(config['notification_channel'], [create_video_embed(channel_info)])
                         except Exception as e:
-                            print(f"Erro ao verificar vídeos após configuração: {str(e)}")
+                            logger.error(f"Erro ao verificar vídeos após configuração: {str(e)}")
                     else:
                         await message.channel.send("❌ Por favor, digite `1` para vídeos normais ou `2` para vídeos normais e shorts.")
             
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Cache LRU com expiração por entrada, persistido em um namespace do armazenamento.
+
+    Valores None são armazenados normalmente e servem como cache negativo
+    (por exemplo, URLs que não puderam ser resolvidas).
+    """
+
+    def __init__(self, namespace=None, storage=None, max_size=10000, ttl=86400, negative_ttl=None):
+        self.namespace = namespace
+        self.storage = storage
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl if negative_ttl is not None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # Chaves alteradas ou removidas desde o último save()
+        self._changed = set()
+        self._removed = set()
+        self._load()
+
+    def _load(self):
+        """Carrega as entradas ainda válidas do armazenamento"""
+        if not self.storage or not self.namespace:
+            return
+
+        try:
+            now = time.time()
+            for key, (value, expires_at) in self.storage.get_all(self.namespace).items():
+                if expires_at > now:
+                    self._entries[key] = (value, expires_at)
+                else:
+                    self._removed.add(key)
+            self._evict()
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache {self.namespace}: {str(e)}")
+            self._entries = OrderedDict()
+
+    def save(self):
+        """Grava no armazenamento apenas as entradas alteradas"""
+        if not self.storage or not self.namespace:
+            return
+
+        with self._lock:
+            changed = {key: self._entries[key] for key in self._changed if key in self._entries}
+            removed = self._removed - set(changed)
+            self._changed = set()
+            self._removed = set()
+
+        try:
+            with self.storage.batch():
+                for key, entry in changed.items():
+                    self.storage.set(self.namespace, key, entry)
+                for key in removed:
+                    self.storage.delete(self.namespace, key)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache {self.namespace}: {str(e)}")
+
+    def lookup(self, key):
+        """Retorna (encontrado, valor); valor pode ser None em uma entrada negativa"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                self._removed.add(key)
+                entry = None
+
+            CACHE_REQUESTS.inc(cache=self.namespace or 'memory', result='miss' if entry is None else 'hit')
+            if entry is None:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def get(self, key, default=None):
+        """Obtém um valor do cache"""
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def refresh(self, key):
+        """Relê uma entrada do armazenamento, que pode ter sido gravada por outro processo"""
+        if not self.storage or not self.namespace:
+            return
+
+        entry = self.storage.get(self.namespace, key)
+        if entry is None or entry[1] <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = tuple(entry)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def set(self, key, value, ttl=None):
+        """Armazena um valor; None usa o TTL do cache negativo"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            self._changed.add(key)
+            self._evict()
+
+    def _evict(self):
+        """Remove as entradas usadas há mais tempo quando o cache passa do limite"""
+        while len(self._entries) > self.max_size:
+            key, _ = self._entries.popitem(last=False)
+            self._removed.add(key)
+
+    def __len__(self):
+        return len(self._entries)
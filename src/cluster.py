@@ -0,0 +1,107 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+def _hash(value):
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+class HashRing:
+    """Anel de hashing consistente: cada chave pertence a um único nó.
+
+    Cada nó ocupa várias posições virtuais no anel, então quando um nó entra
+    ou sai apenas as chaves dele mudam de dono.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.nodes = tuple(sorted(nodes))
+        self._ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in self._ring]
+
+    def owner(self, key):
+        """Nó responsável pela chave, ou None se o anel estiver vazio"""
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+class StaticPartition:
+    """Divisão fixa dos canais entre count processos poller, sem presença nem eleição de líder"""
+
+    def __init__(self, index, count):
+        self.node_id = f"poller-{index}"
+        self.ring = HashRing(f"poller-{other}" for other in range(count))
+
+    def owns(self, key):
+        return self.ring.owner(key) == self.node_id
+
+class Cluster:
+    """Divide a verificação dos canais do YouTube entre vários processos do bot.
+
+    Cada processo (nó) renova periodicamente a sua presença no armazenamento
+    compartilhado. Um dos nós é eleito líder por um lease gravado com
+    compare-and-set e publica a lista de nós ativos; todos montam o mesmo
+    anel de hashing consistente a partir dessa lista, e cada canal do YouTube
+    é verificado apenas pelo nó dono dele, evitando notificações duplicadas.
+    """
+
+    def __init__(self, storage, node_id=None, lease_seconds=None):
+        if not hasattr(storage, 'compare_and_set'):
+            raise ValueError("O modo cluster requer STORAGE_BACKEND=sqlite com o banco compartilhado entre os processos")
+
+        self.storage = storage
+        self.node_id = node_id or os.getenv('CLUSTER_NODE_ID') or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds or int(os.getenv('CLUSTER_LEASE_SECONDS', '30'))
+        self.is_leader = False
+        self.ring = HashRing()
+
+    def heartbeat(self, now=None):
+        """Renova a presença do nó, disputa a liderança e atualiza o anel"""
+        now = now or time.time()
+        self.storage.set('cluster_nodes', self.node_id, now + self.lease_seconds)
+        self.is_leader = self._acquire_leadership(now)
+
+        if self.is_leader:
+            # O líder remove os nós que pararam de renovar a presença e publica a lista de ativos
+            nodes = self.storage.get_all('cluster_nodes')
+            for node, expires_at in nodes.items():
+                if expires_at <= now:
+                    self.storage.delete('cluster_nodes', node)
+            members = sorted(node for node, expires_at in nodes.items() if expires_at > now)
+            if self.storage.get('cluster', 'members') != members:
+                self.storage.set('cluster', 'members', members)
+
+        members = tuple(sorted(self.storage.get('cluster', 'members') or []))
+        if members != self.ring.nodes:
+            logger.info(f"Nós ativos no cluster: {', '.join(members) or 'nenhum'}")
+            self.ring = HashRing(members)
+
+    def _acquire_leadership(self, now):
+        """Obtém ou renova o lease de líder; só um nó consegue gravá-lo por vez"""
+        current = self.storage.get('cluster', 'leader')
+        lease = {'node': self.node_id, 'expires_at': now + self.lease_seconds}
+        if current is not None and current['node'] != self.node_id and current['expires_at'] > now:
+            return False
+        return self.storage.compare_and_set('cluster', 'leader', current, lease)
+
+    def owns(self, key):
+        """Verifica se este nó é o responsável pela chave (ID de um canal do YouTube)"""
+        return self.ring.owner(key) == self.node_id
+
+    def leave(self):
+        """Sai do cluster, liberando a liderança para outro nó"""
+        try:
+            self.storage.delete('cluster_nodes', self.node_id)
+            current = self.storage.get('cluster', 'leader')
+            if current and current['node'] == self.node_id:
+                self.storage.compare_and_set('cluster', 'leader', current, {'node': None, 'expires_at': 0})
+        except Exception as e:
+            logger.error(f"Erro ao sair do cluster: {str(e)}")
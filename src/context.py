@@ -0,0 +1,14 @@
+class RequestContext:
+    """Respostas da API memorizadas durante uma varredura.
+
+    Evita que o mesmo ID de canal, os mesmos metadados ou a mesma página de
+    uploads sejam buscados mais de uma vez no mesmo ciclo, mesmo quando
+    vários servidores configuram o mesmo canal.
+    """
+
+    __slots__ = ('channel_ids', 'channels', 'pages')
+
+    def __init__(self):
+        self.channel_ids = {}  # URL -> ID do canal
+        self.channels = {}  # ID do canal -> ChannelRecord (None se o canal não existe)
+        self.pages = {}  # (ID do canal, token da página) -> UploadsPage
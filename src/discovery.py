@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from .transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+
+_document = None
+_document_lock = threading.Lock()
+
+def load_discovery_document(path=None, transport=None):
+    """Documento de descoberta da API do YouTube, lido uma única vez por processo.
+
+    Usa, nesta ordem, o arquivo em YOUTUBE_DISCOVERY_PATH (se existir), a
+    cópia estática que acompanha o google-api-python-client e, por último, o
+    documento baixado da internet, que é gravado em YOUTUBE_DISCOVERY_PATH
+    para as próximas inicializações.
+    """
+    global _document
+    with _document_lock:
+        if _document is not None:
+            return _document
+
+        path = path or os.getenv('YOUTUBE_DISCOVERY_PATH', 'data/youtube_discovery.json')
+        started = time.perf_counter()
+        source = path
+        document = _read_file(path)
+        if document is None:
+            source = 'google-api-python-client'
+            document = _read_static()
+        if document is None:
+            source = DISCOVERY_URL
+            document = _download(path, transport or get_transport())
+
+        _document = json.loads(document)
+        logger.info(f"Documento de descoberta da API carregado de {source} em {time.perf_counter() - started:.2f}s")
+        return _document
+
+def _read_file(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        logger.error(f"Erro ao ler o documento de descoberta {path}: {str(e)}")
+        return None
+
+def _read_static():
+    """Cópia do documento incluída no pacote google-api-python-client (versões 2.x)"""
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        return get_static_doc('youtube', 'v3')
+    except ImportError:
+        return None
+
+def _download(path, transport):
+    response = transport.get(DISCOVERY_URL)
+    response.raise_for_status()
+    document = response.text
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(document)
+    except Exception as e:
+        logger.error(f"Erro ao salvar o documento de descoberta em {path}: {str(e)}")
+    return document
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+
+import discord
+
+from .metrics import DISPATCH_QUEUE_DEPTH, DISPATCH_MESSAGES, DETECTION_TO_POST
+
+logger = logging.getLogger(__name__)
+
+# O Discord aceita até 10 embeds por mensagem
+MAX_EMBEDS_PER_MESSAGE = 10
+
+class TokenBucket:
+    """Limitador de taxa: até capacity envios de uma vez, repostos a rate por segundo"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Aguarda até haver um envio disponível e o consome"""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds):
+        """Suspende os envios por um tempo (por exemplo, o retry_after de uma resposta 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class DispatchQueue:
+    """Fila de envio das notificações ao Discord, separada da detecção de vídeos.
+
+    A varredura apenas enfileira os embeds; workers assíncronos os enviam
+    respeitando um limite global e um limite por canal do Discord. Os
+    vídeos pendentes de um mesmo canal são agrupados em mensagens de até
+    10 embeds, e falhas temporárias são reenviadas com backoff exponencial
+    sem travar os demais canais.
+    """
+
+    def __init__(self, get_channel, workers=None, global_rate=None, channel_rate=None, channel_burst=None,
+                 max_retries=None):
+        self.get_channel = get_channel
+        self.workers = workers or int(os.getenv('DISPATCH_WORKERS', '4'))
+        # O Discord permite 50 requisições por segundo por bot e cerca de 5 mensagens a cada 5 segundos por canal
+        global_rate = global_rate or float(os.getenv('DISPATCH_GLOBAL_RATE', '40'))
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.channel_rate = channel_rate or float(os.getenv('DISPATCH_CHANNEL_RATE', '1'))
+        self.channel_burst = channel_burst or int(os.getenv('DISPATCH_CHANNEL_BURST', '5'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('DISPATCH_MAX_RETRIES', '5'))
+
+        self._queue = None
+        self._tasks = []
+        self._pending = {}  # ID do canal do Discord -> (embed, horário da detecção) aguardando envio
+        self._queued = set()  # Canais na fila, em envio ou aguardando nova tentativa
+        self._attempts = {}
+        self._buckets = {}
+        DISPATCH_QUEUE_DEPTH.set_function(lambda: len(self))
+
+    def __len__(self):
+        return sum(len(embeds) for embeds in self._pending.values())
+
+    def start(self):
+        """Inicia os workers no event loop atual"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for channel_id in self._queued:
+            self._queue.put_nowait(channel_id)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Interrompe os workers; o que não foi enviado continua na fila e entra no snapshot()"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def idle(self):
+        """Verifica se não há nenhum canal na fila, em envio ou aguardando nova tentativa"""
+        return not self._queued
+
+    def snapshot(self):
+        """Embeds pendentes em formato serializável, com o horário da detecção, por canal do Discord"""
+        return {
+            str(channel_id): [[embed.to_dict(), detected_at] for embed, detected_at in embeds]
+            for channel_id, embeds in self._pending.items() if embeds
+        }
+
+    def restore(self, state):
+        """Enfileira de novo os embeds pendentes de um snapshot"""
+        for channel_id, embeds in state.items():
+            for item in embeds:
+                # Snapshots antigos guardavam só o embed, sem o horário da detecção
+                embed, detected_at = item if isinstance(item, list) else (item, None)
+                self.enqueue(int(channel_id), [discord.Embed.from_dict(embed)], detected_at=detected_at)
+
+    def enqueue(self, channel_id, embeds, detected_at=None):
+        """Enfileira embeds para um canal do Discord sem aguardar o envio.
+
+        detected_at é o horário (time.time()) em que o vídeo foi detectado pela
+        varredura ou recebido do hub WebSub; sem ele, vale o horário atual.
+        """
+        if not embeds:
+            return
+        detected_at = detected_at or time.time()
+        self._pending.setdefault(channel_id, deque()).extend((embed, detected_at) for embed in embeds)
+        if channel_id not in self._queued:
+            self._queued.add(channel_id)
+            if self._queue is not None:
+                self._queue.put_nowait(channel_id)
+
+    def _bucket(self, channel_id):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.channel_rate, self.channel_burst)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            channel_id = await self._queue.get()
+            try:
+                await self._send_next(channel_id)
+            except Exception as e:
+                logger.error(f"Erro inesperado no envio para o canal {channel_id}: {str(e)}")
+                self._done(channel_id)
+            finally:
+                self._queue.task_done()
+
+    async def _send_next(self, channel_id):
+        """Envia a próxima mensagem (até 10 embeds) de um canal"""
+        pending = self._pending.get(channel_id)
+        if not pending:
+            self._done(channel_id)
+            return
+
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            logger.warning(f"Canal do Discord {channel_id} não encontrado; {len(pending)} notificações descartadas")
+            DISPATCH_MESSAGES.inc(result='dropped')
+            self._drop(channel_id)
+            return
+
+        batch = [pending.popleft() for _ in range(min(MAX_EMBEDS_PER_MESSAGE, len(pending)))]
+        try:
+            await self._bucket(channel_id).acquire()
+            await self.global_bucket.acquire()
+            await channel.send(embeds=[embed for embed, _ in batch])
+        except asyncio.CancelledError:
+            # Interrompido por stop(): o lote volta para a fila e entra no snapshot
+            pending.extendleft(reversed(batch))
+            raise
+        except (discord.Forbidden, discord.NotFound) as e:
+            logger.warning(f"Sem acesso ao canal {channel_id}; {len(batch) + len(pending)} notificações descartadas: {str(e)}")
+            DISPATCH_MESSAGES.inc(result='dropped')
+            self._drop(channel_id)
+            return
+        except discord.HTTPException as e:
+            # Erros 4xx (exceto 429) não se resolvem com uma nova tentativa
+            if e.status < 500 and e.status != 429:
+                logger.warning(f"Discord recusou {len(batch)} notificações para o canal {channel_id}: {str(e)}")
+                DISPATCH_MESSAGES.inc(result='rejected')
+                self._continue(channel_id)
+            else:
+                self._retry(channel_id, batch, e)
+            return
+        except (OSError, asyncio.TimeoutError) as e:
+            self._retry(channel_id, batch, e)
+            return
+        except Exception as e:
+            # Um erro inesperado não pode perder o lote já retirado da fila nem deixar o canal parado
+            self._retry(channel_id, batch, e)
+            return
+
+        DISPATCH_MESSAGES.inc(result='sent')
+        sent_at = time.time()
+        for _, detected_at in batch:
+            DETECTION_TO_POST.observe(sent_at - detected_at)
+        self._continue(channel_id)
+
+    def _retry(self, channel_id, batch, error):
+        """Devolve os embeds ao início da fila do canal e agenda uma nova tentativa com backoff"""
+        attempt = self._attempts.get(channel_id, 0) + 1
+        if attempt > self.max_retries:
+            logger.error(f"Falha ao enviar para o canal {channel_id} após {self.max_retries} tentativas: {str(error)}")
+            DISPATCH_MESSAGES.inc(result='failed')
+            self._continue(channel_id)
+            return
+
+        self._attempts[channel_id] = attempt
+        self._pending[channel_id].extendleft(reversed(batch))
+        delay = getattr(error, 'retry_after', None) or min(2 ** attempt, 300) * random.uniform(0.5, 1.5)
+        self._bucket(channel_id).block(delay)
+        logger.warning(f"Erro ao enviar para o canal {channel_id} (tentativa {attempt}), repetindo em {delay:.0f}s: {str(error)}")
+        DISPATCH_MESSAGES.inc(result='retried')
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, channel_id)
+
+    def _continue(self, channel_id):
+        """Passa para a próxima mensagem do canal, se houver"""
+        self._attempts.pop(channel_id, None)
+        if self._pending.get(channel_id):
+            self._queue.put_nowait(channel_id)
+        else:
+            self._done(channel_id)
+
+    def _drop(self, channel_id):
+        self._pending.pop(channel_id, None)
+        self._attempts.pop(channel_id, None)
+        self._queued.discard(channel_id)
+
+    def _done(self, channel_id):
+        self._queued.discard(channel_id)
+        if not self._pending.get(channel_id):
+            self._pending.pop(channel_id, None)
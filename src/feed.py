@@ -0,0 +1,107 @@
+import os
+import threading
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+
+from .transport import get_transport
+from .records import UploadsPage, VideoRecord
+from .metrics import FEED_REQUESTS
+
+FEED_URL = 'https://www.youtube.com/feeds/videos.xml'
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+YT = '{http://www.youtube.com/xml/schemas/2015}'
+MEDIA = '{http://search.yahoo.com/mrss/}'
+
+class FeedFetcher:
+    """Consulta o feed Atom público de uploads de um canal (feeds/videos.xml), sem gastar cota.
+
+    Usa o transporte HTTP compartilhado (pool de conexões), requisições condicionais
+    (ETag / If-Modified-Since) e leitura do XML em streaming. Os vídeos são
+    devolvidos como a página de uploads da API (UploadsPage), para que o
+    restante do código não precise saber de onde vieram.
+    """
+
+    def __init__(self, transport=None, timeout=None):
+        self.transport = transport or get_transport()
+        self.timeout = timeout or float(os.getenv('FEED_TIMEOUT', '10'))
+        self._lock = threading.Lock()
+        # ID do canal -> (ETag, Last-Modified, itens da última resposta)
+        self._validators = {}
+
+    def fetch(self, channel_id):
+        """Obtém os uploads mais recentes do canal (UploadsPage, sem próxima página)"""
+        with self._lock:
+            etag, last_modified, items = self._validators.get(channel_id, (None, None, None))
+
+        headers = {}
+        if items is not None:
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        with self.transport.stream(
+            'GET',
+            FEED_URL,
+            params={'channel_id': channel_id},
+            headers=headers,
+            timeout=self.timeout
+        ) as response:
+            FEED_REQUESTS.inc(status=response.status_code)
+            if response.status_code == 304:
+                return UploadsPage(items)
+            response.raise_for_status()
+            items = self._parse(response.raw)
+
+            with self._lock:
+                self._validators[channel_id] = (
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    items
+                )
+
+        return UploadsPage(items)
+
+    def _parse(self, stream):
+        """Lê as entradas do feed em streaming, descartando cada elemento após o uso"""
+        items = []
+        for _, element in ElementTree.iterparse(stream, events=('end',)):
+            if element.tag != f'{ATOM}entry':
+                continue
+
+            video_id = element.findtext(f'{YT}videoId')
+            published = element.findtext(f'{ATOM}published')
+            media = element.find(f'{MEDIA}group')
+            thumbnail = media.find(f'{MEDIA}thumbnail') if media is not None else None
+
+            if video_id and published:
+                items.append(VideoRecord(
+                    video_id,
+                    element.findtext(f'{ATOM}title', default=''),
+                    datetime.fromisoformat(published).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    thumbnail.get('url') if thumbnail is not None else None
+                ))
+            element.clear()
+        return items
+
+    def snapshot(self):
+        """Validadores e últimos itens de cada canal, para o snapshot"""
+        with self._lock:
+            return {
+                channel_id: [etag, last_modified, [item.to_value() for item in items]]
+                for channel_id, (etag, last_modified, items) in self._validators.items()
+            }
+
+    def restore(self, state):
+        with self._lock:
+            for channel_id, (etag, last_modified, items) in state.items():
+                # Snapshots anteriores guardavam os itens no formato de playlistItems().list
+                items = [
+                    VideoRecord.from_api(item) if isinstance(item, dict) else VideoRecord.from_value(item)
+                    for item in items
+                ]
+                self._validators.setdefault(channel_id, (etag, last_modified, items))
+
+    def close(self):
+        """O transporte é compartilhado e fechado pelo bot"""
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+# part e máscara fields de cada endpoint, limitados aos campos que o bot realmente lê
+REQUEST_SHAPES = {
+    'channels.list': (
+        'snippet,contentDetails',
+        'items(id,snippet(title,thumbnails/default/url),contentDetails/relatedPlaylists/uploads)'
+    ),
+    'playlistItems.list': (
+        'snippet',
+        'nextPageToken,items/snippet(publishedAt,title,resourceId/videoId,thumbnails/high/url)'
+    ),
+    'videos.list': (
+        'contentDetails',
+        'items(id,contentDetails/duration)'
+    ),
+    'search.list': (
+        'id',
+        'items/id/channelId'
+    ),
+}
+
+# part usado sem máscara, para comparação no modo de medição; search.list custa 100
+# unidades e por isso não é repetido
+FULL_PARTS = {
+    'channels.list': 'snippet,contentDetails',
+    'playlistItems.list': 'snippet',
+    'videos.list': 'contentDetails',
+}
+
+def shape_request(endpoint, params):
+    """Aplica o part e a máscara fields mínimos do endpoint aos parâmetros da chamada"""
+    shaped = dict(params)
+    if endpoint in REQUEST_SHAPES:
+        part, fields = REQUEST_SHAPES[endpoint]
+        shaped.setdefault('part', part)
+        shaped.setdefault('fields', fields)
+    return shaped
+
+def payload_size(response):
+    """Tamanho em bytes do JSON compacto de uma resposta"""
+    return len(json.dumps(response, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+class PayloadMeter:
+    """Mede quantos bytes as máscaras fields economizam em cada varredura.
+
+    Ativado com PAYLOAD_MEASURE=1. Cada chamada mascarada é repetida sem
+    máscara para comparar os tamanhos, o que dobra o consumo de cota dos
+    endpoints de 1 unidade; serve apenas para diagnóstico.
+    """
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.getenv('PAYLOAD_MEASURE', '0').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._calls = 0
+        self._shaped = 0
+        self._full = 0
+
+    def record(self, shaped_response, full_response):
+        """Registra o tamanho de uma resposta com e sem máscara"""
+        shaped = payload_size(shaped_response)
+        full = payload_size(full_response)
+        with self._lock:
+            self._calls += 1
+            self._shaped += shaped
+            self._full += full
+
+    def report(self):
+        """Resumo da economia desde o último relatório, ou None se não houve medições"""
+        with self._lock:
+            calls, shaped, full = self._calls, self._shaped, self._full
+            self._reset()
+
+        if not calls:
+            return None
+        saved = full - shaped
+        return (
+            f"Máscaras fields: {calls} chamadas, {shaped / 1024:.1f} KB recebidos em vez de "
+            f"{full / 1024:.1f} KB ({saved / 1024:.1f} KB economizados, {100 * saved / max(full, 1):.0f}%)"
+        )
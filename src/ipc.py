@@ -0,0 +1,206 @@
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+from .storage import get_storage
+from .metrics import IPC_EVENTS, IPC_PENDING
+
+logger = logging.getLogger(__name__)
+
+# Eventos recentes lembrados pelo gateway para descartar reenvios
+RECENT_EVENTS = 10000
+# Espera pela confirmação do gateway antes de considerar a conexão perdida
+ACK_TIMEOUT = 10
+
+def ipc_address(value=None):
+    """Endereço do canal local entre pollers e gateway: caminho de um socket Unix ou host:porta"""
+    value = value or os.getenv('IPC_ADDRESS', 'data/tubebot.sock')
+    if ':' in value and not value.startswith('/'):
+        host, port = value.rsplit(':', 1)
+        return (host, int(port))
+    return value
+
+def ipc_authkey(address=None):
+    """Chave que autentica as conexões entre pollers e gateway.
+
+    O multiprocessing.connection desserializa (pickle) o que recebe, então a
+    chave precisa ser secreta: vem de IPC_AUTHKEY ou, com socket Unix, é
+    gerada aleatoriamente e guardada em IPC_AUTHKEY_PATH (legível apenas pelo
+    usuário do bot). Com host:porta, IPC_AUTHKEY é obrigatória.
+    """
+    value = os.getenv('IPC_AUTHKEY')
+    if value:
+        return value.encode('utf-8')
+    if not isinstance(address or ipc_address(), str):
+        raise ValueError("IPC_AUTHKEY é obrigatória quando IPC_ADDRESS usa host:porta")
+    return _local_authkey(os.getenv('IPC_AUTHKEY_PATH', 'data/ipc_authkey'))
+
+def _local_authkey(path):
+    """Lê a chave local, ou a cria se ainda não existir (o primeiro processo a criá-la vence)"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(path):
+        # mkstemp cria o arquivo com permissão 0600; o link só é criado se o arquivo final não existir
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    with open(path, 'r') as f:
+        return f.read().strip().encode('utf-8')
+
+class EventListener:
+    """Recebe, no processo do gateway, os eventos enviados pelos processos poller.
+
+    Cada conexão é lida em uma thread própria; os eventos são repassados ao
+    event loop do Discord com call_soon_threadsafe e confirmados ao poller
+    pelo ID. Um evento reenviado (porque a confirmação se perdeu) é
+    confirmado de novo, mas não repassado.
+    """
+
+    def __init__(self, on_event, loop, address=None, authkey=None):
+        self.on_event = on_event
+        self.loop = loop
+        self.address = address or ipc_address()
+        self.authkey = authkey or ipc_authkey(self.address)
+        self._listener = None
+        self._recent = deque(maxlen=RECENT_EVENTS)
+        self._recent_ids = set()
+        self._recent_lock = threading.Lock()
+
+    def start(self):
+        """Abre o socket e começa a aceitar conexões"""
+        if isinstance(self.address, str):
+            os.makedirs(os.path.dirname(self.address) or '.', exist_ok=True)
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str):
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept, name='tubebot-ipc', daemon=True).start()
+        logger.info(f"Aguardando eventos dos pollers em {self.address}")
+
+    def _accept(self):
+        while self._listener is not None:
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if self._listener is not None:
+                    logger.error(f"Erro ao aceitar conexão de um poller: {str(e)}")
+                continue
+            threading.Thread(target=self._read, args=(connection,), name='tubebot-ipc-conn', daemon=True).start()
+
+    def _read(self, connection):
+        with connection:
+            while True:
+                try:
+                    event = connection.recv()
+                    event_id = event.pop('id', None)
+                    if event_id is None or self._first_delivery(event_id):
+                        self.loop.call_soon_threadsafe(self.on_event, event)
+                    if event_id is not None:
+                        connection.send(event_id)
+                except (EOFError, OSError):
+                    return
+
+    def _first_delivery(self, event_id):
+        with self._recent_lock:
+            if event_id in self._recent_ids:
+                return False
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_ids.discard(self._recent[0])
+            self._recent.append(event_id)
+            self._recent_ids.add(event_id)
+            return True
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+class EventSender:
+    """Envia eventos de um processo poller ao gateway.
+
+    Cada evento é gravado no armazenamento compartilhado (namespace
+    ipc_outbox) antes do envio e só é apagado depois que o gateway confirma o
+    recebimento. Assim, os eventos pendentes sobrevivem tanto a uma queda do
+    gateway quanto a um reinício do poller, e são reenviados em ordem na
+    próxima tentativa. Os eventos precisam ser serializáveis em JSON.
+    """
+
+    def __init__(self, name, storage=None, address=None, authkey=None):
+        self.name = name
+        self.storage = storage or get_storage()
+        self.address = address or ipc_address()
+        self.authkey = authkey or ipc_authkey(self.address)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._retry_at = 0
+        pending = self._pending()
+        self._sequence = int(pending[-1][0].rsplit(':', 1)[1]) if pending else 0
+        if pending:
+            logger.info(f"{len(pending)} eventos pendentes de {name} serão reenviados ao gateway")
+        IPC_PENDING.set_function(lambda: len(self._pending()), sender=name)
+
+    def _pending(self):
+        """Eventos deste poller ainda não confirmados, na ordem de envio"""
+        prefix = f"{self.name}:"
+        return sorted(
+            (event_id, event) for event_id, event in self.storage.get_all('ipc_outbox').items()
+            if event_id.startswith(prefix)
+        )
+
+    def send(self, event):
+        """Grava o evento e envia tudo o que estiver pendente"""
+        with self._lock:
+            self._sequence += 1
+            event_id = f"{self.name}:{self._sequence:012d}"
+            try:
+                self.storage.set('ipc_outbox', event_id, event)
+            except Exception as e:
+                IPC_EVENTS.inc(result='dropped')
+                logger.error(f"Evento {event_id} descartado: não foi possível gravá-lo para envio ({str(e)})")
+                return
+            self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if time.monotonic() < self._retry_at:
+            return
+        pending = self._pending()
+        if not pending:
+            return
+        try:
+            if self._connection is None:
+                self._connection = Client(self.address, authkey=self.authkey)
+            for event_id, event in pending:
+                self._connection.send(dict(event, id=event_id))
+                if not self._connection.poll(ACK_TIMEOUT) or self._connection.recv() != event_id:
+                    raise TimeoutError("sem confirmação do gateway")
+                self.storage.delete('ipc_outbox', event_id)
+                IPC_EVENTS.inc(result='sent')
+        except Exception as e:
+            logger.warning(f"Gateway indisponível em {self.address} ({len(pending)} eventos pendentes): {str(e)}")
+            self._retry_at = time.monotonic() + 5
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
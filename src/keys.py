@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import threading
+
+from .quota import ENDPOINT_COSTS, QuotaExceeded, QuotaScheduler
+from .retry import CircuitBreaker, CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Escopo pedido às credenciais OAuth: o bot só lê dados públicos
+OAUTH_SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+class APICredential:
+    """Uma chave da API ou um projeto OAuth, com a sua própria cota diária e o seu circuito"""
+
+    def __init__(self, name, quota, api_key=None, credentials_file=None):
+        self.name = name
+        self.quota = quota
+        self.api_key = api_key
+        self.credentials_file = credentials_file
+        self.breaker = CircuitBreaker(f"key:{name}")
+        self._credentials = None
+        self._lock = threading.Lock()
+
+    def client_options(self, http):
+        """Argumentos de build_from_document para criar um cliente com esta credencial"""
+        if self.api_key:
+            return {'developerKey': self.api_key, 'http': http}
+
+        # Importado aqui porque só os projetos OAuth precisam dele
+        import google_auth_httplib2
+        return {'http': google_auth_httplib2.AuthorizedHttp(self._load_credentials(), http=http)}
+
+    def request_auth(self):
+        """Chave ou cabeçalho Authorization para o cliente assíncrono (AsyncYouTubeClient.list)"""
+        if self.api_key:
+            return {'api_key': self.api_key}
+
+        credentials = self._load_credentials()
+        with self._lock:
+            if not credentials.valid:
+                from google.auth.transport.requests import Request
+                credentials.refresh(Request())
+            headers = {}
+            credentials.apply(headers)
+        return {'headers': headers}
+
+    def _load_credentials(self):
+        """Credenciais OAuth do arquivo, compartilhadas pelos clientes de todas as threads"""
+        with self._lock:
+            if self._credentials is None:
+                from google.oauth2.credentials import Credentials
+                self._credentials = Credentials.from_authorized_user_file(self.credentials_file, OAUTH_SCOPES)
+            return self._credentials
+
+class KeyPool:
+    """Conjunto de chaves da API do YouTube (e projetos OAuth), cada uma com a sua cota diária.
+
+    As chaves vêm de YOUTUBE_API_KEYS (separadas por vírgula, ou a chave
+    única de YOUTUBE_API_KEY) e os projetos OAuth de
+    YOUTUBE_OAUTH_CREDENTIALS (arquivos de credenciais separados por
+    vírgula). Cada chamada é debitada da chave com mais cota restante, de
+    modo que a capacidade diária cresce com o número de chaves; uma chave
+    sem cota ou recusada pela API sai do rodízio até a renovação (ou até o
+    seu circuito fechar).
+
+    Também expõe o saldo somado das chaves (remaining, stretch_factor,
+    seconds_until_reset), usado para distribuir as verificações ao longo do
+    dia.
+    """
+
+    def __init__(self, storage=None, api_keys=None, credentials_files=None, daily_budget=None):
+        if api_keys is None:
+            api_keys = _split(os.getenv('YOUTUBE_API_KEYS', '')) or _split(os.getenv('YOUTUBE_API_KEY', ''))
+        if credentials_files is None:
+            credentials_files = _split(os.getenv('YOUTUBE_OAUTH_CREDENTIALS', ''))
+        api_keys = list(dict.fromkeys(api_keys))
+        credentials_files = list(dict.fromkeys(credentials_files))
+        if not api_keys and not credentials_files:
+            raise ValueError(
+                "YouTube API key não encontrada. Configure a variável YOUTUBE_API_KEY (ou YOUTUBE_API_KEYS) no arquivo .env"
+            )
+
+        # A contagem de cada chave é gravada sob um resumo da chave (e não do processo), então
+        # todos os processos que compartilham o armazenamento debitam o mesmo saldo
+        def quota(name, identity):
+            digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:12]
+            return QuotaScheduler(daily_budget, storage=storage, scope=digest, name=name)
+
+        self.credentials = []
+        for api_key in api_keys:
+            name = f"...{api_key[-4:]}"
+            self.credentials.append(APICredential(name, quota(name, api_key), api_key=api_key))
+        for path in credentials_files:
+            name = f"oauth:{os.path.splitext(os.path.basename(path))[0]}"
+            self.credentials.append(APICredential(name, quota(name, path), credentials_file=path))
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def _available(self):
+        return [credential for credential in self.credentials if not credential.breaker.is_open]
+
+    def acquire(self, endpoint):
+        """Debita o custo da chamada da chave com mais cota restante e retorna essa chave.
+
+        Levanta QuotaExceeded se nenhuma chave tiver saldo, ou CircuitOpen se
+        todas as chaves com saldo estiverem com o circuito aberto.
+        """
+        units = ENDPOINT_COSTS.get(endpoint, 1)
+        candidates = sorted(self._available(), key=lambda credential: -credential.quota.remaining)
+        for credential in candidates:
+            try:
+                credential.quota.acquire(endpoint, units)
+                return credential
+            except QuotaExceeded:
+                continue
+
+        blocked = [credential for credential in self.credentials if credential not in candidates]
+        if any(credential.quota.can_afford(units) for credential in blocked):
+            retry_after = min(credential.breaker.retry_after for credential in blocked)
+            raise CircuitOpen('keys', retry_after)
+        raise QuotaExceeded(f"Cota diária esgotada em todas as {len(self.credentials)} chaves para {endpoint}")
+
+    def exhaust(self, credential):
+        """Tira a chave do rodízio até a renovação (após um quotaExceeded da API)"""
+        credential.quota.exhaust()
+        if len(self.credentials) > 1:
+            logger.warning(f"Cota da chave {credential.name} esgotada; seguindo com as demais chaves")
+
+    @property
+    def used(self):
+        """Unidades consumidas hoje, somando todas as chaves"""
+        return sum(credential.quota.used for credential in self.credentials)
+
+    @property
+    def remaining(self):
+        """Unidades restantes hoje nas chaves disponíveis"""
+        return sum(credential.quota.remaining for credential in self._available())
+
+    def can_afford(self, units):
+        """Verifica se alguma chave disponível comporta a chamada"""
+        return any(credential.quota.can_afford(units) for credential in self._available())
+
+    def seconds_until_reset(self):
+        """Segundos até a renovação da cota (a mesma para todas as chaves)"""
+        return self.credentials[0].quota.seconds_until_reset()
+
+    def stretch_factor(self, units_per_day):
+        """Fator pelo qual os intervalos de verificação devem ser esticados para o saldo somado durar até a renovação"""
+        remaining = self.remaining
+        if remaining <= 0:
+            return None
+
+        projected = units_per_day * self.seconds_until_reset() / 86400
+        return max(1.0, projected / remaining)
@@ -0,0 +1,41 @@
+import json
+import logging
+import os
+import time
+
+# Atributos padrão de um LogRecord; os demais vieram de extra= e entram no JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JSONFormatter(logging.Formatter):
+    """Uma linha JSON por evento, com os campos passados em extra= (para coletores de logs)"""
+
+    def format(self, record):
+        event = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                event[key] = value
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+def setup_logging(level=None, format=None):
+    """Configura o logging do processo pelas variáveis LOG_LEVEL e LOG_FORMAT (text ou json)"""
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    format = (format or os.getenv('LOG_FORMAT', 'text')).lower()
+
+    handler = logging.StreamHandler()
+    if format == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s'))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    # O discord.py registra cada evento do gateway em INFO
+    logging.getLogger('discord').setLevel(max(root.level, logging.WARNING))
@@ -0,0 +1,245 @@
+import bisect
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Limites dos buckets (em segundos) dos histogramas de tempo
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._collector = None
+
+    def set_collector(self, collector):
+        """Calcula os valores na hora da coleta: collector() retorna pares (rótulos, valor).
+
+        Serve para séries cujos rótulos só aparecem em uso, como os hosts do
+        pool HTTP.
+        """
+        with self._lock:
+            self._collector = collector
+
+    def _collect(self):
+        with self._lock:
+            collector = self._collector
+        if collector is None:
+            return
+        try:
+            samples = [(self._key(labels), value) for labels, value in collector()]
+        except Exception as e:
+            logger.warning(f"Erro ao coletar a métrica {self.name}: {str(e)}")
+            return
+        with self._lock:
+            self._values.update(samples)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} espera os rótulos {self.label_names}, recebeu {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        self._collect()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"]
+
+class Counter(_Metric):
+    """Contador que só cresce (chamadas, erros, unidades de cota)"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Valor que sobe e desce (tamanho de fila, cota restante).
+
+    Com set_function, o valor é calculado na hora da coleta.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def render(self):
+        with self._lock:
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                value = function()
+            except Exception as e:
+                logger.warning(f"Erro ao coletar a métrica {self.name}: {str(e)}")
+                continue
+            with self._lock:
+                self._values[key] = value
+        return super().render()
+
+class Histogram(_Metric):
+    """Distribuição de valores (latências, durações) em buckets cumulativos"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, [('le', bound)])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """Conjunto das métricas do processo, exportadas no formato de texto do Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# API do YouTube
+API_REQUESTS = registry.counter('tubebot_api_requests_total', "Chamadas à API do YouTube", ('endpoint',))
+API_LATENCY = registry.histogram('tubebot_api_request_seconds', "Duração das chamadas à API do YouTube", ('endpoint',))
+API_ERRORS = registry.counter(
+    'tubebot_api_errors_total', "Erros HttpError da API do YouTube por status e motivo", ('endpoint', 'status', 'reason')
+)
+API_RETRIES = registry.counter('tubebot_api_retries_total', "Novas tentativas após falhas temporárias da API", ('endpoint',))
+CIRCUIT_OPEN = registry.gauge(
+    'tubebot_circuit_open', "Circuitos abertos (1) da API do YouTube, por endpoint e por chave", ('breaker',)
+)
+QUOTA_UNITS = registry.counter('tubebot_quota_units_total', "Unidades de cota debitadas", ('endpoint', 'key'))
+QUOTA_REMAINING = registry.gauge('tubebot_quota_remaining_units', "Saldo de cota do dia", ('key',))
+
+# Verificação dos canais
+SWEEP_DURATION = registry.histogram('tubebot_sweep_seconds', "Duração de cada ciclo de verificação")
+SWEEP_CHANNELS = registry.counter('tubebot_sweep_channels_total', "Canais verificados", ('result',))
+SCHEDULED_CHANNELS = registry.gauge('tubebot_scheduled_channels', "Canais na agenda de verificação")
+VIDEOS_FOUND = registry.counter('tubebot_videos_found_total', "Vídeos encontrados para notificação", ('kind',))
+FEED_REQUESTS = registry.counter('tubebot_feed_requests_total', "Consultas ao feed Atom de uploads", ('status',))
+CACHE_REQUESTS = registry.counter('tubebot_cache_requests_total', "Consultas aos caches", ('cache', 'result'))
+
+# Transporte HTTP compartilhado
+HTTP_POOL_REQUESTS = registry.counter(
+    'tubebot_http_pool_requests_total',
+    "Requisições HTTP por host que reaproveitaram uma conexão do pool (hit) ou abriram uma nova (miss)",
+    ('host', 'result')
+)
+
+# Eventos dos pollers ao gateway (modo poller)
+IPC_EVENTS = registry.counter('tubebot_ipc_events_total', "Eventos dos pollers ao gateway", ('result',))
+IPC_PENDING = registry.gauge('tubebot_ipc_pending_events', "Eventos aguardando confirmação do gateway", ('sender',))
+
+# Envio ao Discord
+DISPATCH_QUEUE_DEPTH = registry.gauge('tubebot_dispatch_queue_depth', "Notificações aguardando envio ao Discord")
+DISPATCH_MESSAGES = registry.counter('tubebot_dispatch_messages_total', "Mensagens enviadas ao Discord", ('result',))
+DETECTION_TO_POST = registry.histogram(
+    'tubebot_detection_to_post_seconds', "Tempo entre a detecção de um vídeo e o envio da notificação"
+)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def serve_metrics(port=None, host=None):
+    """Sobe o endpoint /metrics em uma thread; desativado se METRICS_PORT não estiver definida"""
+    port = port if port is not None else int(os.getenv('METRICS_PORT', '0'))
+    if not port:
+        return None
+    host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Não foi possível abrir o endpoint de métricas em {host}:{port}: {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='tubebot-metrics', daemon=True).start()
+    logger.info(f"Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
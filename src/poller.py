@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import time
+from contextlib import nullcontext
+
+# Importado antes dos demais para medir o tempo dos imports nos processos poller
+from .startup import startup
+from .config import Config
+from .storage import get_storage
+from .youtube_api import YouTubeAPI, MAX_IDS_PER_REQUEST
+from .sweep import SweepEngine
+from .subscriptions import SubscriptionIndex
+from .scheduler import PollScheduler
+from .transport import get_transport
+from .cluster import StaticPartition
+from .ipc import EventSender
+from .snapshot import SnapshotStore, SNAPSHOT_INTERVAL
+from .quota import QuotaExceeded
+from .retry import CircuitOpen
+from .logs import setup_logging
+from .metrics import SWEEP_DURATION, SWEEP_CHANNELS, SCHEDULED_CHANNELS, VIDEOS_FOUND, serve_metrics
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre envios de vídeos antigos para um mesmo canal (4 horas)
+CHECK_INTERVAL = 14400
+
+# Frequência com que a fila de verificação é consultada; cada canal tem o seu próprio intervalo
+POLL_TICK = 60
+
+# Unidades de cota estimadas para verificar um canal (página de uploads + página de vídeos antigos)
+CHANNEL_CHECK_COST = 2
+
+class ChannelPoller:
+    """Detecção de vídeos novos: decide quais canais verificar, consulta o YouTube e repassa os resultados.
+
+    Não depende do Discord: os vídeos encontrados são entregues a
+    notify(inscritos, vídeos, horário da detecção), que no bot enfileira os embeds e no modo
+    poller envia os eventos ao processo do gateway. Com um particionador
+    (cluster), apenas os canais do YouTube que pertencem a este processo são
+    verificados.
+    """
+
+    def __init__(self, notify, storage=None, config=None, youtube=None, sweeper=None, cluster=None):
+        self.notify = notify
+        self.cluster = cluster
+        self.storage = storage or get_storage()
+        self.config = config or Config(self.storage)
+        self.youtube = youtube or YouTubeAPI(storage=self.storage)
+        self.sweeper = sweeper or SweepEngine()
+        self.subscriptions = SubscriptionIndex()
+        self.scheduler = PollScheduler(default_interval=CHECK_INTERVAL)
+        self.resolved_ids = {}  # URL do canal -> ID do canal
+        self.resolve_after = {}  # URL do canal -> horário da próxima tentativa de resolução
+        self.last_backfill = {}  # ID do canal -> horário do último envio de vídeo antigo
+        self.failures = {}  # ID do canal -> falhas seguidas da API ao verificá-lo
+        # Espera antes de verificar de novo um canal cuja verificação falhou (dobra a cada falha seguida)
+        self.retry_delay = int(os.getenv('CHANNEL_RETRY_DELAY', '60'))
+
+        # Com o backend de feed, verificar um canal não gasta cota (só os metadados, que ficam em cache)
+        self.channel_check_cost = 0 if self.youtube.feed else CHANNEL_CHECK_COST
+
+    async def tick(self):
+        """Executa um ciclo de verificação"""
+        # Os vídeos já enviados são gravados juntos, em uma transação curta no fim do ciclo, e as
+        # respostas da API ficam memorizadas até o fim do ciclo. Com vários processos cada gravação
+        # é feita na hora, para que os outros processos vejam os canais que mudarem de dono
+        started = time.perf_counter()
+        with (nullcontext() if self.cluster else self.youtube.deferred_saves()), self.youtube.request_context():
+            found = await self.sweep()
+        duration = time.perf_counter() - started
+        SWEEP_DURATION.observe(duration)
+        SCHEDULED_CHANNELS.set(len(self.scheduler))
+        if found:
+            logger.info(
+                f"Ciclo de verificação concluído em {duration:.2f}s: {len(found)} canais com vídeos para notificar",
+                extra={'sweep_seconds': round(duration, 3), 'channels_with_videos': len(found)}
+            )
+
+        # Os vídeos só são repassados depois que a transação gravou que eles foram enviados,
+        # para que uma queda no meio do ciclo não os envie de novo após reiniciar
+        for subscribers, videos, detected_at in found:
+            await self.notify(subscribers, videos, detected_at)
+
+        report = self.youtube.payload_meter.report()
+        if report:
+            logger.info(report)
+
+    def _fetch_channel_videos(self, entry):
+        """Verifica um canal uma única vez para todos os inscritos (executado no pool de workers)"""
+        channel_id, subscribers, channel = entry
+        # Outro processo pode ter verificado o canal antes de ele mudar de dono
+        if self.cluster:
+            self.youtube.reload_seen(channel_id)
+        include_shorts_options = sorted({subscriber.include_shorts for subscriber in subscribers})
+
+        # Vídeos antigos são enviados no máximo uma vez a cada CHECK_INTERVAL por canal,
+        # mesmo que o canal seja verificado com mais frequência
+        now = time.time()
+        include_old = now - self.last_backfill.get(channel_id, 0) >= CHECK_INTERVAL
+        videos = self.youtube.check_channel(
+            channel_id,
+            include_shorts_options,
+            channel=channel,
+            include_old=include_old
+        )
+        if any(not video['is_new_video'] for channel_videos in videos.values() for video in channel_videos):
+            self.last_backfill[channel_id] = now
+        return videos
+
+    def _reschedule(self, channel_id, factor, delay=None):
+        """Agenda a próxima verificação do canal; sem cota, aguarda a renovação diária"""
+        if delay is None and factor is None:
+            delay = self.youtube.quota.seconds_until_reset()
+        self.scheduler.reschedule(channel_id, factor=factor or 1.0, delay=delay)
+
+    def _requeue(self, channel_id, error):
+        """Agenda uma nova tentativa do canal após uma falha da API, sem esperar o intervalo normal.
+
+        A espera dobra a cada falha seguida, até o intervalo do canal; com o
+        circuito aberto, espera ele fechar, e sem cota, a renovação diária.
+        """
+        failures = self.failures[channel_id] = self.failures.get(channel_id, 0) + 1
+        if isinstance(error, QuotaExceeded):
+            delay = self.youtube.quota.seconds_until_reset()
+        else:
+            # O teto é o intervalo aprendido do canal, e não o da reconciliação diária do modo push
+            delay = min(self.retry_delay * 2 ** (failures - 1), self.scheduler.learned_interval(channel_id))
+            delay = max(delay, getattr(error, 'retry_after', 0) or 0)
+        # Espalha as novas tentativas para que não voltem todas no mesmo ciclo
+        self.scheduler.reschedule(channel_id, delay=delay * random.uniform(1, 1.5))
+
+    def _log_failure(self, message, error):
+        # Com o circuito aberto ou sem cota todos os canais restantes falham do mesmo jeito,
+        # e o motivo já foi registrado uma vez
+        if isinstance(error, (CircuitOpen, QuotaExceeded)):
+            logger.debug(message)
+        else:
+            logger.error(message)
+
+    async def resolve_channels(self, index):
+        """Resolve as URLs ainda desconhecidas para IDs de canal"""
+        now = time.time()
+        configured = set(index.urls())
+        for channel_url in set(self.resolved_ids) - configured:
+            del self.resolved_ids[channel_url]
+
+        pending = [
+            channel_url for channel_url in configured
+            if channel_url not in self.resolved_ids and self.resolve_after.get(channel_url, 0) <= now
+        ]
+        async for channel_url, channel_id, error in self.sweeper.map(self._resolve_channel, pending):
+            if not error and not channel_id and self.cluster and not self.cluster.owns(channel_url):
+                # Outro processo é o responsável pela busca; tenta o cache de novo no próximo ciclo
+                continue
+            if error or not channel_id:
+                servers = ', '.join(subscriber.server_id for subscriber in index.by_url[channel_url])
+                logger.warning(f"Não foi possível resolver o canal {channel_url} (servidores: {servers}): {str(error or '')}")
+                self.resolve_after[channel_url] = now + self.scheduler.min_interval
+                continue
+            self.resolved_ids[channel_url] = channel_id
+            self.resolve_after.pop(channel_url, None)
+
+    def _resolve_channel(self, channel_url):
+        """Resolve uma URL; com vários processos só o responsável pela URL faz a busca na API"""
+        search = not self.cluster or self.cluster.owns(channel_url)
+        return self.youtube.resolve_channel_id(channel_url, search=search)
+
+    async def sweep(self):
+        """Verifica os canais cuja verificação venceu; retorna a lista de (inscritos, vídeos, horário da detecção)"""
+        found = []
+        # Outros processos podem ter configurado servidores novos
+        if self.cluster:
+            self.config.reload()
+        index = self.subscriptions.rebuild(self.config.get_all_configs())
+        await self.resolve_channels(index)
+
+        by_channel = index.bind(self.resolved_ids)
+        if self.cluster:
+            by_channel = {
+                channel_id: subscribers for channel_id, subscribers in by_channel.items()
+                if self.cluster.owns(channel_id)
+            }
+        self.scheduler.sync(by_channel)
+        for channel_id in set(self.failures) - set(by_channel):
+            del self.failures[channel_id]
+        due = self.scheduler.pop_due()
+        if not due:
+            return found
+
+        # Estica os intervalos se o consumo projetado não couber no saldo de cota do dia
+        factor = 1.0
+        if self.channel_check_cost:
+            factor = self.youtube.quota.stretch_factor(
+                self.scheduler.checks_per_day() * self.channel_check_cost
+            )
+
+        # Sem cota para todos os canais, verifica primeiro os que publicam com mais frequência
+        due = self.youtube.prioritize(due)
+        affordable = len(due)
+        if self.channel_check_cost:
+            affordable = self.youtube.quota.remaining // self.channel_check_cost
+        if affordable < len(due):
+            logger.warning(f"Cota insuficiente: {len(due) - affordable} canais ficam para depois")
+            SWEEP_CHANNELS.inc(len(due) - affordable, result='deferred')
+            for channel_id in due[affordable:]:
+                self._reschedule(channel_id, factor)
+            due = due[:affordable]
+
+        # Obtém os metadados dos canais em lotes de até 50 IDs
+        batches = [
+            due[start:start + MAX_IDS_PER_REQUEST]
+            for start in range(0, len(due), MAX_IDS_PER_REQUEST)
+        ]
+        metadata = {}
+        failed = {}
+        async for batch, batch_metadata, error in self.sweeper.map(self.youtube.get_channels_metadata, batches):
+            if error:
+                self._log_failure(f"Erro ao obter metadados de {len(batch)} canais: {str(error)}", error)
+                failed.update(dict.fromkeys(batch, error))
+                continue
+            metadata.update(batch_metadata)
+
+        entries = []
+        for channel_id in due:
+            if channel_id in failed:
+                SWEEP_CHANNELS.inc(result='error')
+                self._requeue(channel_id, failed[channel_id])
+                continue
+            if channel_id not in metadata:
+                logger.warning(f"Canal não encontrado: {channel_id}")
+                SWEEP_CHANNELS.inc(result='not_found')
+                self._reschedule(channel_id, factor, delay=self.scheduler.max_interval)
+                continue
+            entries.append((channel_id, by_channel[channel_id], metadata[channel_id]))
+
+        # Busca cada canal uma vez por ciclo e repassa o resultado a todos os inscritos
+        async for (channel_id, subscribers, _), videos, error in self.sweeper.map(self._fetch_channel_videos, entries):
+            if error:
+                self._log_failure(f"Erro ao verificar vídeos do canal {channel_id}: {str(error)}", error)
+                SWEEP_CHANNELS.inc(result='error')
+                self._requeue(channel_id, error)
+                continue
+
+            # Aprende a frequência de uploads do canal e agenda a próxima verificação
+            self.failures.pop(channel_id, None)
+            self.scheduler.learn(channel_id, self.youtube.publish_times.get(channel_id, []))
+            self._reschedule(channel_id, factor)
+
+            SWEEP_CHANNELS.inc(result='checked')
+            for channel_videos in videos.values():
+                for video in channel_videos:
+                    VIDEOS_FOUND.inc(kind='new' if video['is_new_video'] else 'old')
+            if videos:
+                found.append((subscribers, videos, time.time()))
+
+        self.youtube.save_caches()
+        return found
+
+    def snapshot(self):
+        """Estado em memória da detecção, para o snapshot"""
+        return {
+            'scheduler': self.scheduler.snapshot(),
+            'last_backfill': dict(self.last_backfill),
+            'feed': self.youtube.feed.snapshot() if self.youtube.feed else {}
+        }
+
+    def restore(self, state):
+        """Retoma a agenda, os envios de vídeos antigos e os ETags do feed de um snapshot"""
+        self.scheduler.restore(state.get('scheduler', {}))
+        self.last_backfill.update(state.get('last_backfill', {}))
+        if self.youtube.feed:
+            self.youtube.feed.restore(state.get('feed', {}))
+
+    def close(self):
+        """Encerra o pool de workers e grava os caches"""
+        self.sweeper.shutdown()
+        get_transport().close()
+        self.youtube.close()
+
+def run_poller_worker(index, count):
+    """Processo poller: verifica a sua parte dos canais e envia os vídeos ao gateway"""
+    # Com spawn, o processo não herda a configuração de logging do supervisor
+    setup_logging()
+    # Cada poller expõe as suas métricas na porta seguinte à do gateway (METRICS_PORT + 1 + índice)
+    metrics_port = int(os.getenv('METRICS_PORT', '0'))
+    if metrics_port:
+        serve_metrics(metrics_port + 1 + index)
+    sender = EventSender(f"poller-{index}")
+
+    async def notify(subscribers, videos, detected_at):
+        # Os eventos ficam gravados em JSON até o gateway confirmar: inscritos como listas e
+        # os vídeos como pares (include_shorts, vídeos), já que as chaves do JSON são texto
+        sender.send({
+            'type': 'videos',
+            'subscribers': [list(subscriber) for subscriber in subscribers],
+            'videos': list(videos.items()),
+            'detected_at': detected_at,
+        })
+
+    async def main():
+        startup.mark('imports')
+        poller = ChannelPoller(notify, cluster=StaticPartition(index, count))
+        snapshots = SnapshotStore(name=poller.cluster.node_id)
+        state = snapshots.load()
+        if state:
+            poller.restore(state.get('poller', {}))
+        startup.mark('configuração')
+        logger.info(f"Poller {index + 1}/{count} iniciado. {startup.report()}")
+        saved_at = time.monotonic()
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    await poller.tick()
+                except Exception as e:
+                    logger.error(f"Erro no ciclo de verificação: {str(e)}")
+                # Reenvia eventos pendentes caso o gateway tenha voltado
+                sender.flush()
+                if time.monotonic() - saved_at >= SNAPSHOT_INTERVAL:
+                    _save_snapshot(snapshots, poller)
+                    saved_at = time.monotonic()
+                await asyncio.sleep(max(0, POLL_TICK - (time.monotonic() - started)))
+        finally:
+            _save_snapshot(snapshots, poller)
+            poller.close()
+            sender.close()
+            poller.storage.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+def _save_snapshot(snapshots, poller):
+    try:
+        snapshots.save({'poller': poller.snapshot()})
+    except Exception as e:
+        logger.error(f"Erro ao gravar o snapshot: {str(e)}")
+
+def run_pollers(count=None):
+    """Sobe os processos poller e os reinicia se algum terminar"""
+    count = count or int(os.getenv('POLLER_WORKERS', '1'))
+    # spawn evita herdar conexões (SQLite, HTTP) do processo pai
+    context = multiprocessing.get_context('spawn')
+    workers = {}
+    try:
+        while True:
+            for index in range(count):
+                worker = workers.get(index)
+                if worker is None or not worker.is_alive():
+                    if worker is not None:
+                        logger.warning(f"Poller {index + 1} terminou (código {worker.exitcode}); reiniciando")
+                    worker = workers[index] = context.Process(
+                        target=run_poller_worker, args=(index, count), name=f'tubebot-poller-{index}'
+                    )
+                    worker.start()
+            time.sleep(5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers.values():
+            worker.terminate()
+            worker.join()
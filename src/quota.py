@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from .metrics import QUOTA_UNITS, QUOTA_REMAINING
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+logger = logging.getLogger(__name__)
+
+# Custo em unidades de cota de cada endpoint da API de Dados do YouTube
+ENDPOINT_COSTS = {
+    'search.list': 100,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'videos.list': 1,
+}
+
+class QuotaExceeded(Exception):
+    """O orçamento diário de cota não comporta a chamada"""
+
+class QuotaScheduler:
+    """Contabiliza a cota diária da API do YouTube e distribui as verificações ao longo do dia.
+
+    Todas as chamadas passam por acquire(), que debita o custo do endpoint
+    antes de enviar a requisição. Quando o orçamento acaba, as chamadas são
+    recusadas com QuotaExceeded em vez de falharem na API, e o intervalo entre
+    verificações é esticado para caber no que resta do dia (a cota é
+    renovada à meia-noite do horário do Pacífico).
+    """
+
+    def __init__(self, daily_budget=None, storage=None, scope=None, name='default'):
+        if daily_budget is None:
+            daily_budget = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))
+        self.daily_budget = daily_budget
+        self.storage = storage
+        # Identifica a chave da API no armazenamento: todos os processos que usam a mesma chave
+        # (cluster, pollers, gateway) debitam o mesmo contador
+        self.scope = scope
+        # Nome da chave da API nas métricas
+        self.name = name
+        self._lock = threading.Lock()
+        self._day = None
+        self._usage = {}
+        self._exhausted = False
+        self._roll_day()
+        QUOTA_REMAINING.set_function(lambda: self.remaining, key=name)
+
+    def _today(self):
+        return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+    def _roll_day(self):
+        """Zera a contagem quando a cota é renovada"""
+        today = self._today()
+        if today == self._day:
+            return
+
+        self._day = today
+        self._exhausted = False
+        self._usage = {}
+        self._load()
+
+    def _key(self):
+        return f"{self._day}:{self.scope}" if self.scope else self._day
+
+    def _load(self):
+        """Relê o uso do dia no armazenamento, que inclui o que os outros processos gastaram"""
+        if not self.storage:
+            return self._usage
+        try:
+            self._usage = self.storage.get('quota', self._key()) or {}
+        except Exception as e:
+            logger.error(f"Erro ao carregar uso de cota: {str(e)}")
+        return self._usage
+
+    def _debit(self, endpoint, units):
+        """Soma as unidades ao uso do dia; levanta QuotaExceeded se o orçamento não comportar"""
+        while True:
+            current = self._load()
+            used = sum(current.values())
+            if self._exhausted or used + units > self.daily_budget:
+                raise QuotaExceeded(
+                    f"Cota diária esgotada ({used}/{self.daily_budget} unidades) para {endpoint}"
+                )
+            usage = dict(current, **{endpoint: current.get(endpoint, 0) + units})
+            if not self.storage:
+                self._usage = usage
+                return
+            try:
+                # No SQLite a gravação só acontece se nenhum outro processo debitou a chave
+                # desde a leitura; caso contrário, lê de novo e tenta outra vez
+                if not hasattr(self.storage, 'compare_and_set'):
+                    self.storage.set('quota', self._key(), usage)
+                elif not self.storage.compare_and_set('quota', self._key(), current or None, usage):
+                    continue
+            except Exception as e:
+                logger.error(f"Erro ao salvar uso de cota: {str(e)}")
+            self._usage = usage
+            return
+
+    @property
+    def used(self):
+        """Unidades consumidas hoje, por todos os processos que usam a chave"""
+        with self._lock:
+            self._roll_day()
+            return sum(self._load().values())
+
+    @property
+    def remaining(self):
+        """Unidades restantes hoje"""
+        used = self.used
+        if self._exhausted:
+            return 0
+        return max(0, self.daily_budget - used)
+
+    def can_afford(self, units):
+        """Verifica se o orçamento restante comporta a quantidade de unidades"""
+        return units <= self.remaining
+
+    def acquire(self, endpoint, units=None):
+        """Debita o custo de uma chamada, ou levanta QuotaExceeded se não houver saldo"""
+        if units is None:
+            units = ENDPOINT_COSTS.get(endpoint, 1)
+
+        with self._lock:
+            self._roll_day()
+            self._debit(endpoint, units)
+        QUOTA_UNITS.inc(units, endpoint=endpoint, key=self.name)
+
+    def exhaust(self):
+        """Marca a cota do dia como esgotada (por exemplo, após um erro quotaExceeded da API)"""
+        with self._lock:
+            self._roll_day()
+            self._exhausted = True
+
+    def seconds_until_reset(self):
+        """Segundos até a renovação da cota"""
+        now = datetime.now(QUOTA_TIMEZONE)
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return max(1, (tomorrow - now).total_seconds())
+
+    def stretch_factor(self, units_per_day):
+        """Fator pelo qual os intervalos de verificação devem ser esticados.
+
+        Projeta o consumo diário até a renovação da cota e, se ele passar do
+        saldo restante, retorna a proporção necessária para que o orçamento
+        dure até o fim do dia. Retorna None quando não há mais saldo.
+        """
+        remaining = self.remaining
+        if remaining <= 0:
+            return None
+
+        projected = units_per_day * self.seconds_until_reset() / 86400
+        return max(1.0, projected / remaining)
+
+def is_quota_error(error):
+    """Verifica se um HttpError indica cota esgotada"""
+    content = getattr(error, 'content', b'') or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'ignore')
+    return 'quotaExceeded' in content or 'dailyLimitExceeded' in content
+
+def error_reason(error):
+    """Motivo informado pela API em um HttpError (quotaExceeded, backendError, ...)"""
+    content = getattr(error, 'content', b'') or b''
+    try:
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'ignore')
+        errors = json.loads(content).get('error', {}).get('errors') or [{}]
+        return errors[0].get('reason') or 'unknown'
+    except (ValueError, AttributeError):
+        return 'unknown'
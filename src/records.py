@@ -0,0 +1,84 @@
+class ChannelRecord:
+    """Metadados de um canal do YouTube (channels.list)"""
+
+    __slots__ = ('channel_id', 'title', 'icon_url', 'uploads_playlist_id')
+
+    def __init__(self, channel_id, title, icon_url, uploads_playlist_id):
+        self.channel_id = channel_id
+        self.title = title
+        self.icon_url = icon_url
+        self.uploads_playlist_id = uploads_playlist_id
+
+    @classmethod
+    def from_api(cls, item):
+        """Cria o registro a partir de um item da resposta de channels.list"""
+        snippet = item['snippet']
+        return cls(
+            item['id'],
+            snippet['title'],
+            snippet['thumbnails']['default']['url'],
+            item['contentDetails']['relatedPlaylists']['uploads']
+        )
+
+    def to_value(self):
+        """Forma serializável para o cache de metadados"""
+        return [self.title, self.icon_url, self.uploads_playlist_id]
+
+    @classmethod
+    def from_value(cls, channel_id, value):
+        return cls(channel_id, *value)
+
+    def __repr__(self):
+        return f"ChannelRecord({self.channel_id!r}, {self.title!r})"
+
+class VideoRecord:
+    """Um upload de um canal, vindo de playlistItems.list, do feed Atom ou de uma notificação por push"""
+
+    __slots__ = ('video_id', 'title', 'published_at', 'thumbnail_url')
+
+    def __init__(self, video_id, title, published_at, thumbnail_url=None):
+        self.video_id = video_id
+        self.title = title
+        # Data de publicação no formato da API (2024-01-31T12:00:00Z), comparável como texto
+        self.published_at = published_at
+        self.thumbnail_url = thumbnail_url or f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+
+    @classmethod
+    def from_api(cls, item):
+        """Cria o registro a partir de um item da resposta de playlistItems.list"""
+        snippet = item['snippet']
+        return cls(
+            snippet['resourceId']['videoId'],
+            snippet['title'],
+            snippet['publishedAt'],
+            snippet.get('thumbnails', {}).get('high', {}).get('url')
+        )
+
+    def to_value(self):
+        """Forma serializável, usada no snapshot do feed"""
+        return [self.video_id, self.title, self.published_at, self.thumbnail_url]
+
+    @classmethod
+    def from_value(cls, value):
+        # Snapshots antigos traziam também a descrição, que não é mais lida
+        return cls(*value[:4])
+
+    def __repr__(self):
+        return f"VideoRecord({self.video_id!r}, {self.published_at!r})"
+
+class UploadsPage:
+    """Uma página de uploads do canal, do mais novo para o mais antigo, e o token da próxima página"""
+
+    __slots__ = ('items', 'next_page_token')
+
+    def __init__(self, items, next_page_token=None):
+        self.items = items
+        self.next_page_token = next_page_token
+
+    @classmethod
+    def from_api(cls, response):
+        """Cria a página a partir de uma resposta de playlistItems.list"""
+        return cls(
+            [VideoRecord.from_api(item) for item in response.get('items', [])],
+            response.get('nextPageToken')
+        )
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .quota import QuotaExceeded, error_reason
+from .metrics import CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+# Respostas da API que indicam uma falha passageira do serviço, e não um problema da requisição
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+TRANSIENT_REASONS = {'backendError', 'internalError', 'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# Erros 4xx que invalidam a chave da API até que ela seja corrigida no Google Cloud Console. Um 'forbidden'
+# genérico (vídeo privado, playlist sem acesso) fala da requisição, não da chave, e fica fora daqui
+KEY_ERROR_REASONS = {'keyInvalid', 'keyExpired', 'accessNotConfigured', 'ipRefererBlocked'}
+# Tempo que o circuito de uma chave recusada pela API fica aberto
+KEY_ERROR_TIMEOUT = 3600
+
+class CircuitOpen(Exception):
+    """O circuito do endpoint ou da chave está aberto; a chamada nem chegou a ser feita"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuito {name} aberto; nova tentativa em {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+def _status(error):
+    try:
+        return int(getattr(getattr(error, 'resp', None), 'status', 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def is_transient(error):
+    """Verifica se a falha é passageira (5xx, 429, limite de taxa ou erro de rede) e vale uma nova tentativa"""
+    if getattr(error, 'resp', None) is not None and hasattr(error, 'content'):
+        return _status(error) in TRANSIENT_STATUS or error_reason(error) in TRANSIENT_REASONS
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return True
+    # Os erros de rede do httpx (HTTP2=1) e do aiohttp (cliente assíncrono da API) não herdam de OSError
+    httpx = sys.modules.get('httpx')
+    aiohttp = sys.modules.get('aiohttp')
+    return (
+        (httpx is not None and isinstance(error, httpx.TransportError))
+        or (aiohttp is not None and isinstance(error, aiohttp.ClientError))
+    )
+
+def is_key_error(error):
+    """Verifica se a API recusou a chave (inválida, expirada ou sem a API ativada)"""
+    return getattr(error, 'resp', None) is not None and error_reason(error) in KEY_ERROR_REASONS
+
+def is_retryable(error):
+    """Falhas da API, e não do canal: a verificação deve ser repetida assim que a API voltar"""
+    return isinstance(error, (CircuitOpen, QuotaExceeded)) or is_transient(error)
+
+def retry_after(error):
+    """Segundos pedidos pelo cabeçalho Retry-After de um HttpError, se houver"""
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Novas tentativas com backoff exponencial e jitter para as falhas passageiras da API.
+
+    A espera antes da tentativa n é sorteada entre 0 e base_delay * 2^n
+    (limitada a max_delay), para que os workers da varredura não voltem todos
+    ao mesmo tempo. Quando a API envia Retry-After, o valor informado é
+    respeitado; se ele passar de max_delay, não há nova tentativa e o
+    circuito fica aberto por esse tempo.
+    """
+
+    def __init__(self, attempts=None, base_delay=None, max_delay=None):
+        self.attempts = max(1, attempts or int(os.getenv('YOUTUBE_RETRY_ATTEMPTS', '3')))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('YOUTUBE_RETRY_BASE_DELAY', '1'))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('YOUTUBE_RETRY_MAX_DELAY', '10'))
+
+    def delay(self, attempt, error=None):
+        """Espera antes da próxima tentativa (attempt começa em 0)"""
+        requested = retry_after(error)
+        if requested is not None:
+            return requested
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class CircuitBreaker:
+    """Disjuntor de um endpoint ou de uma chave da API.
+
+    Depois de failure_threshold falhas seguidas o circuito abre, e as chamadas
+    são recusadas com CircuitOpen sem gastar cota nem esperar pela API,
+    durante reset_timeout segundos. Passado esse tempo, as chamadas voltam a
+    ser feitas: o primeiro sucesso fecha o circuito e a primeira falha o abre
+    de novo.
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+        self.reset_timeout = reset_timeout or float(os.getenv('CIRCUIT_RESET_TIMEOUT', '60'))
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0
+        CIRCUIT_OPEN.set_function(lambda: int(self.is_open), breaker=name)
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self._open_until
+
+    @property
+    def retry_after(self):
+        """Segundos até o circuito deixar as chamadas passarem de novo"""
+        return max(0.0, self._open_until - time.monotonic())
+
+    def before_call(self):
+        """Levanta CircuitOpen enquanto o circuito estiver aberto"""
+        remaining = self.retry_after
+        if remaining > 0:
+            raise CircuitOpen(self.name, remaining)
+
+    def record_success(self):
+        with self._lock:
+            was_open = self._open_until
+            self._failures = 0
+            self._open_until = 0
+        if was_open:
+            logger.info(f"Circuito {self.name} fechado")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            now = time.monotonic()
+            if now < self._open_until:
+                return
+            # Passado o tempo de circuito aberto, a primeira falha já o abre de novo
+            if not self._open_until and self._failures < self.failure_threshold:
+                return
+        self.trip(self.reset_timeout)
+
+    def trip(self, duration):
+        """Abre o circuito por duration segundos"""
+        with self._lock:
+            self._open_until = max(self._open_until, time.monotonic() + duration)
+        logger.warning(f"Circuito {self.name} aberto por {duration:.0f}s")
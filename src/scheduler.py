@@ -0,0 +1,138 @@
+import heapq
+import os
+import random
+import statistics
+import threading
+import time
+
+class PollScheduler:
+    """Agenda a verificação de cada canal do YouTube de forma independente.
+
+    Os canais ficam em uma fila de prioridade (heap) ordenada pelo horário da
+    próxima verificação. O intervalo de cada canal é aprendido a partir das
+    datas de publicação dos seus vídeos: canais ativos são verificados com
+    mais frequência e canais parados vão sendo espaçados, com uma variação
+    aleatória (jitter) para que a carga fique distribuída em vez de chegar em
+    rajadas. Com fixed_interval (modo push, em que a consulta é só uma
+    reconciliação), todos os canais usam esse intervalo; o intervalo aprendido
+    continua valendo para as novas tentativas após falhas.
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, default_interval=None, jitter=None):
+        self.min_interval = min_interval or int(os.getenv('POLL_MIN_INTERVAL', '900'))
+        self.max_interval = max_interval or int(os.getenv('POLL_MAX_INTERVAL', '86400'))
+        self.default_interval = default_interval or int(os.getenv('POLL_DEFAULT_INTERVAL', '14400'))
+        self.jitter = jitter if jitter is not None else float(os.getenv('POLL_JITTER', '0.1'))
+        self.fixed_interval = None
+        self._lock = threading.Lock()
+        self._heap = []
+        self._due = {}
+        self._intervals = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._due
+
+    def _push(self, channel_id, due):
+        self._due[channel_id] = due
+        heapq.heappush(self._heap, (due, channel_id))
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def sync(self, channel_ids, now=None):
+        """Inclui canais novos e remove os que não têm mais inscritos.
+
+        Canais novos são espalhados ao longo do intervalo mínimo para não
+        serem todos verificados no mesmo instante.
+        """
+        now = now or time.time()
+        channel_ids = set(channel_ids)
+        with self._lock:
+            for channel_id in channel_ids - set(self._due):
+                self._push(channel_id, now + random.uniform(0, self.min_interval))
+
+            # As entradas antigas do heap são descartadas em pop_due
+            for channel_id in set(self._due) - channel_ids:
+                del self._due[channel_id]
+                self._intervals.pop(channel_id, None)
+
+    def pop_due(self, now=None, limit=None):
+        """Retira da fila os canais cuja verificação já venceu, do mais atrasado ao mais recente"""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+                due_at, channel_id = heapq.heappop(self._heap)
+                if self._due.get(channel_id) != due_at:
+                    continue
+                del self._due[channel_id]
+                due.append(channel_id)
+        return due
+
+    def learn(self, channel_id, publish_times, now=None):
+        """Recalcula o intervalo do canal a partir das datas de publicação (timestamps)"""
+        now = now or time.time()
+        publish_times = sorted(publish_times, reverse=True)
+        if len(publish_times) < 2:
+            interval = self.max_interval if publish_times else self.default_interval
+        else:
+            gaps = [newer - older for newer, older in zip(publish_times, publish_times[1:])]
+            cadence = max(statistics.median(gaps), 1)
+            since_last = max(now - publish_times[0], 0)
+            # Verifica cerca de 4 vezes por intervalo típico entre uploads,
+            # espaçando conforme o canal fica mais tempo sem publicar
+            interval = max(cadence, since_last / 2) / 4
+
+        with self._lock:
+            self._intervals[channel_id] = min(self.max_interval, max(self.min_interval, interval))
+
+    def interval(self, channel_id):
+        """Intervalo atual de verificação do canal"""
+        return self.fixed_interval or self.learned_interval(channel_id)
+
+    def learned_interval(self, channel_id):
+        """Intervalo aprendido a partir das publicações do canal, mesmo com fixed_interval"""
+        return self._intervals.get(channel_id, self.default_interval)
+
+    def reschedule(self, channel_id, now=None, factor=1.0, delay=None):
+        """Agenda a próxima verificação do canal.
+
+        factor estica o intervalo (por exemplo, quando a cota está acabando);
+        delay força um atraso específico.
+        """
+        now = now or time.time()
+        if delay is None:
+            delay = self._jittered(self.interval(channel_id) * factor)
+        with self._lock:
+            self._push(channel_id, now + delay)
+
+    def snapshot(self):
+        """Horários das próximas verificações e intervalos aprendidos, para o snapshot"""
+        with self._lock:
+            return {'due': dict(self._due), 'intervals': dict(self._intervals)}
+
+    def restore(self, state, now=None):
+        """Retoma a agenda de um snapshot.
+
+        Verificações que venceram enquanto o bot estava parado são espalhadas
+        ao longo do intervalo mínimo, na ordem em que venceram, em vez de
+        acontecerem todas de uma vez.
+        """
+        now = now or time.time()
+        with self._lock:
+            self._intervals.update(state.get('intervals', {}))
+            overdue = sorted((due, channel_id) for channel_id, due in state.get('due', {}).items() if due <= now)
+            for channel_id, due in state.get('due', {}).items():
+                if due > now:
+                    self._push(channel_id, due)
+            for position, (_, channel_id) in enumerate(overdue):
+                self._push(channel_id, now + self.min_interval * position / len(overdue))
+
+    def checks_per_day(self):
+        """Número estimado de verificações por dia com os intervalos atuais"""
+        with self._lock:
+            channel_ids = set(self._due) | set(self._intervals)
+            return sum(86400 / self.interval(channel_id) for channel_id in channel_ids)
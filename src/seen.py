@@ -0,0 +1,56 @@
+import os
+from collections import deque
+
+# Quantidade de vídeos lembrados por canal; precisa ser maior que uma página de uploads (50)
+SEEN_SET_SIZE = int(os.getenv('SEEN_SET_SIZE', '200'))
+
+class SeenSet:
+    """Vídeos já enviados de um canal, com memória fixa.
+
+    Mantém a ordem em um deque limitado e um set para consultas O(1); ao
+    atingir o limite, o vídeo mais antigo é esquecido. O watermark guarda a
+    data de publicação do upload mais recente já processado, separando os
+    uploads novos dos antigos.
+    """
+
+    __slots__ = ('maxlen', 'watermark', '_order', '_ids')
+
+    def __init__(self, video_ids=(), watermark=None, maxlen=None):
+        self.maxlen = maxlen or SEEN_SET_SIZE
+        self.watermark = watermark
+        self._order = deque()
+        self._ids = set()
+        for video_id in video_ids:
+            self.add(video_id)
+
+    def add(self, video_id):
+        """Registra um vídeo como visto"""
+        if video_id in self._ids:
+            return
+        if len(self._order) >= self.maxlen:
+            self._ids.discard(self._order.popleft())
+        self._order.append(video_id)
+        self._ids.add(video_id)
+
+    def __contains__(self, video_id):
+        return video_id in self._ids
+
+    def __len__(self):
+        return len(self._order)
+
+    def to_value(self):
+        """Representação serializável para o armazenamento"""
+        return {'ids': list(self._order), 'watermark': self.watermark}
+
+    @classmethod
+    def from_value(cls, value):
+        """Cria o conjunto a partir do armazenamento.
+
+        Aceita o formato antigo do cache, em que cada canal guardava apenas o
+        ID do último vídeo enviado.
+        """
+        if isinstance(value, str):
+            return cls([value])
+        if isinstance(value, list):
+            return cls(value)
+        return cls(value.get('ids', []), value.get('watermark'))
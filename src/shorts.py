@@ -0,0 +1,107 @@
+import logging
+import os
+import re
+import threading
+import time
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Duração máxima de um short em segundos (3 minutos desde outubro de 2024; antes eram 60 segundos)
+SHORTS_MAX_DURATION = int(os.getenv('SHORTS_MAX_DURATION', '180'))
+# Tempo (em segundos) até consultar de novo um vídeo que a API não retornou (privado ou removido)
+SHORTS_MISSING_TTL = int(os.getenv('SHORTS_MISSING_TTL', str(6 * 3600)))
+
+_ISO_DURATION = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+def parse_duration(value):
+    """Converte uma duração ISO 8601 da API (por exemplo, PT1M5S) em segundos; None se não for reconhecida"""
+    match = _ISO_DURATION.match(value or '')
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+class ShortsClassifier:
+    """Classifica vídeos como shorts pela duração informada em videos().list(part='contentDetails').
+
+    A duração de um vídeo publicado não muda, então fica guardada para sempre
+    no armazenamento: cada vídeo é consultado uma única vez e as verificações
+    seguintes viram consultas ao cache. Lives e estreias (duração zero) não
+    são guardadas, pois a duração só é conhecida quando terminam. Vídeos que
+    a API não retorna (privados ou removidos) ficam em um cache negativo por
+    missing_ttl segundos, em vez de serem consultados a cada verificação.
+    """
+
+    def __init__(self, fetch_durations, storage=None, max_duration=None, missing_ttl=None):
+        # fetch_durations recebe uma lista de IDs e retorna {ID do vídeo: duração em segundos}
+        self.fetch_durations = fetch_durations
+        self.storage = storage
+        self.max_duration = max_duration or SHORTS_MAX_DURATION
+        self.missing_ttl = missing_ttl if missing_ttl is not None else SHORTS_MISSING_TTL
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._missing = {}  # ID do vídeo -> horário até o qual ele não é consultado de novo
+        if storage:
+            try:
+                self._durations = storage.get_all('video_durations')
+                self._missing = storage.get_all('video_durations_missing')
+                # Vídeos removidos somem da playlist e nunca seriam consultados de novo
+                expired = [video_id for video_id, expires_at in self._missing.items() if expires_at <= time.time()]
+                if expired:
+                    with storage.batch():
+                        for video_id in expired:
+                            storage.delete('video_durations_missing', video_id)
+                            del self._missing[video_id]
+            except Exception as e:
+                logger.error(f"Erro ao carregar durações dos vídeos: {str(e)}")
+
+    def classify(self, video_ids):
+        """Retorna {ID do vídeo: é short}; vídeos que a API não retornou ficam de fora"""
+        now = time.time()
+        with self._lock:
+            unique = dict.fromkeys(video_ids)
+            missing = [
+                video_id for video_id in unique
+                if video_id not in self._durations and self._missing.get(video_id, 0) <= now
+            ]
+        CACHE_REQUESTS.inc(len(unique) - len(missing), cache='video_durations', result='hit')
+        CACHE_REQUESTS.inc(len(missing), cache='video_durations', result='miss')
+
+        fetched = self.fetch_durations(missing) if missing else {}
+        if missing:
+            self._store(
+                {video_id: duration for video_id, duration in fetched.items() if duration},
+                [video_id for video_id in missing if video_id not in fetched],
+                now + self.missing_ttl
+            )
+
+        result = {}
+        with self._lock:
+            for video_id in video_ids:
+                duration = self._durations.get(video_id, fetched.get(video_id))
+                if duration is not None:
+                    result[video_id] = 0 < duration <= self.max_duration
+        return result
+
+    def _store(self, durations, not_returned=(), expires_at=None):
+        """Guarda as durações obtidas e o cache negativo dos vídeos que a API não retornou"""
+        with self._lock:
+            self._durations.update(durations)
+            # Um vídeo que voltou a aparecer (por exemplo, privado que virou público) sai do cache negativo
+            resolved = [video_id for video_id in durations if self._missing.pop(video_id, None) is not None]
+            self._missing.update(dict.fromkeys(not_returned, expires_at))
+
+        if not self.storage or not (durations or not_returned):
+            return
+        try:
+            with self.storage.batch():
+                for video_id, duration in durations.items():
+                    self.storage.set('video_durations', video_id, duration)
+                for video_id in resolved:
+                    self.storage.delete('video_durations_missing', video_id)
+                for video_id in not_returned:
+                    self.storage.set('video_durations_missing', video_id, expires_at)
+        except Exception as e:
+            logger.error(f"Erro ao salvar durações dos vídeos: {str(e)}")
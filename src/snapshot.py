@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Frequência com que o snapshot é gravado (além do encerramento)
+SNAPSHOT_INTERVAL = 60
+
+# Identifica o formato do arquivo; muda se a estrutura do snapshot mudar
+SNAPSHOT_MAGIC = b'TBSNAP1\n'
+
+class SnapshotStore:
+    """Snapshot binário compacto do estado em memória, usado para retomar o trabalho após reiniciar.
+
+    O estado (agenda dos canais, ETags, notificações pendentes, configurações
+    em andamento) é gravado como JSON comprimido com zlib, em um arquivo
+    temporário que substitui o anterior de uma vez, então uma queda durante a
+    gravação mantém o snapshot anterior intacto.
+    """
+
+    def __init__(self, name=None, path=None):
+        path = path or os.getenv('SNAPSHOT_PATH', 'data/snapshot.bin')
+        if name:
+            # Cada processo (nó do cluster ou poller) tem o seu próprio arquivo
+            base, extension = os.path.splitext(path)
+            safe_name = ''.join(char if char.isalnum() or char in '-_' else '-' for char in name)
+            path = f"{base}-{safe_name}{extension}"
+        self.path = path
+
+    def save(self, state):
+        """Grava o estado; retorna o tamanho do arquivo em bytes"""
+        state = dict(state, saved_at=time.time())
+        data = SNAPSHOT_MAGIC + zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        return len(data)
+
+    def load(self):
+        """Lê o último snapshot, ou None se não existir ou estiver em um formato desconhecido"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(SNAPSHOT_MAGIC):
+                logger.warning(f"Snapshot {self.path} em formato desconhecido; ignorado")
+                return None
+            return json.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]).decode('utf-8'))
+        except Exception as e:
+            logger.error(f"Erro ao ler o snapshot {self.path}: {str(e)}")
+            return None
@@ -0,0 +1,25 @@
+import time
+
+class StartupTimer:
+    """Mede o tempo de cada etapa da inicialização (imports, configuração, cliente da API)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self._last = self.started
+
+    def mark(self, stage):
+        """Registra o tempo gasto desde a marcação anterior"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stages)
+        return f"Inicialização em {self.elapsed():.2f}s ({stages})"
+
+# Criado na importação do módulo, que o main.py faz antes de qualquer outro
+startup = StartupTimer()
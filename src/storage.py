@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Arquivos JSON usados antes do armazenamento transacional, migrados automaticamente
+LEGACY_FILES = {
+    'config': 'data/config.json',
+    'video_cache': 'data/youtube_cache.json',
+    'channel_ids': 'data/channel_ids_cache.json',
+    'channel_metadata': 'data/channel_metadata_cache.json',
+}
+
+class _Connection(sqlite3.Connection):
+    """Conexão que aceita referência fraca, para ser fechada junto com a thread que a abriu"""
+
+class SQLiteStorage:
+    """Armazenamento chave-valor em SQLite (modo WAL) com upserts por chave.
+
+    Cada gravação custa O(chaves alteradas). Dentro de batch() os commits são
+    adiados até o fim do bloco, agrupando as gravações em uma única transação
+    atômica: se o bloco levantar uma exceção, nada do que foi gravado nele é
+    confirmado.
+
+    Cada thread usa a sua própria conexão e o seu próprio batch(), então as
+    gravações de outras threads (o débito de cota, por exemplo) nunca entram
+    na transação de um batch aberto nem são desfeitas junto com ele.
+    """
+
+    def __init__(self, path='data/tubebot.db'):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS kv ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        self._migrate_legacy_files()
+
+    @property
+    def _conn(self):
+        """Conexão da thread atual, aberta no primeiro uso e fechada quando a thread termina"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # O mesmo banco pode ser compartilhado por vários processos (modo cluster) e por várias
+            # threads; quem encontra o banco bloqueado aguarda até 30 segundos
+            conn = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False, isolation_level=None, factory=_Connection
+            )
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.batch_depth = 0
+            self._local.batch_failed = False
+            with self._connections_lock:
+                self._connections.add(conn)
+        return conn
+
+    def _migrate_legacy_files(self):
+        """Importa os arquivos JSON antigos na primeira execução"""
+        for namespace, legacy_file in LEGACY_FILES.items():
+            if not os.path.exists(legacy_file) or self.get_all(namespace):
+                continue
+
+            try:
+                with open(legacy_file, 'r') as f:
+                    data = json.load(f)
+                with self.batch():
+                    for key, value in data.items():
+                        self.set(namespace, key, value)
+                os.replace(legacy_file, f"{legacy_file}.migrated")
+                logger.info(f"Migrados {len(data)} registros de {legacy_file} para {self.path}")
+            except Exception as e:
+                logger.error(f"Erro ao migrar {legacy_file}: {str(e)}")
+
+    def get_all(self, namespace):
+        """Obtém todos os registros de um namespace"""
+        rows = self._conn.execute(
+            'SELECT key, value FROM kv WHERE namespace = ?', (namespace,)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def get(self, namespace, key, default=None):
+        """Obtém um registro"""
+        row = self._conn.execute(
+            'SELECT value FROM kv WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def compare_and_set(self, namespace, key, expected, value):
+        """Grava o registro apenas se o valor atual for expected (None = inexistente).
+
+        A comparação e a escrita acontecem no mesmo comando SQL, então a
+        operação é atômica mesmo entre processos. Retorna se gravou.
+        """
+        self._begin()
+        if expected is None:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO kv (namespace, key, value) VALUES (?, ?, ?)',
+                (namespace, key, json.dumps(value))
+            )
+        else:
+            cursor = self._conn.execute(
+                'UPDATE kv SET value = ? WHERE namespace = ? AND key = ? AND value = ?',
+                (json.dumps(value), namespace, key, json.dumps(expected))
+            )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def set(self, namespace, key, value):
+        """Grava (ou atualiza) um registro"""
+        self._begin()
+        self._conn.execute(
+            'INSERT INTO kv (namespace, key, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value',
+            (namespace, key, json.dumps(value))
+        )
+        self._commit()
+
+    def delete(self, namespace, key):
+        """Remove um registro"""
+        self._begin()
+        self._conn.execute('DELETE FROM kv WHERE namespace = ? AND key = ?', (namespace, key))
+        self._commit()
+
+    @contextmanager
+    def batch(self):
+        """Agrupa as gravações do bloco (na thread atual) em uma única transação, desfeita se o bloco falhar"""
+        self._begin()
+        local = self._local
+        local.batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            local.batch_failed = True
+            raise
+        finally:
+            local.batch_depth -= 1
+            if local.batch_depth == 0 and local.batch_failed:
+                local.batch_failed = False
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+            else:
+                self._commit()
+
+    def _begin(self):
+        if not self._conn.in_transaction:
+            # IMMEDIATE reserva a escrita já no início, evitando conflitos entre processos
+            self._conn.execute('BEGIN IMMEDIATE')
+
+    def _commit(self):
+        if self._local.batch_depth == 0 and self._conn.in_transaction:
+            self._conn.execute('COMMIT')
+
+    def close(self):
+        """Fecha as conexões com o banco"""
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            if conn.in_transaction:
+                conn.execute('COMMIT')
+            conn.close()
+        self._local = threading.local()
+
+
+class JSONStorage:
+    """Armazenamento em arquivos JSON, um por namespace (formato original do bot).
+
+    Cada gravação reescreve o arquivo inteiro do namespace, mas de forma
+    atômica (arquivo temporário + rename), então uma falha no meio da escrita
+    não corrompe os dados.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._data = {}
+        self._dirty = set()
+
+    def _file(self, namespace):
+        return LEGACY_FILES.get(namespace, f'data/{namespace}.json')
+
+    def _namespace(self, namespace):
+        if namespace not in self._data:
+            data = {}
+            try:
+                if os.path.exists(self._file(namespace)):
+                    with open(self._file(namespace), 'r') as f:
+                        data = json.load(f)
+            except Exception as e:
+                logger.error(f"Erro ao carregar {self._file(namespace)}: {str(e)}")
+            self._data[namespace] = data
+        return self._data[namespace]
+
+    def get_all(self, namespace):
+        """Obtém todos os registros de um namespace"""
+        with self._lock:
+            return dict(self._namespace(namespace))
+
+    def get(self, namespace, key, default=None):
+        """Obtém um registro"""
+        with self._lock:
+            return self._namespace(namespace).get(key, default)
+
+    def set(self, namespace, key, value):
+        """Grava (ou atualiza) um registro"""
+        with self._lock:
+            self._namespace(namespace)[key] = value
+            self._dirty.add(namespace)
+            self._flush()
+
+    def delete(self, namespace, key):
+        """Remove um registro"""
+        with self._lock:
+            if self._namespace(namespace).pop(key, None) is not None:
+                self._dirty.add(namespace)
+                self._flush()
+
+    @contextmanager
+    def batch(self):
+        """Adia a escrita dos arquivos até o fim do bloco"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                self._flush()
+
+    def _flush(self):
+        if self._batch_depth > 0:
+            return
+
+        for namespace in list(self._dirty):
+            path = self._file(namespace)
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(self._data[namespace], f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+                self._dirty.discard(namespace)
+            except Exception as e:
+                logger.error(f"Erro ao salvar {path}: {str(e)}")
+
+    def close(self):
+        """Grava o que estiver pendente"""
+        with self._lock:
+            self._flush()
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """Obtém o armazenamento compartilhado, escolhido pela variável STORAGE_BACKEND"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            backend = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+            if backend == 'json':
+                _storage = JSONStorage()
+            elif backend == 'sqlite':
+                _storage = SQLiteStorage(os.getenv('STORAGE_PATH', 'data/tubebot.db'))
+            else:
+                raise ValueError(f"STORAGE_BACKEND inválido: {backend}. Use 'sqlite' ou 'json'")
+        return _storage
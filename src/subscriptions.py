@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+# Um servidor inscrito em um canal do YouTube
+Subscriber = namedtuple('Subscriber', ['server_id', 'notification_channel', 'include_shorts'])
+
+class SubscriptionIndex:
+    """Índice invertido que agrupa os servidores pelo canal do YouTube que acompanham"""
+
+    def __init__(self):
+        self.by_url = {}
+        self.by_channel = {}
+
+    def rebuild(self, configs):
+        """Reconstrói o índice de URLs a partir das configurações dos servidores"""
+        by_url = {}
+        for server_id, config in configs.items():
+            channel_url = config.get('youtube_channel_url')
+            if not channel_url:
+                continue
+
+            by_url.setdefault(channel_url, []).append(Subscriber(
+                server_id,
+                config['notification_channel'],
+                config.get('include_shorts', False)
+            ))
+
+        self.by_url = by_url
+        return self
+
+    def urls(self):
+        """URLs únicas configuradas em todos os servidores"""
+        return list(self.by_url)
+
+    def bind(self, resolved_ids):
+        """Agrupa os inscritos pelo ID do canal a partir de um dicionário {url: channel_id}"""
+        by_channel = {}
+        for channel_url, subscribers in self.by_url.items():
+            channel_id = resolved_ids.get(channel_url)
+            if channel_id:
+                by_channel.setdefault(channel_id, []).extend(subscribers)
+
+        self.by_channel = by_channel
+        return by_channel
+
+    def subscribers(self, channel_id):
+        """Servidores inscritos em um canal"""
+        return self.by_channel.get(channel_id, [])
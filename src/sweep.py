@@ -0,0 +1,62 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+class SweepEngine:
+    """Executa as chamadas bloqueantes da API do YouTube fora do event loop do Discord"""
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = int(os.getenv('SWEEP_CONCURRENCY', '8'))
+        self.max_workers = max(1, max_workers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='tubebot-sweep'
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Executa uma função bloqueante no pool de workers e aguarda o resultado"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def map(self, func, items):
+        """Executa func(item) para cada item com concorrência limitada.
+
+        Os resultados voltam para quem chamou conforme ficam prontos, na forma
+        (item, resultado, erro), de modo que o tempo da varredura cresce com o
+        limite de concorrência e não com o número de servidores.
+        """
+        iterator = iter(items)
+        pending = set()
+        # Mantém no máximo o dobro de workers em voo para não criar uma tarefa por servidor
+        in_flight = self.max_workers * 2
+
+        def submit_next():
+            for item in iterator:
+                pending.add(asyncio.ensure_future(self._call(func, item)))
+                return
+
+        for _ in range(in_flight):
+            submit_next()
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    submit_next()
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, func, item):
+        try:
+            return item, await self.run(func, item), None
+        except Exception as e:
+            return item, None, e
+
+    def shutdown(self):
+        """Encerra o pool de workers"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import HTTP_POOL_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class HTTPTransport:
+    """Camada HTTP compartilhada pela API do YouTube, pelo feed Atom e pelo scraper.
+
+    Mantém um pool de conexões keep-alive por host (tamanhos ajustáveis por
+    host), aplica um timeout padrão e, opcionalmente, usa HTTP/2 pelo pacote
+    httpx. stats() informa, por host, quantas requisições reaproveitaram uma
+    conexão do pool (hits) e quantas precisaram abrir uma nova (misses).
+    """
+
+    def __init__(self, pool_size=None, timeout=None, host_pool_sizes=None, http2=None):
+        self.pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', os.getenv('SWEEP_CONCURRENCY', '8')))
+        self.timeout = timeout or float(os.getenv('HTTP_TIMEOUT', '30'))
+        if host_pool_sizes is None:
+            host_pool_sizes = _parse_host_pool_sizes(os.getenv('HTTP_HOST_POOL_SIZES', ''))
+        self.host_pool_sizes = host_pool_sizes
+        if http2 is None:
+            http2 = os.getenv('HTTP2', '0').lower() in ('1', 'true', 'yes')
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._http2_stats = {}
+        if http2:
+            try:
+                import httpx
+                self._client = httpx.Client(
+                    http2=True,
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+                )
+            except ImportError:
+                logger.warning("HTTP/2 requer o pacote httpx[http2]; usando HTTP/1.1")
+
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=self.pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=self.pool_size))
+        for host, size in self.host_pool_sizes.items():
+            self.session.mount(f'https://{host}/', HTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+        HTTP_POOL_REQUESTS.set_collector(self._metric_samples)
+
+    @property
+    def http2(self):
+        return self._client is not None
+
+    def request(self, method, url, params=None, headers=None, data=None, timeout=None):
+        """Envia uma requisição e retorna a resposta já lida"""
+        timeout = timeout or self.timeout
+        if self._client is not None:
+            response = self._client.request(method, url, params=params, headers=headers, content=data, timeout=timeout)
+            self._count_http2(response)
+            return response
+
+        return self.session.request(method, url, params=params, headers=headers, data=data, timeout=timeout)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    @contextmanager
+    def stream(self, method, url, params=None, headers=None, data=None, timeout=None):
+        """Envia uma requisição sem ler o corpo; response.raw é um arquivo com o corpo já descomprimido"""
+        timeout = timeout or self.timeout
+        if self._client is not None:
+            request = self._client.build_request(
+                method, url, params=params, headers=headers, content=data, timeout=timeout
+            )
+            response = self._client.send(request, stream=True)
+            self._count_http2(response)
+            response.raw = _IteratorReader(response.iter_bytes())
+        else:
+            response = self.session.request(
+                method, url, params=params, headers=headers, data=data, timeout=timeout, stream=True
+            )
+            response.raw.decode_content = True
+
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def _count_http2(self, response):
+        """Conta conexões novas e reaproveitadas pelo stream de rede de cada resposta HTTP/2"""
+        stream = response.extensions.get('network_stream')
+        with self._lock:
+            host_stats = self._http2_stats.setdefault(
+                response.url.host, {'requests': 0, 'misses': 0, 'connections': weakref.WeakSet()}
+            )
+            host_stats['requests'] += 1
+            # Conjunto fraco: um stream fechado e coletado sai sozinho, sem segurar o socket nem reaproveitar id()
+            if stream is None or stream not in host_stats['connections']:
+                host_stats['misses'] += 1
+                if stream is not None:
+                    host_stats['connections'].add(stream)
+
+    def stats(self):
+        """Estatísticas do pool por host: {host: {'requests', 'hits', 'misses'}}"""
+        if self._client is not None:
+            with self._lock:
+                return {
+                    host: {
+                        'requests': host_stats['requests'],
+                        'hits': host_stats['requests'] - host_stats['misses'],
+                        'misses': host_stats['misses']
+                    }
+                    for host, host_stats in self._http2_stats.items()
+                }
+
+        stats = {}
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {'requests': 0, 'hits': 0, 'misses': 0})
+                host_stats['requests'] += pool.num_requests
+                host_stats['misses'] += pool.num_connections
+                host_stats['hits'] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
+
+    def _metric_samples(self):
+        """Acertos e faltas do pool por host, exportados em tubebot_http_pool_requests_total"""
+        for host, host_stats in self.stats().items():
+            yield {'host': host, 'result': 'hit'}, host_stats['hits']
+            yield {'host': host, 'result': 'miss'}, host_stats['misses']
+
+    def close(self):
+        """Fecha as conexões abertas"""
+        self.session.close()
+        if self._client is not None:
+            self._client.close()
+
+class HttpLib2Adapter:
+    """Objeto compatível com httplib2.Http que envia as requisições do googleapiclient pelo HTTPTransport.
+
+    Ao contrário do httplib2, pode ser compartilhado entre threads: o pool de
+    conexões fica no transporte.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.timeout = transport.timeout
+        self.connections = {}
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        # Importado aqui porque só o cliente da API precisa dele, e ele é criado sob demanda
+        import httplib2
+        response = self.transport.request(method, uri, headers=headers, data=body)
+        # O corpo já vem descomprimido, então os cabeçalhos de codificação e tamanho não valem mais
+        info = {
+            key.lower(): value for key, value in response.headers.items()
+            if key.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')
+        }
+        info['status'] = str(response.status_code)
+        info['reason'] = getattr(response, 'reason', None) or getattr(response, 'reason_phrase', '')
+        return httplib2.Response(info), response.content
+
+    def close(self):
+        pass
+
+class _IteratorReader:
+    """Arquivo somente leitura sobre um iterador de bytes (corpo das respostas HTTP/2)"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _parse_host_pool_sizes(value):
+    """Lê HTTP_HOST_POOL_SIZES no formato host=tamanho,host=tamanho"""
+    sizes = {}
+    for entry in value.split(','):
+        if '=' not in entry:
+            continue
+        host, size = entry.split('=', 1)
+        host = urlparse(host.strip()).hostname or host.strip()
+        sizes[host] = int(size)
+    return sizes
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Obtém o transporte HTTP compartilhado"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
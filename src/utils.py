@@ -1,5 +1,24 @@
+import os
+import time
+from collections import OrderedDict
+
 import discord
 
+from .metrics import CACHE_REQUESTS
+
+# Textos das notificações por idioma; idiomas sem tradução usam o padrão
+EMBED_STRINGS = {
+    'pt-BR': {'new': "🎥 Novo Vídeo!", 'old': "📺 Vídeo Anterior"},
+    'en-US': {'new': "🎥 New Video!", 'old': "📺 Previous Video"},
+}
+DEFAULT_LOCALE = 'pt-BR'
+
+# Embeds de vídeos já montados, por (ID do vídeo, idioma, é novo); o texto "Publicado há ..."
+# envelhece, então cada embed vale por pouco tempo
+EMBED_CACHE_SIZE = int(os.getenv('EMBED_CACHE_SIZE', '1000'))
+EMBED_CACHE_TTL = int(os.getenv('EMBED_CACHE_TTL', '600'))
+_embed_cache = OrderedDict()
+
 def create_embed(title, description="", color=discord.Color.blue(), url=None):
     """Cria um embed do Discord com configurações padrão"""
     embed = discord.Embed(
@@ -8,4 +27,65 @@ def create_embed(title, description="", color=discord.Color.blue(), url=None):
         color=color,
         url=url
     )
-    return embed 
\ No newline at end of file
+    return embed
+
+def create_video_embed(channel_info, locale=DEFAULT_LOCALE):
+    """Cria o embed de notificação de um vídeo, reaproveitando o já montado para outros servidores"""
+    is_new_video = bool(channel_info.get('is_new_video', False))
+    key = (channel_info.get('video_id') or channel_info['video_url'], locale, is_new_video)
+
+    now = time.monotonic()
+    cached = _embed_cache.get(key)
+    if cached and cached[1] > now:
+        _embed_cache.move_to_end(key)
+        CACHE_REQUESTS.inc(cache='embeds', result='hit')
+        return cached[0]
+    CACHE_REQUESTS.inc(cache='embeds', result='miss')
+
+    embed = _build_video_embed(channel_info, EMBED_STRINGS.get(locale, EMBED_STRINGS[DEFAULT_LOCALE]), is_new_video)
+    _embed_cache[key] = (embed, now + EMBED_CACHE_TTL)
+    _embed_cache.move_to_end(key)
+    while len(_embed_cache) > EMBED_CACHE_SIZE:
+        _embed_cache.popitem(last=False)
+    return embed
+
+def _build_video_embed(channel_info, strings, is_new_video):
+    # Define o título baseado se é um novo vídeo ou não
+    status = strings['new'] if is_new_video else strings['old']
+
+    # Cria o embed bonito
+    embed = discord.Embed(
+        url=channel_info['video_url'],
+        color=discord.Color.red() if is_new_video else discord.Color.blue()
+    )
+
+    # Adiciona a thumbnail como imagem principal
+    embed.set_image(url=channel_info['thumbnail_url'])
+
+    # Adiciona o autor (canal do YouTube) com logo
+    embed.set_author(
+        name=channel_info['channel_name'],
+        url=f"https://www.youtube.com/@{channel_info['channel_name'].replace(' ', '')}",
+        icon_url=channel_info['channel_icon']
+    )
+
+    # Adiciona o título do vídeo com link
+    embed.add_field(
+        name="",
+        value=f"[{channel_info['video_title']}]({channel_info['video_url']})",
+        inline=False
+    )
+
+    # Adiciona informações do vídeo
+    embed.add_field(
+        name="",
+        value=f"**{status}** • {channel_info['published_text']}",
+        inline=False
+    )
+
+    # Adiciona o footer apenas com o ícone
+    embed.set_footer(
+        text="",
+        icon_url="https://www.youtube.com/favicon.ico"
+    )
+    return embed
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HUB_URL = 'https://pubsubhubbub.appspot.com/subscribe'
+TOPIC_URL = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}'
+
+ATOM_NS = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+}
+
+# Vídeo recebido em uma notificação do hub; received_at é o horário (time.time()) da notificação
+PushedVideo = namedtuple(
+    'PushedVideo', ['video_id', 'channel_id', 'title', 'published', 'link', 'received_at'], defaults=(None,)
+)
+
+def topic_for(channel_id):
+    """URL do feed (tópico WebSub) de um canal"""
+    return TOPIC_URL.format(channel_id=channel_id)
+
+def channel_from_topic(topic):
+    """Extrai o ID do canal da URL do tópico"""
+    return parse_qs(urlparse(topic).query).get('channel_id', [None])[0]
+
+def parse_notification(body):
+    """Lê os vídeos de uma notificação Atom do YouTube"""
+    root = ElementTree.fromstring(body)
+    received_at = time.time()
+    videos = []
+    for entry in root.findall('atom:entry', ATOM_NS):
+        video_id = entry.findtext('yt:videoId', namespaces=ATOM_NS)
+        channel_id = entry.findtext('yt:channelId', namespaces=ATOM_NS)
+        if not video_id or not channel_id:
+            continue
+
+        # Entradas sem data de publicação (ou com data inválida) não podem ser comparadas ao watermark
+        published = entry.findtext('atom:published', namespaces=ATOM_NS)
+        try:
+            published = datetime.fromisoformat(published).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        except (TypeError, ValueError):
+            logger.warning(f"Vídeo {video_id} ignorado na notificação WebSub: data de publicação inválida")
+            continue
+        link = entry.find('atom:link', ATOM_NS)
+        videos.append(PushedVideo(
+            video_id,
+            channel_id,
+            entry.findtext('atom:title', default='', namespaces=ATOM_NS),
+            published,
+            link.get('href') if link is not None else f'https://www.youtube.com/watch?v={video_id}',
+            received_at
+        ))
+    return videos
+
+class WebSubServer:
+    """Recebe notificações de novos vídeos do hub WebSub (PubSubHubbub) do YouTube.
+
+    Sobe um endpoint HTTP embutido que responde aos desafios de verificação do
+    hub, lê as notificações Atom e repassa os vídeos novos para on_video.
+    As inscrições são renovadas automaticamente antes do fim do lease.
+    """
+
+    def __init__(self, on_video, storage=None, callback_url=None, hub_url=None, host=None, port=None,
+                 secret=None, lease_seconds=None, max_age=None):
+        self.on_video = on_video
+        self.storage = storage
+        self.callback_url = callback_url or os.getenv('WEBSUB_CALLBACK_URL')
+        if not self.callback_url:
+            raise ValueError("Modo push requer a variável WEBSUB_CALLBACK_URL com a URL pública do endpoint")
+
+        self.hub_url = hub_url or os.getenv('WEBSUB_HUB_URL', DEFAULT_HUB_URL)
+        self.host = host or os.getenv('WEBSUB_HOST', '0.0.0.0')
+        self.port = port or int(os.getenv('WEBSUB_PORT', '8080'))
+        self.secret = secret if secret is not None else os.getenv('WEBSUB_SECRET', '')
+        self.lease_seconds = lease_seconds or int(os.getenv('WEBSUB_LEASE_SECONDS', '432000'))
+        # Edições de vídeos antigos também geram notificações; só vídeos recentes são repassados
+        self.max_age = max_age or int(os.getenv('WEBSUB_MAX_AGE', '86400'))
+
+        self.wanted = set()
+        self.leases = storage.get_all('websub') if storage else {}
+        self._session = None
+        self._runner = None
+
+    async def start(self):
+        """Sobe o endpoint de callback"""
+        app = web.Application()
+        path = urlparse(self.callback_url).path or '/'
+        app.router.add_get(path, self._handle_verification)
+        app.router.add_post(path, self._handle_notification)
+
+        self._session = ClientSession(timeout=ClientTimeout(total=30))
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Endpoint WebSub escutando em {self.host}:{self.port}{path}")
+
+    async def stop(self):
+        """Derruba o endpoint e fecha a sessão HTTP"""
+        if self._runner:
+            await self._runner.cleanup()
+        if self._session:
+            await self._session.close()
+
+    async def sync(self, channel_ids, renew_margin=None):
+        """Inscreve canais novos, cancela os removidos e renova leases perto de expirar"""
+        if renew_margin is None:
+            renew_margin = self.lease_seconds // 5
+        channel_ids = set(channel_ids)
+        removed = self.wanted - channel_ids
+        self.wanted = channel_ids
+
+        now = time.time()
+        requests = [
+            self._request(channel_id, 'subscribe')
+            for channel_id in channel_ids
+            if self.leases.get(channel_id, 0) - renew_margin <= now
+        ]
+        requests += [self._request(channel_id, 'unsubscribe') for channel_id in removed]
+        await asyncio.gather(*requests)
+
+    async def _request(self, channel_id, mode):
+        """Envia um pedido de inscrição ou cancelamento ao hub"""
+        data = {
+            'hub.callback': self.callback_url,
+            'hub.topic': topic_for(channel_id),
+            'hub.mode': mode,
+            'hub.verify': 'async',
+            'hub.lease_seconds': str(self.lease_seconds),
+        }
+        if self.secret:
+            data['hub.secret'] = self.secret
+
+        try:
+            async with self._session.post(self.hub_url, data=data) as response:
+                if response.status not in (202, 204):
+                    logger.warning(f"Hub recusou {mode} para {channel_id}: HTTP {response.status} {await response.text()}")
+        except Exception as e:
+            logger.error(f"Erro ao enviar {mode} ao hub para {channel_id}: {str(e)}")
+
+    async def _handle_verification(self, request):
+        """Responde ao desafio de verificação de intenção do hub"""
+        mode = request.query.get('hub.mode')
+        channel_id = channel_from_topic(request.query.get('hub.topic', ''))
+        challenge = request.query.get('hub.challenge', '')
+
+        if mode == 'subscribe' and channel_id in self.wanted:
+            try:
+                lease = int(request.query.get('hub.lease_seconds', self.lease_seconds))
+            except ValueError:
+                return web.Response(status=400)
+            self._set_lease(channel_id, time.time() + lease)
+            return web.Response(text=challenge)
+
+        if mode == 'unsubscribe' and channel_id not in self.wanted:
+            self._set_lease(channel_id, None)
+            return web.Response(text=challenge)
+
+        if mode == 'denied':
+            logger.warning(f"Hub negou a inscrição do canal {channel_id}: {request.query.get('hub.reason', '')}")
+            self._set_lease(channel_id, None)
+            return web.Response(text='')
+
+        return web.Response(status=404)
+
+    async def _handle_notification(self, request):
+        """Recebe uma notificação Atom e repassa os vídeos novos"""
+        body = await request.read()
+
+        if self.secret:
+            signature = request.headers.get('X-Hub-Signature', '')
+            expected = 'sha1=' + hmac.new(self.secret.encode(), body, hashlib.sha1).hexdigest()
+            if not hmac.compare_digest(signature, expected):
+                # O protocolo pede resposta 2xx mesmo quando a assinatura não confere
+                logger.warning("Notificação WebSub com assinatura inválida ignorada")
+                return web.Response(status=202)
+
+        try:
+            videos = parse_notification(body)
+        except Exception as e:
+            logger.error(f"Erro ao ler notificação WebSub: {str(e)}")
+            return web.Response(status=202)
+
+        cutoff = time.time() - self.max_age
+        for video in videos:
+            published = datetime.strptime(video.published, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+            if video.channel_id in self.wanted and published.timestamp() >= cutoff:
+                asyncio.ensure_future(self.on_video(video))
+
+        return web.Response(status=202)
+
+    def _set_lease(self, channel_id, expires_at):
+        if expires_at is None:
+            self.leases.pop(channel_id, None)
+        else:
+            self.leases[channel_id] = expires_at
+
+        if not self.storage:
+            return
+        try:
+            if expires_at is None:
+                self.storage.delete('websub', channel_id)
+            else:
+                self.storage.set('websub', channel_id, expires_at)
+        except Exception as e:
+            logger.error(f"Erro ao salvar lease WebSub: {str(e)}")
@@ -1,11 +1,13 @@
-import requests
+import logging
+from .transport import get_transport
 import re
-import json
-from datetime import datetime
-from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
 
 class YouTubeScraper:
-    def __init__(self):
+    def __init__(self, transport=None):
+        # As três páginas de cada consulta reaproveitam as conexões do pool compartilhado
+        self.transport = transport or get_transport()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -24,7 +26,7 @@ class YouTubeScraper:
     def get_channel_info(self, channel_url):
         """Obtém informações do canal do YouTube"""
         try:
-            print(f"Processando URL: {channel_url}")
+            logger.debug(f"Processando URL: {channel_url}")
             
             # Normaliza a URL do canal para a aba de vídeos
             if '@' in channel_url:
@@ -33,38 +35,38 @@ class YouTubeScraper:
             elif not channel_url.endswith('/videos'):
                 channel_url = f"{channel_url}/videos"
                 
-            print(f"URL normalizada: {channel_url}")
+            logger.debug(f"URL normalizada: {channel_url}")
             
             # Faz a requisição inicial
-            response = requests.get(channel_url, headers=self.headers)
+            response = self.transport.get(channel_url, headers=self.headers)
             response.raise_for_status()
             
             # Procura pelo ID do canal
             channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
             if not channel_id_match:
-                print("Não foi possível encontrar o ID do canal")
+                logger.warning("Não foi possível encontrar o ID do canal")
                 return None
                 
             channel_id = channel_id_match.group(1)
-            print(f"ID do canal encontrado: {channel_id}")
+            logger.debug(f"ID do canal encontrado: {channel_id}")
             
             # Faz uma requisição para a API não oficial
             api_url = f"https://www.youtube.com/channel/{channel_id}/videos"
-            response = requests.get(api_url, headers=self.headers)
+            response = self.transport.get(api_url, headers=self.headers)
             response.raise_for_status()
             
             # Procura pelo vídeo mais recente
             video_id_match = re.search(r'"videoId":"([^"]+)"', response.text)
             if not video_id_match:
-                print("Não foi possível encontrar o ID do vídeo")
+                logger.warning("Não foi possível encontrar o ID do vídeo")
                 return None
                 
             video_id = video_id_match.group(1)
-            print(f"ID do vídeo encontrado: {video_id}")
+            logger.debug(f"ID do vídeo encontrado: {video_id}")
             
             # Obtém informações do vídeo
             video_url = f"https://www.youtube.com/watch?v={video_id}"
-            video_response = requests.get(video_url, headers=self.headers)
+            video_response = self.transport.get(video_url, headers=self.headers)
             video_response.raise_for_status()
             
             # Extrai informações do vídeo
@@ -72,14 +74,14 @@ class YouTubeScraper:
             channel_name_match = re.search(r'"channelName":"([^"]+)"', video_response.text)
             
             if not title_match or not channel_name_match:
-                print("Não foi possível extrair título ou nome do canal")
+                logger.warning("Não foi possível extrair título ou nome do canal")
                 return None
                 
             video_title = title_match.group(1).replace('\\u0026', '&')
             channel_name = channel_name_match.group(1)
             thumbnail_url = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
             
-            print(f"Vídeo encontrado: {video_title}")
+            logger.debug(f"Vídeo encontrado: {video_title}")
             
             return {
                 'video_url': video_url,
@@ -90,14 +92,14 @@ class YouTubeScraper:
             }
             
         except Exception as e:
-            print(f"Erro ao obter informações do canal: {str(e)}")
+            logger.error(f"Erro ao obter informações do canal: {str(e)}")
             return None
             
     def _extract_channel_id(self, url):
         """Extrai o ID do canal da URL"""
         try:
             # Tenta obter o ID do canal diretamente da URL
-            response = requests.get(url, headers=self.headers)
+            response = self.transport.get(url, headers=self.headers)
             response.raise_for_status()
             
             # Procura pelo ID do canal no HTML
@@ -110,7 +112,7 @@ class YouTubeScraper:
             if username_match:
                 username = username_match.group(1)
                 # Faz uma requisição para obter o ID do canal
-                response = requests.get(f"https://www.youtube.com/@{username}", headers=self.headers)
+                response = self.transport.get(f"https://www.youtube.com/@{username}", headers=self.headers)
                 response.raise_for_status()
                 channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
                 if channel_id_match:
@@ -118,5 +120,5 @@ class YouTubeScraper:
                     
             return None
         except Exception as e:
-            print(f"Erro ao extrair ID do canal: {str(e)}")
+            logger.error(f"Erro ao extrair ID do canal: {str(e)}")
             return None 
\ No newline at end of file
@@ -1,285 +1,718 @@
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+import calendar
+import importlib.util
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-import json
+from .cache import TTLCache
+from .storage import get_storage
+from .quota import error_reason, is_quota_error
+from .keys import KeyPool
+from .feed import FeedFetcher
+from .seen import SeenSet
+from .context import RequestContext
+from .shorts import ShortsClassifier, parse_duration
+from .fields import FULL_PARTS, PayloadMeter, shape_request
+from .transport import HttpLib2Adapter, get_transport
+from .discovery import load_discovery_document
+from .api_client import ClientLoop
+from .records import ChannelRecord, UploadsPage, VideoRecord
+from .retry import RetryPolicy, CircuitBreaker, KEY_ERROR_TIMEOUT, is_transient, is_key_error, is_retryable
+from .metrics import API_REQUESTS, API_LATENCY, API_ERRORS, API_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# A API aceita até 50 IDs separados por vírgula em channels().list e videos().list
+MAX_IDS_PER_REQUEST = 50
 
 class YouTubeAPI:
-    def __init__(self):
-        self.api_key = os.getenv('YOUTUBE_API_KEY')
-        if not self.api_key:
-            raise ValueError("YouTube API key não encontrada. Configure a variável YOUTUBE_API_KEY no arquivo .env")
-            
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
-        self.cache_file = 'data/youtube_cache.json'
+    def __init__(self, storage=None):
+        # Chaves da API (e projetos OAuth), cada uma com a sua cota; as chamadas vão para a chave com mais saldo
+        self.storage = storage or get_storage()
+        self.quota = KeyPool(storage=self.storage)
+
+        # Cliente da API: 'googleapiclient' (padrão) usa o cliente gerado a partir do documento de descoberta;
+        # 'async' usa o cliente aiohttp enxuto em src/api_client.py, ainda sem ganho medido (benchmarks/client.py)
+        client = os.getenv('YOUTUBE_API_CLIENT', 'googleapiclient').lower()
+        if client not in ('async', 'googleapiclient'):
+            raise ValueError(f"YOUTUBE_API_CLIENT inválido: {client}. Use 'async' ou 'googleapiclient'")
+        if client == 'async' and importlib.util.find_spec('aiohttp') is None:
+            logger.warning("O cliente assíncrono da API requer o pacote aiohttp; usando o googleapiclient")
+            client = 'googleapiclient'
+        self.client_loop = self._build_client_loop() if client == 'async' else None
+
+        # Com o googleapiclient, as requisições usam o pool de conexões do transporte compartilhado; os clientes
+        # continuam sendo um por chave e por worker da varredura, pois os objetos de recurso guardam estado.
+        # Os clientes só são criados na primeira chamada com cada chave, sem atrasar a inicialização
+        self.http = HttpLib2Adapter(get_transport())
+        self._local = threading.local()
+        self._client_built = False
+        self._cache_lock = threading.RLock()
+        self._context = None
+        # Chaves do cache de vídeos alteradas durante deferred_saves(), gravadas no fim do bloco
+        self._pending_saves = None
         self._load_cache()
+        self.shorts = ShortsClassifier(self._fetch_durations, storage=self.storage)
+        self.payload_meter = PayloadMeter()
+
+        # Falhas passageiras são repetidas com backoff; falhas seguidas abrem o circuito do endpoint
+        # (ou da chave), e o resto da varredura deixa de chamar a API até ele fechar
+        self.retry = RetryPolicy()
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+
+        # Backend de detecção: 'api' consulta a playlist de uploads (1 unidade por canal),
+        # 'feed' usa o feed Atom público e deixa a API apenas para metadados dos canais
+        backend = os.getenv('DETECTION_BACKEND', 'api').lower()
+        if backend not in ('api', 'feed'):
+            raise ValueError(f"DETECTION_BACKEND inválido: {backend}. Use 'api' ou 'feed'")
+        self.feed = FeedFetcher() if backend == 'feed' else None
+        # Frequência de uploads (vídeos por dia) e datas de publicação recentes de cada canal,
+        # usadas para priorizar e espaçar as verificações
+        self.upload_rates = {}
+        self.publish_times = {}
+
+        # Caches de resolução: URL -> ID do canal e ID do canal -> metadados
+        cache_size = int(os.getenv('RESOLVER_CACHE_SIZE', '10000'))
+        self.channel_ids = TTLCache(
+            'channel_ids',
+            storage=self.storage,
+            max_size=cache_size,
+            ttl=int(os.getenv('CHANNEL_ID_CACHE_TTL', str(30 * 86400))),
+            negative_ttl=int(os.getenv('CHANNEL_ID_NEGATIVE_CACHE_TTL', str(6 * 3600)))
+        )
+        self.channel_metadata = TTLCache(
+            'channel_metadata',
+            storage=self.storage,
+            max_size=cache_size,
+            ttl=int(os.getenv('CHANNEL_METADATA_CACHE_TTL', str(86400))),
+            negative_ttl=int(os.getenv('CHANNEL_ID_NEGATIVE_CACHE_TTL', str(6 * 3600)))
+        )
+
+    def _build_client(self, credential):
+        """Cria um cliente da API do YouTube a partir do documento de descoberta local, sem acessar a rede"""
+        started = time.perf_counter()
+        from googleapiclient.discovery import build_from_document
+        client = build_from_document(load_discovery_document(), **credential.client_options(self.http))
+        if not self._client_built:
+            self._client_built = True
+            logger.info(f"Cliente da API do YouTube criado em {time.perf_counter() - started:.2f}s")
+        return client
+
+    def _build_client_loop(self):
+        """Cliente assíncrono da API; o loop e as conexões só são criados na primeira chamada"""
+        return ClientLoop()
+
+    def _client(self, credential):
+        """Cliente da API do YouTube da thread atual para a chave"""
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        client = clients.get(credential.name)
+        if client is None:
+            client = clients[credential.name] = self._build_client(credential)
+        return client
+
+    def _breaker(self, endpoint):
+        with self._breakers_lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(endpoint)
+            return breaker
+
+    def _execute(self, endpoint, params):
+        """Executa o list() de um endpoint passando pelos circuitos, pelo controle de cota e pelas novas tentativas.
+
+        Cada tentativa usa a chave com mais cota restante. Se a API responder
+        que a cota da chave acabou ou recusar a chave, a chamada passa na hora
+        para a próxima chave. Levanta CircuitOpen sem chamar a API enquanto o
+        circuito do endpoint (ou de todas as chaves) estiver aberto.
+        """
+        endpoint_breaker = self._breaker(endpoint)
+        attempt = 0
+        while True:
+            endpoint_breaker.before_call()
+            credential = self.quota.acquire(endpoint)
+            try:
+                response = self._send(endpoint, credential, params)
+            except Exception as e:
+                if is_quota_error(e):
+                    self.quota.exhaust(credential)
+                    continue
+                if is_key_error(e):
+                    credential.breaker.trip(KEY_ERROR_TIMEOUT)
+                    continue
+                if not is_transient(e):
+                    raise
+                # Falhas passageiras contam só para o endpoint; o circuito da chave abre quando a API a recusa
+                endpoint_breaker.record_failure()
+
+                delay = self.retry.delay(attempt, e)
+                attempt += 1
+                if delay > self.retry.max_delay:
+                    # A API pediu para esperar mais do que vale segurar um worker: o endpoint fica
+                    # fechado por esse tempo e o canal volta para a fila
+                    endpoint_breaker.trip(delay)
+                    raise
+                if attempt >= self.retry.attempts:
+                    raise
+                API_RETRIES.inc(endpoint=endpoint)
+                logger.warning(f"Falha temporária em {endpoint} ({str(e)}); nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            credential.breaker.record_success()
+            endpoint_breaker.record_success()
+            return response
+
+    def _send(self, endpoint, credential, params):
+        """Envia uma requisição com a chave (cuja cota já foi debitada), registrando as métricas"""
+        started = time.perf_counter()
+        try:
+            if self.client_loop is not None:
+                return self.client_loop.list(endpoint, params, **credential.request_auth())
+            resource = getattr(self._client(credential), endpoint.split('.')[0])()
+            return resource.list(**params).execute()
+        except HttpError as e:
+            API_ERRORS.inc(endpoint=endpoint, status=getattr(e.resp, 'status', 'unknown'), reason=error_reason(e))
+            raise
+        finally:
+            API_REQUESTS.inc(endpoint=endpoint)
+            API_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
         
+    def _list(self, endpoint, **params):
+        """Executa o list() de um endpoint com o part e a máscara fields mínimos"""
+        response = self._execute(endpoint, shape_request(endpoint, params))
+
+        if self.payload_meter.enabled and endpoint in FULL_PARTS:
+            try:
+                full_response = self._execute(endpoint, dict(params, part=FULL_PARTS[endpoint]))
+                self.payload_meter.record(response, full_response)
+            except Exception as e:
+                logger.error(f"Erro ao medir resposta sem máscara de {endpoint}: {str(e)}")
+        return response
+
+    @contextmanager
+    def request_context(self):
+        """Memoriza IDs resolvidos, metadados e páginas de uploads até o fim do bloco (uma varredura)"""
+        if self._context is not None:
+            yield self._context
+            return
+
+        self._context = RequestContext()
+        try:
+            yield self._context
+        finally:
+            self._context = None
+
     def _load_cache(self):
-        """Carrega o cache de vídeos do arquivo"""
+        """Carrega o cache de vídeos do armazenamento"""
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    self.video_cache = json.load(f)
-            else:
-                self.video_cache = {}
-                os.makedirs('data', exist_ok=True)
-                self._save_cache()
+            self.video_cache = {
+                cache_key: SeenSet.from_value(value)
+                for cache_key, value in self.storage.get_all('video_cache').items()
+            }
         except Exception as e:
-            print(f"Erro ao carregar cache: {str(e)}")
+            logger.error(f"Erro ao carregar cache: {str(e)}")
             self.video_cache = {}
             
-    def _save_cache(self):
-        """Salva o cache de vídeos no arquivo"""
+    def reload_seen(self, channel_id):
+        """Relê do armazenamento os vídeos já enviados de um canal, que outro processo pode ter verificado"""
+        for include_shorts in (False, True):
+            cache_key = self._cache_key(channel_id, include_shorts)
+            value = self.storage.get('video_cache', cache_key)
+            with self._cache_lock:
+                if value is None:
+                    self.video_cache.pop(cache_key, None)
+                else:
+                    self.video_cache[cache_key] = SeenSet.from_value(value)
+
+    @contextmanager
+    def deferred_saves(self):
+        """Adia a gravação dos vídeos já enviados até o fim do bloco (uma varredura).
+
+        As entradas alteradas são gravadas juntas, em uma transação curta no
+        fim do bloco, em vez de manter o banco reservado durante as chamadas à
+        API. Se o bloco falhar, nada é gravado.
+        """
+        self._pending_saves = set()
+        try:
+            yield
+            # Os valores são copiados antes da transação, para que ela nunca espere pelo lock do cache
+            with self._cache_lock:
+                pending, self._pending_saves = self._pending_saves, None
+                values = {
+                    cache_key: self.video_cache[cache_key].to_value()
+                    for cache_key in pending if cache_key in self.video_cache
+                }
+            try:
+                with self.storage.batch():
+                    for cache_key, value in values.items():
+                        self.storage.set('video_cache', cache_key, value)
+            except Exception as e:
+                logger.error(f"Erro ao salvar cache: {str(e)}")
+        finally:
+            self._pending_saves = None
+
+    def _save_cache(self, cache_key):
+        """Salva uma entrada do cache de vídeos no armazenamento"""
+        with self._cache_lock:
+            if self._pending_saves is not None:
+                self._pending_saves.add(cache_key)
+                return
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.video_cache, f)
+            self.storage.set('video_cache', cache_key, self.video_cache[cache_key].to_value())
         except Exception as e:
-            print(f"Erro ao salvar cache: {str(e)}")
+            logger.error(f"Erro ao salvar cache: {str(e)}")
             
     def get_channel_info(self, channel_url, include_shorts=False):
-        """Obtém informações do canal e do último vídeo usando a API do YouTube"""
+        """Obtém informações do canal e do último vídeo usando a API do YouTube, sem registrar nada.
+
+        Usado na configuração (!start), que pode rodar no gateway ou em um
+        processo que não é o dono do canal: os vídeos enviados são lidos do
+        armazenamento compartilhado e só o poller responsável os grava. O
+        último vídeo só vem junto (com video_url) se já estiver registrado
+        como enviado; caso contrário, a primeira verificação do canal o envia.
+        """
+        with self.request_context():
+            return self._get_channel_info(channel_url, include_shorts)
+
+    def _get_channel_info(self, channel_url, include_shorts):
         try:
             # Extrai o ID do canal da URL
             channel_id = self._extract_channel_id(channel_url)
             if not channel_id:
-                print(f"Não foi possível extrair o ID do canal da URL: {channel_url}")
+                logger.warning(f"Não foi possível extrair o ID do canal da URL: {channel_url}")
                 return None
 
             # Obtém informações do canal
-            channel_response = self.youtube.channels().list(
-                part='snippet,contentDetails',
-                id=channel_id
-            ).execute()
-
-            if not channel_response['items']:
-                print(f"Canal não encontrado: {channel_id}")
+            channel = self._fetch_channel(channel_id)
+            if not channel:
                 return None
 
-            channel = channel_response['items'][0]
-            channel_name = channel['snippet']['title']
-            channel_icon = channel['snippet']['thumbnails']['default']['url']
-            uploads_playlist_id = channel['contentDetails']['relatedPlaylists']['uploads']
-
             # Obtém os vídeos do canal
-            playlist_response = self.youtube.playlistItems().list(
-                part='snippet',
-                playlistId=uploads_playlist_id,
-                maxResults=50
-            ).execute()
+            page = self._fetch_uploads(channel_id, channel.uploads_playlist_id)
 
-            if not playlist_response['items']:
-                print(f"Nenhum vídeo encontrado para o canal: {channel_name}")
+            if not page.items:
+                logger.debug(f"Nenhum vídeo encontrado para o canal: {channel.title}")
                 return None
 
-            # Procura o primeiro vídeo que não seja shorts (se include_shorts for False)
-            video = None
-            for item in playlist_response['items']:
-                video_title = item['snippet']['title']
-                video_description = item['snippet'].get('description', '')
-                
-                if include_shorts or ('#shorts' not in video_title.lower() and '#shorts' not in video_description.lower()):
-                    video = item
-                    break
-
-            if not video:
-                print(f"Nenhum vídeo encontrado que atenda aos critérios para o canal: {channel_name}")
+            # Procura os vídeos que não sejam shorts (se include_shorts for False)
+            candidates = self._filter_videos(page.items, include_shorts)
+            if not candidates:
+                logger.debug(f"Nenhum vídeo encontrado que atenda aos critérios para o canal: {channel.title}")
                 return None
 
-            # Obtém detalhes do vídeo
-            video_id = video['snippet']['resourceId']['videoId']
-            video_title = video['snippet']['title']
-            published_at = video['snippet']['publishedAt']
-            thumbnail_url = video['snippet']['thumbnails']['high']['url']
-
-            # Verifica se o vídeo já foi enviado
-            if channel_id in self.video_cache and self.video_cache[channel_id] == video_id:
-                print(f"Vídeo já foi enviado anteriormente: {video_title}")
-                return {'already_sent': True}
-
-            # Atualiza o cache com o novo vídeo
-            self.video_cache[channel_id] = video_id
-            self._save_cache()
-
-            # Formata a data de publicação
-            published_date = datetime.strptime(published_at, '%Y-%m-%dT%H:%M:%SZ')
-            now = datetime.utcnow()
-            time_diff = now - published_date
-
-            if time_diff.days > 0:
-                published_text = f"Publicado há {time_diff.days} dias"
-            elif time_diff.seconds >= 3600:
-                hours = time_diff.seconds // 3600
-                published_text = f"Publicado há {hours} horas"
-            else:
-                minutes = time_diff.seconds // 60
-                published_text = f"Publicado há {minutes} minutos"
-
-            # Verifica se é um novo vídeo (menos de 5 minutos)
-            is_new_video = time_diff.seconds < 300
-
-            return {
-                'video_url': f'https://www.youtube.com/watch?v={video_id}',
-                'video_title': video_title,
-                'thumbnail_url': thumbnail_url,
-                'channel_name': channel_name,
-                'channel_icon': channel_icon,
-                'published_text': published_text,
-                'is_new_video': is_new_video
-            }
+            info = {'channel_id': channel_id, 'channel_name': channel.title}
+            seen = self.storage.get('video_cache', self._cache_key(channel_id, include_shorts))
+            if seen is not None and candidates[0].video_id in SeenSet.from_value(seen):
+                info.update(self._format_video(candidates[0], channel))
+            return info
 
         except HttpError as e:
-            print(f"Erro na API do YouTube: {str(e)}")
+            logger.error(f"Erro na API do YouTube: {str(e)}")
             return None
         except Exception as e:
-            print(f"Erro ao obter informações do canal: {str(e)}")
+            logger.error(f"Erro ao obter informações do canal: {str(e)}")
             return None
-            
-    def get_old_video(self, channel_url, include_shorts=False):
-        """Obtém um vídeo antigo que ainda não foi enviado"""
+
+    def resolve_channel_id(self, channel_url, search=True):
+        """Resolve a URL de um canal para o seu ID.
+
+        Com search=False não faz a busca na API: apenas relê o cache de
+        resolução, preenchido pelo processo responsável pela URL.
+        """
+        if search or ('@' not in channel_url and '/channel/' in channel_url):
+            return self._extract_channel_id(channel_url)
+
+        self.channel_ids.refresh(channel_url)
+        return self.channel_ids.get(channel_url)
+
+    def get_channels_metadata(self, channel_ids):
+        """Obtém nome, ícone e playlist de uploads de vários canais.
+
+        Usa a forma em lote de channels().list, com até 50 IDs por requisição,
+        de modo que N canais custam ceil(N/50) chamadas. Canais já presentes no
+        cache de metadados não são consultados novamente. Retorna
+        {channel_id: ChannelRecord}; canais inexistentes ficam de fora do
+        resultado.
+        """
+        context = self._context
+        metadata = {}
+        missing = []
+        for channel_id in dict.fromkeys(channel_ids):
+            if context is not None and channel_id in context.channels:
+                if context.channels[channel_id]:
+                    metadata[channel_id] = context.channels[channel_id]
+                continue
+
+            found, channel = self.channel_metadata.lookup(channel_id)
+            if not found:
+                missing.append(channel_id)
+            elif channel:
+                metadata[channel_id] = ChannelRecord.from_value(channel_id, channel)
+
+        for start in range(0, len(missing), MAX_IDS_PER_REQUEST):
+            batch = missing[start:start + MAX_IDS_PER_REQUEST]
+            channel_response = self._list(
+                'channels.list',
+                id=','.join(batch),
+                maxResults=MAX_IDS_PER_REQUEST
+            )
+
+            for item in channel_response.get('items', []):
+                channel = ChannelRecord.from_api(item)
+                metadata[channel.channel_id] = channel
+
+            # Canais que não existem entram no cache negativo
+            for channel_id in batch:
+                channel = metadata.get(channel_id)
+                self.channel_metadata.set(channel_id, channel.to_value() if channel else None)
+                if context is not None:
+                    context.channels[channel_id] = metadata.get(channel_id)
+        return metadata
+
+    def _fetch_durations(self, video_ids):
+        """Obtém a duração (em segundos) de vários vídeos, com até 50 IDs por chamada de videos().list"""
+        durations = {}
+        for start in range(0, len(video_ids), MAX_IDS_PER_REQUEST):
+            batch = video_ids[start:start + MAX_IDS_PER_REQUEST]
+            video_response = self._list(
+                'videos.list',
+                id=','.join(batch),
+                maxResults=MAX_IDS_PER_REQUEST
+            )
+            for video in video_response.get('items', []):
+                durations[video['id']] = parse_duration(video['contentDetails'].get('duration'))
+        return durations
+
+    def save_caches(self):
+        """Persiste os caches de resolução de canais"""
+        self.channel_ids.save()
+        self.channel_metadata.save()
+
+    def close(self):
+        """Grava os caches e fecha as conexões do cliente assíncrono"""
+        self.save_caches()
+        if self.client_loop is not None:
+            self.client_loop.close()
+
+    def check_channel(self, channel_id, include_shorts_options=(False,), channel=None, include_old=True):
+        """Verifica um canal uma única vez e escolhe os vídeos a notificar para cada filtro de shorts.
+
+        Retorna um dicionário {include_shorts: [informações dos vídeos]}, com
+        todos os uploads ainda não enviados do mais antigo para o mais novo,
+        permitindo que o resultado seja repassado a todos os servidores
+        inscritos no canal. Os metadados do canal podem vir prontos de
+        get_channels_metadata. Com include_old=False, não procura vídeos
+        antigos quando não há novidade.
+
+        Falhas da API (indisponível, circuito aberto, sem cota) que impedem a
+        verificação são levantadas, para que o canal seja verificado de novo
+        em breve; as demais são registradas e o canal fica sem resultado.
+        """
+        results = {}
         try:
-            # Extrai o ID do canal da URL
-            channel_id = self._extract_channel_id(channel_url)
-            if not channel_id:
-                print(f"Não foi possível extrair o ID do canal da URL: {channel_url}")
-                return None
+            if channel is None:
+                channel = self._fetch_channel(channel_id)
+            if not channel:
+                return {}
 
-            # Obtém informações do canal
-            channel_response = self.youtube.channels().list(
-                part='snippet,contentDetails',
-                id=channel_id
-            ).execute()
+            page = self._fetch_uploads(channel_id, channel.uploads_playlist_id)
 
-            if not channel_response['items']:
-                print(f"Canal não encontrado: {channel_id}")
-                return None
+            if not page.items:
+                logger.debug(f"Nenhum vídeo encontrado para o canal: {channel.title}")
+                return {}
 
-            channel = channel_response['items'][0]
-            channel_name = channel['snippet']['title']
-            channel_icon = channel['snippet']['thumbnails']['default']['url']
-            uploads_playlist_id = channel['contentDetails']['relatedPlaylists']['uploads']
+            self._record_upload_rate(channel_id, page.items)
 
-            # Obtém mais vídeos do canal (página 2)
-            playlist_response = self.youtube.playlistItems().list(
-                part='snippet',
-                playlistId=uploads_playlist_id,
-                maxResults=50,
-                pageToken=self._get_next_page_token(uploads_playlist_id)
-            ).execute()
+            older_items = None
+            for include_shorts in include_shorts_options:
+                cache_key = self._cache_key(channel_id, include_shorts)
 
-            if not playlist_response['items']:
-                print(f"Nenhum vídeo antigo encontrado para o canal: {channel_name}")
-                return None
+                # Primeiro procura os uploads novos ainda não enviados
+                new_videos, first_check = self._diff_new_videos(cache_key, page.items, include_shorts)
+                if new_videos:
+                    results[include_shorts] = [
+                        self._format_video(video, channel, is_new_video=None if first_check else True)
+                        for video in new_videos
+                    ]
+                    continue
 
-            # Procura um vídeo antigo que não seja shorts (se include_shorts for False)
-            video = None
-            for item in playlist_response['items']:
-                video_id = item['snippet']['resourceId']['videoId']
-                video_title = item['snippet']['title']
-                video_description = item['snippet'].get('description', '')
-                
-                # Verifica se o vídeo já foi enviado
-                if channel_id in self.video_cache and self.video_cache[channel_id] == video_id:
+                # Se não há novidade, procura um vídeo antigo ainda não enviado, primeiro na página
+                # já obtida e depois na próxima
+                if not include_old:
                     continue
-                
-                if include_shorts or ('#shorts' not in video_title.lower() and '#shorts' not in video_description.lower()):
-                    video = item
-                    break
+                video = self._pick_old_video(cache_key, page.items, include_shorts)
+                if not video and not self.feed and page.next_page_token:
+                    if older_items is None:
+                        older_items = self._fetch_uploads(
+                            channel_id,
+                            channel.uploads_playlist_id,
+                            page_token=page.next_page_token
+                        ).items
+                    video = self._pick_old_video(cache_key, older_items, include_shorts)
 
-            if not video:
-                print(f"Nenhum vídeo antigo encontrado que atenda aos critérios para o canal: {channel_name}")
-                return None
+                if video:
+                    results[include_shorts] = [self._format_video(video, channel, is_new_video=False)]
+
+            return results
 
-            # Obtém detalhes do vídeo
-            video_id = video['snippet']['resourceId']['videoId']
-            video_title = video['snippet']['title']
-            published_at = video['snippet']['publishedAt']
-            thumbnail_url = video['snippet']['thumbnails']['high']['url']
-
-            # Atualiza o cache com o vídeo antigo
-            self.video_cache[channel_id] = video_id
-            self._save_cache()
-
-            # Formata a data de publicação
-            published_date = datetime.strptime(published_at, '%Y-%m-%dT%H:%M:%SZ')
-            now = datetime.utcnow()
-            time_diff = now - published_date
-
-            if time_diff.days > 0:
-                published_text = f"Publicado há {time_diff.days} dias"
-            elif time_diff.seconds >= 3600:
-                hours = time_diff.seconds // 3600
-                published_text = f"Publicado há {hours} horas"
+        except Exception as e:
+            # Os vídeos já escolhidos foram registrados como enviados e precisam ser entregues;
+            # o vídeo antigo que faltou fica para a próxima verificação
+            if is_retryable(e) and not results:
+                raise
+            if isinstance(e, HttpError):
+                logger.error(f"Erro na API do YouTube: {str(e)}")
             else:
-                minutes = time_diff.seconds // 60
-                published_text = f"Publicado há {minutes} minutos"
-
-            return {
-                'video_url': f'https://www.youtube.com/watch?v={video_id}',
-                'video_title': video_title,
-                'thumbnail_url': thumbnail_url,
-                'channel_name': channel_name,
-                'channel_icon': channel_icon,
-                'published_text': published_text,
-                'is_new_video': False
-            }
+                logger.error(f"Erro ao verificar o canal {channel_id}: {str(e)}")
+            return results
+
+    def _fetch_uploads(self, channel_id, uploads_playlist_id, page_token=None):
+        """Obtém uma página de uploads do canal (UploadsPage) pelo backend de detecção configurado"""
+        context = self._context
+        if context is not None and (channel_id, page_token) in context.pages:
+            return context.pages[(channel_id, page_token)]
+
+        if self.feed:
+            page = self.feed.fetch(channel_id)
+        else:
+            # Com a máscara fields, a API omite a lista quando a playlist está vazia
+            page = UploadsPage.from_api(self._list(
+                'playlistItems.list',
+                playlistId=uploads_playlist_id,
+                maxResults=50,
+                pageToken=page_token
+            ))
+
+        if context is not None:
+            context.pages[(channel_id, page_token)] = page
+        return page
+
+    def get_pushed_video(self, video, include_shorts_options=(False,)):
+        """Monta as notificações de um vídeo recebido por push (WebSub), sem consultar a playlist"""
+        try:
+            channel = self.get_channels_metadata([video.channel_id]).get(video.channel_id)
+            if not channel:
+                logger.warning(f"Canal não encontrado: {video.channel_id}")
+                return {}
+
+            item = VideoRecord(video.video_id, video.title, video.published)
+
+            results = {}
+            for include_shorts in include_shorts_options:
+                new_videos, _ = self._diff_new_videos(
+                    self._cache_key(video.channel_id, include_shorts),
+                    [item],
+                    include_shorts,
+                    advance_watermark=False
+                )
+                if new_videos:
+                    results[include_shorts] = [
+                        self._format_video(new_video, channel, is_new_video=True)
+                        for new_video in new_videos
+                    ]
+            return results
 
-        except HttpError as e:
-            print(f"Erro na API do YouTube: {str(e)}")
-            return None
         except Exception as e:
-            print(f"Erro ao obter vídeo antigo: {str(e)}")
-            return None
+            logger.error(f"Erro ao processar vídeo recebido por push {video.video_id}: {str(e)}")
+            return {}
+
+    def _fetch_channel(self, channel_id):
+        """Obtém nome, ícone e playlist de uploads de um canal"""
+        channel = self.get_channels_metadata([channel_id]).get(channel_id)
+        if not channel:
+            logger.warning(f"Canal não encontrado: {channel_id}")
+        return channel
+
+    def _record_upload_rate(self, channel_id, items):
+        """Estima quantos vídeos por dia o canal publica a partir da primeira página de uploads"""
+        published = [datetime.strptime(item.published_at, '%Y-%m-%dT%H:%M:%SZ') for item in items]
+        span_days = max((datetime.utcnow() - min(published)).total_seconds() / 86400, 1)
+        self.upload_rates[channel_id] = len(published) / span_days
+        self.publish_times[channel_id] = [calendar.timegm(date.timetuple()) for date in published]
+
+    def prioritize(self, channel_ids):
+        """Ordena os canais do que mais publica para o que menos publica (canais novos primeiro)"""
+        return sorted(channel_ids, key=lambda channel_id: -self.upload_rates.get(channel_id, float('inf')))
+
+    def _cache_key(self, channel_id, include_shorts):
+        """Chave do cache de vídeos enviados (servidores com e sem shorts não compartilham a entrada)"""
+        return f"{channel_id}:shorts" if include_shorts else channel_id
+
+    def _diff_new_videos(self, cache_key, items, include_shorts, advance_watermark=True):
+        """Compara a página de uploads com os vídeos já vistos e registra os novos.
+
+        Retorna (vídeos novos do mais antigo para o mais novo, primeira verificação).
+        São novos os uploads ainda não vistos publicados depois do watermark.
+        Na primeira verificação de um canal apenas o upload mais recente é
+        retornado, para não anunciar o histórico inteiro. Entradas migradas do
+        cache antigo (sem watermark) só recebem o watermark, sem anúncio.
+
+        Vídeos recebidos por push não avançam o watermark (advance_watermark
+        False): só a consulta à playlist o avança, para que a reconciliação
+        ainda encontre um upload mais antigo cujo push se perdeu.
+        """
+        candidates = self._filter_videos(items, include_shorts)
+        if not candidates:
+            return [], False
+
+        newest = candidates[0]
+        with self._cache_lock:
+            seen = self.video_cache.get(cache_key)
+            if seen is None or seen.watermark is None:
+                first_check = seen is None
+                if first_check:
+                    seen = self.video_cache[cache_key] = SeenSet()
+                    seen.add(newest.video_id)
+                seen.watermark = newest.published_at
+                self._save_cache(cache_key)
+                return ([newest] if first_check else []), first_check
 
-    def _get_next_page_token(self, playlist_id):
-        """Obtém o token da próxima página de vídeos"""
+            new_videos = [
+                item for item in candidates
+                if item.video_id not in seen and item.published_at > seen.watermark
+            ]
+            if not new_videos:
+                return [], False
+
+            new_videos.reverse()
+            for item in new_videos:
+                seen.add(item.video_id)
+            if advance_watermark:
+                seen.watermark = max(seen.watermark, new_videos[-1].published_at)
+            self._save_cache(cache_key)
+            return new_videos, False
+
+    def _pick_old_video(self, cache_key, items, include_shorts):
+        """Escolhe o vídeo mais recente da lista que ainda não foi enviado e o registra"""
+        # A classificação de shorts pode consultar a API, então fica fora do lock do cache
+        candidates = self._filter_videos(items, include_shorts)
+        with self._cache_lock:
+            seen = self.video_cache.setdefault(cache_key, SeenSet())
+            for item in candidates:
+                if item.video_id not in seen:
+                    seen.add(item.video_id)
+                    self._save_cache(cache_key)
+                    return item
+        return None
+
+    def _filter_videos(self, items, include_shorts):
+        """Filtra os vídeos da lista pelo filtro de shorts, mantendo a ordem"""
+        if include_shorts:
+            return list(items)
+
+        # Shorts são identificados pela duração; vídeos sem duração conhecida (API indisponível
+        # ou vídeo não retornado) caem na verificação da hashtag #shorts
         try:
-            response = self.youtube.playlistItems().list(
-                part='snippet',
-                playlistId=playlist_id,
-                maxResults=1
-            ).execute()
-            return response.get('nextPageToken')
+            shorts = self.shorts.classify([item.video_id for item in items])
         except Exception as e:
-            print(f"Erro ao obter token da próxima página: {str(e)}")
-            return None
+            logger.error(f"Erro ao obter a duração dos vídeos: {str(e)}")
+            shorts = {}
+
+        return [
+            item for item in items
+            if not shorts.get(item.video_id, self._has_shorts_tag(item))
+        ]
+
+    def _has_shorts_tag(self, item):
+        """Verifica se o título do vídeo tem a hashtag #shorts (a descrição fica fora da máscara fields)"""
+        return '#shorts' in item.title.lower()
+
+    def _format_video(self, video, channel, is_new_video=None):
+        """Monta as informações de notificação de um vídeo (VideoRecord) do canal (ChannelRecord)"""
+        video_id = video.video_id
+
+        # Formata a data de publicação
+        published_date = datetime.strptime(video.published_at, '%Y-%m-%dT%H:%M:%SZ')
+        now = datetime.utcnow()
+        time_diff = now - published_date
+
+        if time_diff.days > 0:
+            published_text = f"Publicado há {time_diff.days} dias"
+        elif time_diff.seconds >= 3600:
+            hours = time_diff.seconds // 3600
+            published_text = f"Publicado há {hours} horas"
+        else:
+            minutes = time_diff.seconds // 60
+            published_text = f"Publicado há {minutes} minutos"
+
+        # Verifica se é um novo vídeo (menos de 5 minutos)
+        if is_new_video is None:
+            is_new_video = time_diff.seconds < 300
+
+        return {
+            'video_id': video_id,
+            'video_url': f'https://www.youtube.com/watch?v={video_id}',
+            'video_title': video.title,
+            'thumbnail_url': video.thumbnail_url,
+            'channel_name': channel.title,
+            'channel_icon': channel.icon_url,
+            'published_text': published_text,
+            'is_new_video': is_new_video
+        }
 
     def _extract_channel_id(self, url):
         """Extrai o ID do canal da URL"""
+        # Se a URL contém /channel/, extrai o ID diretamente
+        if '@' not in url and '/channel/' in url:
+            return url.split('/channel/')[1].split('/')[0]
+
+        context = self._context
+        if context is not None and url in context.channel_ids:
+            return context.channel_ids[url]
+
+        # A busca custa 100 unidades de cota, então o resultado fica em cache (inclusive quando não encontra)
+        found, channel_id = self.channel_ids.lookup(url)
+        if found:
+            if context is not None:
+                context.channel_ids[url] = channel_id
+            return channel_id
+
         try:
-            # Se a URL contém @, precisamos primeiro obter o ID do canal
-            if '@' in url:
-                username = url.split('@')[1].split('/')[0]
-                # Faz uma requisição para obter o ID do canal
-                response = self.youtube.search().list(
-                    part='snippet',
-                    q=username,
-                    type='channel',
-                    maxResults=1
-                ).execute()
-                
-                if response['items']:
-                    return response['items'][0]['id']['channelId']
-                return None
-                
-            # Se a URL contém /channel/, extrai o ID diretamente
-            if '/channel/' in url:
-                return url.split('/channel/')[1].split('/')[0]
-                
-            # Se a URL contém /c/ ou /user/, precisamos fazer uma busca
-            if '/c/' in url or '/user/' in url:
-                username = url.split('/')[-1]
-                response = self.youtube.search().list(
-                    part='snippet',
-                    q=username,
-                    type='channel',
-                    maxResults=1
-                ).execute()
-                
-                if response['items']:
-                    return response['items'][0]['id']['channelId']
-                    
+            channel_id = self._search_channel_id(url)
+        except Exception as e:
+            logger.error(f"Erro ao extrair ID do canal: {str(e)}")
+            return None
+
+        self.channel_ids.set(url, channel_id)
+        self.channel_ids.save()
+        if context is not None:
+            context.channel_ids[url] = channel_id
+        return channel_id
+
+    def _search_channel_id(self, url):
+        """Busca o ID do canal de uma URL com @usuário, /c/ ou /user/"""
+        # Se a URL contém @, precisamos primeiro obter o ID do canal
+        if '@' in url:
+            username = url.split('@')[1].split('/')[0]
+            # Faz uma requisição para obter o ID do canal
+            response = self._list(
+                'search.list',
+                q=username,
+                type='channel',
+                maxResults=1
+            )
+            
+            if response.get('items'):
+                return response['items'][0]['id']['channelId']
             return None
             
-        except Exception as e:
-            print(f"Erro ao extrair ID do canal: {str(e)}")
-            return None 
\ No newline at end of file
+        # Se a URL contém /c/ ou /user/, precisamos fazer uma busca
+        if '/c/' in url or '/user/' in url:
+            username = url.split('/')[-1]
+            response = self._list(
+                'search.list',
+                q=username,
+                type='channel',
+                maxResults=1
+            )
+            
+            if response.get('items'):
+                return response['items'][0]['id']['channelId']
+                
+        return None
\ No newline at end of file
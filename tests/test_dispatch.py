@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+
+import discord
+
+from src.dispatch import DispatchQueue
+
+DISCORD_CHANNEL_ID = 1234
+
+class TransientError(OSError):
+    retry_after = 0.01
+
+class UnexpectedError(RuntimeError):
+    retry_after = 0.01
+
+class FakeChannel:
+    """Canal do Discord que registra as mensagens e falha nas tentativas indicadas"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.messages = []
+        self.blocked = None
+
+    async def send(self, embeds):
+        if self.blocked is not None:
+            await self.blocked.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+        self.messages.append([embed.title for embed in embeds])
+
+def embeds(*titles):
+    return [discord.Embed(title=title) for title in titles]
+
+class DispatchQueueTest(unittest.IsolatedAsyncioTestCase):
+    """Envio, novas tentativas e retomada da fila de notificações"""
+
+    def _queue(self, channel, max_retries=3):
+        queue = DispatchQueue(
+            lambda channel_id: channel, workers=2, global_rate=1000, channel_rate=1000, channel_burst=1000,
+            max_retries=max_retries
+        )
+        self.addAsyncCleanup(queue.stop)
+        return queue
+
+    async def _wait_idle(self, queue):
+        for _ in range(200):
+            if queue.idle():
+                return
+            await asyncio.sleep(0.01)
+        self.fail('A fila de envio não esvaziou')
+
+    async def test_embeds_are_grouped_in_messages_of_ten(self):
+        channel = FakeChannel()
+        queue = self._queue(channel)
+        queue.start()
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds(*(str(index) for index in range(12))))
+        await self._wait_idle(queue)
+        self.assertEqual(channel.messages, [[str(index) for index in range(10)], ['10', '11']])
+
+    async def test_failed_batch_is_retried_in_order(self):
+        channel = FakeChannel([TransientError('conexão perdida'), UnexpectedError('erro inesperado')])
+        queue = self._queue(channel)
+        queue.start()
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds('a', 'b'))
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds('c'))
+        await self._wait_idle(queue)
+        self.assertEqual(channel.messages, [['a', 'b', 'c']])
+        self.assertEqual(len(queue), 0)
+
+    async def test_batch_is_dropped_after_max_retries(self):
+        channel = FakeChannel([TransientError('conexão perdida')] * 3)
+        queue = self._queue(channel, max_retries=2)
+        queue.start()
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds('a'))
+        await self._wait_idle(queue)
+        self.assertEqual(channel.messages, [])
+
+        # O canal continua funcionando depois do descarte
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds('b'))
+        await self._wait_idle(queue)
+        self.assertEqual(channel.messages, [['b']])
+
+    async def test_stop_puts_the_batch_back(self):
+        channel = FakeChannel()
+        channel.blocked = asyncio.Event()
+        queue = self._queue(channel)
+        queue.start()
+        queue.enqueue(DISCORD_CHANNEL_ID, embeds('a', 'b'), detected_at=1000)
+        await asyncio.sleep(0.05)
+        await queue.stop()
+
+        state = queue.snapshot()
+        self.assertEqual(
+            [[embed['title'], detected_at] for embed, detected_at in state[str(DISCORD_CHANNEL_ID)]],
+            [['a', 1000], ['b', 1000]]
+        )
+
+        # Um novo processo retoma o que ficou pendente, com o horário original da detecção
+        channel.blocked = None
+        restored = self._queue(channel)
+        restored.restore(state)
+        self.assertEqual(restored.snapshot(), state)
+        restored.start()
+        await self._wait_idle(restored)
+        self.assertEqual(channel.messages, [['a', 'b']])
+
+    async def test_restore_accepts_snapshots_without_detection_time(self):
+        channel = FakeChannel()
+        queue = self._queue(channel)
+        queue.restore({str(DISCORD_CHANNEL_ID): [discord.Embed(title='a').to_dict()]})
+        self.assertEqual(len(queue), 1)
+        queue.start()
+        await self._wait_idle(queue)
+        self.assertEqual(channel.messages, [['a']])
+
+if __name__ == '__main__':
+    unittest.main()
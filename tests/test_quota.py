@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from src.quota import QuotaExceeded, QuotaScheduler
+from src.storage import SQLiteStorage
+
+class SharedQuotaTest(unittest.TestCase):
+    """A cota de uma chave é debitada de um único contador, mesmo com vários processos no mesmo banco"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'tubebot.db')
+        self.storages = []
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        self.directory.cleanup()
+
+    def _scheduler(self, budget=10, scope='chave'):
+        # Cada scheduler tem a sua própria conexão, como um processo separado
+        storage = SQLiteStorage(self.path)
+        self.storages.append(storage)
+        return QuotaScheduler(daily_budget=budget, storage=storage, scope=scope)
+
+    def _spend_all(self, scheduler):
+        spent = 0
+        try:
+            while True:
+                scheduler.acquire('videos.list')
+                spent += 1
+        except QuotaExceeded:
+            return spent
+
+    def test_two_storages_share_one_budget(self):
+        first, second = self._scheduler(), self._scheduler()
+        for _ in range(4):
+            first.acquire('videos.list')
+            second.acquire('videos.list')
+        self.assertEqual((first.used, second.used), (8, 8))
+        self.assertEqual(first.remaining, 2)
+
+        second.acquire('videos.list', units=2)
+        with self.assertRaises(QuotaExceeded):
+            first.acquire('videos.list')
+        self.assertEqual(first.used, 10)
+
+    def test_concurrent_debits_never_overspend(self):
+        schedulers = [self._scheduler(budget=200) for _ in range(4)]
+        spent = [0] * len(schedulers)
+
+        def spend(index):
+            spent[index] = self._spend_all(schedulers[index])
+
+        threads = [threading.Thread(target=spend, args=(index,)) for index in range(len(schedulers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        self.assertEqual(sum(spent), 200)
+        self.assertEqual(schedulers[0].used, 200)
+
+    def test_scopes_are_independent(self):
+        first, second = self._scheduler(scope='chave1'), self._scheduler(scope='chave2')
+        self.assertEqual(self._spend_all(first), 10)
+        self.assertEqual(second.remaining, 10)
+
+if __name__ == '__main__':
+    unittest.main()
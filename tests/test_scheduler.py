@@ -0,0 +1,79 @@
+import unittest
+
+from src.scheduler import PollScheduler
+
+DAY = 86400
+NOW = 1_700_000_000
+
+class LearnTest(unittest.TestCase):
+    """Intervalo de cada canal aprendido a partir das datas de publicação"""
+
+    def setUp(self):
+        self.scheduler = PollScheduler(min_interval=900, max_interval=DAY, default_interval=14400, jitter=0)
+
+    def test_active_channel_is_checked_often(self):
+        # Um vídeo a cada 8 horas, o último há 1 hora: cerca de 4 verificações por intervalo entre uploads
+        publish_times = [NOW - 3600 - 8 * 3600 * index for index in range(5)]
+        self.scheduler.learn('ativo', publish_times, now=NOW)
+        self.assertEqual(self.scheduler.interval('ativo'), 2 * 3600)
+
+    def test_interval_is_clamped(self):
+        self.scheduler.learn('rapido', [NOW - 60, NOW - 120, NOW - 180], now=NOW)
+        self.assertEqual(self.scheduler.interval('rapido'), 900)
+
+        self.scheduler.learn('parado', [NOW - 400 * DAY, NOW - 800 * DAY], now=NOW)
+        self.assertEqual(self.scheduler.interval('parado'), DAY)
+
+    def test_channels_without_history(self):
+        self.scheduler.learn('um_video', [NOW - DAY], now=NOW)
+        self.scheduler.learn('sem_videos', [], now=NOW)
+        self.assertEqual(self.scheduler.interval('um_video'), DAY)
+        self.assertEqual(self.scheduler.interval('sem_videos'), 14400)
+        self.assertEqual(self.scheduler.interval('desconhecido'), 14400)
+
+    def test_fixed_interval_keeps_the_learned_one(self):
+        self.scheduler.learn('rapido', [NOW - 60, NOW - 120, NOW - 180], now=NOW)
+        self.scheduler.fixed_interval = DAY
+        self.assertEqual(self.scheduler.interval('rapido'), DAY)
+        self.assertEqual(self.scheduler.learned_interval('rapido'), 900)
+        self.assertEqual(self.scheduler.checks_per_day(), 1)
+
+class RestoreTest(unittest.TestCase):
+    """Agenda retomada de um snapshot"""
+
+    def setUp(self):
+        self.scheduler = PollScheduler(min_interval=900, max_interval=DAY, default_interval=14400, jitter=0)
+
+    def test_snapshot_round_trip(self):
+        self.scheduler.sync(['a', 'b'], now=NOW)
+        self.scheduler.learn('a', [NOW - 60, NOW - 120, NOW - 180], now=NOW)
+        state = self.scheduler.snapshot()
+
+        restored = PollScheduler(min_interval=900, max_interval=DAY, default_interval=14400, jitter=0)
+        restored.restore(state, now=NOW)
+        self.assertEqual(restored.snapshot(), state)
+
+    def test_overdue_checks_are_spread_in_order(self):
+        state = {
+            'due': {'futuro': NOW + 800, 'atrasado': NOW - 7200, 'recente': NOW - 60, 'medio': NOW - 3600},
+            'intervals': {'futuro': 3600},
+        }
+        self.scheduler.restore(state, now=NOW)
+
+        self.assertEqual(self.scheduler.interval('futuro'), 3600)
+        self.assertEqual(self.scheduler.pop_due(now=NOW), ['atrasado'])
+        self.assertEqual(self.scheduler.pop_due(now=NOW + 300), ['medio'])
+        self.assertEqual(self.scheduler.pop_due(now=NOW + 600), ['recente'])
+        self.assertEqual(self.scheduler.pop_due(now=NOW + 800), ['futuro'])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_reschedule_replaces_the_previous_due_time(self):
+        self.scheduler.sync(['a'], now=NOW)
+        self.scheduler.pop_due(now=NOW + 900)
+        self.scheduler.reschedule('a', now=NOW, delay=60)
+        self.scheduler.reschedule('a', now=NOW, delay=600)
+        self.assertEqual(self.scheduler.pop_due(now=NOW + 300), [])
+        self.assertEqual(self.scheduler.pop_due(now=NOW + 600), ['a'])
+
+if __name__ == '__main__':
+    unittest.main()
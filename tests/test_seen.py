@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.records import ChannelRecord, UploadsPage, VideoRecord
+from src.seen import SeenSet
+from src.storage import SQLiteStorage
+
+CHANNEL_ID = 'UC' + '1' * 22
+CHANNEL_URL = f'https://www.youtube.com/channel/{CHANNEL_ID}'
+
+class SeenSetTest(unittest.TestCase):
+    """Conjunto de vídeos já enviados de um canal"""
+
+    def test_oldest_video_is_forgotten_at_the_limit(self):
+        seen = SeenSet(['v1', 'v2', 'v3'], maxlen=3)
+        seen.add('v2')
+        seen.add('v4')
+        self.assertEqual(len(seen), 3)
+        self.assertNotIn('v1', seen)
+        self.assertEqual(seen.to_value(), {'ids': ['v2', 'v3', 'v4'], 'watermark': None})
+
+    def test_from_value_accepts_old_cache_formats(self):
+        self.assertIn('v1', SeenSet.from_value('v1'))
+        self.assertIn('v2', SeenSet.from_value(['v1', 'v2']))
+
+        seen = SeenSet.from_value({'ids': ['v1'], 'watermark': '2024-01-01T00:00:00Z'})
+        self.assertIn('v1', seen)
+        self.assertEqual(seen.watermark, '2024-01-01T00:00:00Z')
+
+class DiffNewVideosTest(unittest.TestCase):
+    """Comparação da página de uploads com os vídeos já vistos e o watermark"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'tubebot.db'))
+        with mock.patch.dict(os.environ, {'YOUTUBE_API_KEY': 'teste', 'DETECTION_BACKEND': 'api'}):
+            from src.youtube_api import YouTubeAPI
+            self.youtube = YouTubeAPI(storage=self.storage)
+        self.cache_key = self.youtube._cache_key(CHANNEL_ID, True)
+
+    def tearDown(self):
+        self.youtube.close()
+        self.storage.close()
+        self.directory.cleanup()
+
+    def _poll(self, *videos, advance_watermark=True):
+        """Página de uploads (do mais novo para o mais antigo) comparada com os vídeos já vistos"""
+        items = [VideoRecord(video_id, video_id, published) for video_id, published in videos]
+        new_videos, first_check = self.youtube._diff_new_videos(
+            self.cache_key, items, True, advance_watermark=advance_watermark
+        )
+        return [video.video_id for video in new_videos], first_check
+
+    def _stored(self):
+        return self.storage.get('video_cache', self.cache_key)
+
+    def test_first_check_only_returns_the_newest_upload(self):
+        self.assertEqual(self._poll(
+            ('v2', '2024-01-02T00:00:00Z'), ('v1', '2024-01-01T00:00:00Z')
+        ), (['v2'], True))
+        self.assertEqual(self._stored(), {'ids': ['v2'], 'watermark': '2024-01-02T00:00:00Z'})
+
+    def test_new_uploads_are_returned_oldest_first(self):
+        self._poll(('v1', '2024-01-01T00:00:00Z'))
+        self.assertEqual(self._poll(
+            ('v3', '2024-01-03T00:00:00Z'), ('v2', '2024-01-02T00:00:00Z'), ('v1', '2024-01-01T00:00:00Z')
+        ), (['v2', 'v3'], False))
+        self.assertEqual(self._stored()['watermark'], '2024-01-03T00:00:00Z')
+
+        # Nada de novo na página seguinte
+        self.assertEqual(self._poll(('v3', '2024-01-03T00:00:00Z'), ('v2', '2024-01-02T00:00:00Z')), ([], False))
+
+    def test_uploads_older_than_the_watermark_are_ignored(self):
+        self._poll(('v2', '2024-01-02T00:00:00Z'))
+        # Um vídeo antigo que voltou a ficar público, fora do conjunto de vistos
+        self.assertEqual(self._poll(
+            ('v2', '2024-01-02T00:00:00Z'), ('antigo', '2023-06-01T00:00:00Z')
+        ), ([], False))
+
+    def test_migrated_entry_only_gets_a_watermark(self):
+        self.storage.set('video_cache', self.cache_key, 'v1')
+        self.youtube.reload_seen(CHANNEL_ID)
+        self.assertEqual(self._poll(
+            ('v2', '2024-01-02T00:00:00Z'), ('v1', '2024-01-01T00:00:00Z')
+        ), ([], False))
+        self.assertEqual(self._stored(), {'ids': ['v1'], 'watermark': '2024-01-02T00:00:00Z'})
+
+    def test_push_does_not_advance_the_watermark(self):
+        self._poll(('v1', '2024-01-01T00:00:00Z'))
+        self.assertEqual(self._poll(('v3', '2024-01-03T00:00:00Z'), advance_watermark=False), (['v3'], False))
+        self.assertEqual(self._stored()['watermark'], '2024-01-01T00:00:00Z')
+
+    def test_deferred_saves_are_written_together(self):
+        with self.youtube.deferred_saves():
+            self._poll(('v1', '2024-01-01T00:00:00Z'))
+            self.assertIsNone(self._stored())
+        self.assertEqual(self._stored(), {'ids': ['v1'], 'watermark': '2024-01-01T00:00:00Z'})
+
+class ChannelInfoTest(unittest.TestCase):
+    """A configuração de um canal (!start) só lê os vídeos já enviados"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'tubebot.db'))
+        with mock.patch.dict(os.environ, {'YOUTUBE_API_KEY': 'teste', 'DETECTION_BACKEND': 'api'}):
+            from src.youtube_api import YouTubeAPI
+            self.youtube = YouTubeAPI(storage=self.storage)
+        self.cache_key = self.youtube._cache_key(CHANNEL_ID, True)
+
+        channel = ChannelRecord(CHANNEL_ID, 'Canal', 'https://yt3.example/icone.jpg', 'UU' + CHANNEL_ID[2:])
+        page = UploadsPage([VideoRecord('v2', 'Vídeo 2', '2024-01-02T00:00:00Z')])
+        for name, value in (('_extract_channel_id', CHANNEL_ID), ('_fetch_channel', channel), ('_fetch_uploads', page)):
+            patcher = mock.patch.object(self.youtube, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.youtube.close()
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_unseen_channel_is_not_recorded(self):
+        info = self.youtube.get_channel_info(CHANNEL_URL, include_shorts=True)
+        self.assertEqual(info, {'channel_id': CHANNEL_ID, 'channel_name': 'Canal'})
+        self.assertIsNone(self.storage.get('video_cache', self.cache_key))
+
+    def test_seen_video_is_previewed_without_changing_the_cache(self):
+        stored = {'ids': ['v1', 'v2'], 'watermark': '2024-01-02T00:00:00Z'}
+        self.storage.set('video_cache', self.cache_key, stored)
+        info = self.youtube.get_channel_info(CHANNEL_URL, include_shorts=True)
+        self.assertEqual(info['video_id'], 'v2')
+        self.assertEqual(self.storage.get('video_cache', self.cache_key), stored)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from src.storage import SQLiteStorage
+
+class BatchTest(unittest.TestCase):
+    """Transações do batch() do SQLite: confirmadas no fim do bloco, desfeitas se ele falhar"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'tubebot.db')
+        self.storage = SQLiteStorage(self.path)
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_batch_commits_at_the_end(self):
+        with self.storage.batch():
+            self.storage.set('video_cache', 'a', 1)
+            self.storage.set('video_cache', 'b', 2)
+        other = SQLiteStorage(self.path)
+        self.addCleanup(other.close)
+        self.assertEqual(other.get_all('video_cache'), {'a': 1, 'b': 2})
+
+    def test_failed_batch_is_rolled_back(self):
+        self.storage.set('video_cache', 'a', 1)
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.set('video_cache', 'a', 2)
+                self.storage.set('video_cache', 'b', 2)
+                raise RuntimeError('falha no meio do bloco')
+        self.assertEqual(self.storage.get_all('video_cache'), {'a': 1})
+
+    def test_failure_in_nested_batch_rolls_back_the_outer_one(self):
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.set('video_cache', 'a', 1)
+                with self.storage.batch():
+                    raise RuntimeError('falha no bloco interno')
+        self.assertEqual(self.storage.get_all('video_cache'), {})
+
+        # O estado de falha não sobra para o próximo batch
+        with self.storage.batch():
+            self.storage.set('video_cache', 'b', 1)
+        self.assertEqual(self.storage.get_all('video_cache'), {'b': 1})
+
+    def test_other_threads_do_not_join_an_open_batch(self):
+        started = threading.Event()
+        written = threading.Event()
+        results = {}
+
+        def failing_batch():
+            try:
+                with self.storage.batch():
+                    self.storage.set('video_cache', 'a', 1)
+                    started.set()
+                    # A outra thread espera o banco liberar; o bloco falha logo em seguida
+                    written.wait(0.2)
+                    raise RuntimeError('falha no batch')
+            except RuntimeError:
+                pass
+
+        def writer():
+            started.wait()
+            results['cas'] = self.storage.compare_and_set('quota', 'dia', None, {'videos.list': 1})
+            with self.storage.batch():
+                self.storage.set('video_cache', 'b', 1)
+            written.set()
+
+        threads = [threading.Thread(target=failing_batch), threading.Thread(target=writer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertTrue(results['cas'])
+        self.assertEqual(self.storage.get('quota', 'dia'), {'videos.list': 1})
+        self.assertEqual(self.storage.get_all('video_cache'), {'b': 1})
+
+    def test_compare_and_set(self):
+        self.assertTrue(self.storage.compare_and_set('quota', 'dia', None, {'videos.list': 1}))
+        self.assertFalse(self.storage.compare_and_set('quota', 'dia', None, {'videos.list': 5}))
+        self.assertFalse(self.storage.compare_and_set('quota', 'dia', {'videos.list': 2}, {'videos.list': 3}))
+        self.assertTrue(self.storage.compare_and_set('quota', 'dia', {'videos.list': 1}, {'videos.list': 2}))
+        self.assertEqual(self.storage.get('quota', 'dia'), {'videos.list': 2})
+
+if __name__ == '__main__':
+    unittest.main()
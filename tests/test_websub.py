@@ -0,0 +1,155 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from aiohttp import ClientSession
+
+from src.records import ChannelRecord, VideoRecord
+from src.storage import SQLiteStorage
+from src.websub import PushedVideo, WebSubServer, parse_notification, topic_for
+
+from .websub_hub import LocalHub, atom_notification
+
+CHANNEL_ID = 'UC' + '1' * 22
+OTHER_CHANNEL_ID = 'UC' + '2' * 22
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class WebSubFlowTest(unittest.IsolatedAsyncioTestCase):
+    """Inscrição, verificação e notificação do modo push contra o hub local"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'tubebot.db'))
+        self.hub = LocalHub()
+        await self.hub.start()
+
+        port = free_port()
+        self.callback_url = f'http://127.0.0.1:{port}/websub'
+        self.received = asyncio.Queue()
+        self.server = WebSubServer(
+            self.received.put, storage=self.storage, callback_url=self.callback_url, hub_url=self.hub.url,
+            host='127.0.0.1', port=port, secret='segredo', lease_seconds=3600
+        )
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        await self.hub.stop()
+        self.storage.close()
+        self.directory.cleanup()
+
+    async def _verification(self):
+        return await asyncio.wait_for(self.hub.verifications.get(), timeout=5)
+
+    async def test_subscribe_verify_and_notify(self):
+        await self.server.sync([CHANNEL_ID])
+        self.assertEqual(await self._verification(), ('subscribe', topic_for(CHANNEL_ID), True))
+        self.assertIn(CHANNEL_ID, self.storage.get_all('websub'))
+
+        statuses = await self.hub.publish(CHANNEL_ID, atom_notification('vid00000001', CHANNEL_ID, 'Novo vídeo'))
+        self.assertEqual(statuses, [202])
+        video = await asyncio.wait_for(self.received.get(), timeout=5)
+        self.assertEqual((video.video_id, video.channel_id, video.title), ('vid00000001', CHANNEL_ID, 'Novo vídeo'))
+
+    async def test_unsubscribe_removed_channel(self):
+        await self.server.sync([CHANNEL_ID])
+        await self._verification()
+
+        await self.server.sync([])
+        self.assertEqual(await self._verification(), ('unsubscribe', topic_for(CHANNEL_ID), True))
+        self.assertNotIn(CHANNEL_ID, self.storage.get_all('websub'))
+        self.assertEqual(self.hub.subscriptions, {})
+
+    async def test_verification_for_unknown_channel_is_refused(self):
+        await self.server.sync([CHANNEL_ID])
+        await self._verification()
+
+        async with ClientSession() as session:
+            params = {'hub.mode': 'subscribe', 'hub.topic': topic_for(OTHER_CHANNEL_ID), 'hub.challenge': 'x'}
+            async with session.get(self.callback_url, params=params) as response:
+                self.assertEqual(response.status, 404)
+
+    async def test_invalid_lease_seconds_is_rejected(self):
+        await self.server.sync([CHANNEL_ID])
+        await self._verification()
+
+        async with ClientSession() as session:
+            params = {
+                'hub.mode': 'subscribe', 'hub.topic': topic_for(CHANNEL_ID),
+                'hub.challenge': 'x', 'hub.lease_seconds': 'muito',
+            }
+            async with session.get(self.callback_url, params=params) as response:
+                self.assertEqual(response.status, 400)
+
+    async def test_invalid_signature_is_ignored(self):
+        await self.server.sync([CHANNEL_ID])
+        await self._verification()
+
+        body = atom_notification('vid00000002', CHANNEL_ID)
+        self.assertEqual(await self.hub.publish(CHANNEL_ID, body, signature='sha1=invalida'), [202])
+        await asyncio.sleep(0.1)
+        self.assertTrue(self.received.empty())
+
+    async def test_entry_without_published_is_skipped(self):
+        await self.server.sync([CHANNEL_ID])
+        await self._verification()
+
+        statuses = await self.hub.publish(CHANNEL_ID, atom_notification('vid00000003', CHANNEL_ID, published=False))
+        self.assertEqual(statuses, [202])
+        await asyncio.sleep(0.1)
+        self.assertTrue(self.received.empty())
+
+class ParseNotificationTest(unittest.TestCase):
+    def test_published_is_normalized_to_utc(self):
+        body = atom_notification('vid00000004', CHANNEL_ID, published='2024-01-31T09:00:00-03:00')
+        self.assertEqual(parse_notification(body)[0].published, '2024-01-31T12:00:00Z')
+
+    def test_entry_without_published_is_skipped(self):
+        self.assertEqual(parse_notification(atom_notification('vid00000005', CHANNEL_ID, published=False)), [])
+
+class ReconcileTest(unittest.TestCase):
+    """A reconciliação pela playlist encontra os uploads cujo push se perdeu"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'tubebot.db'))
+        with mock.patch.dict(os.environ, {'YOUTUBE_API_KEY': 'teste', 'DETECTION_BACKEND': 'api'}):
+            from src.youtube_api import YouTubeAPI
+            self.youtube = YouTubeAPI(storage=self.storage)
+        self.cache_key = self.youtube._cache_key(CHANNEL_ID, True)
+        channel = ChannelRecord(CHANNEL_ID, 'Canal', 'https://yt3.example/icone.jpg', 'UU' + CHANNEL_ID[2:])
+        self.youtube.channel_metadata.set(CHANNEL_ID, channel.to_value())
+
+    def tearDown(self):
+        self.youtube.close()
+        self.storage.close()
+        self.directory.cleanup()
+
+    def _poll(self, *videos):
+        """Página de uploads (do mais novo para o mais antigo) comparada com os vídeos já vistos"""
+        items = [VideoRecord(video_id, video_id, published) for video_id, published in videos]
+        new_videos, _ = self.youtube._diff_new_videos(self.cache_key, items, True)
+        return [video.video_id for video in new_videos]
+
+    def _push(self, video_id, published):
+        video = PushedVideo(video_id, CHANNEL_ID, video_id, published, f'https://www.youtube.com/watch?v={video_id}')
+        results = self.youtube.get_pushed_video(video, include_shorts_options=(True,))
+        return [item['video_id'] for item in results.get(True, [])]
+
+    def test_missed_push_is_recovered_by_reconcile(self):
+        self._poll(('v1', '2024-01-01T00:00:00Z'))
+        # O push de v2 se perdeu; o de v3, publicado depois, chegou
+        self.assertEqual(self._push('v3', '2024-01-03T00:00:00Z'), ['v3'])
+        self.assertEqual(self._poll(
+            ('v3', '2024-01-03T00:00:00Z'), ('v2', '2024-01-02T00:00:00Z'), ('v1', '2024-01-01T00:00:00Z')
+        ), ['v2'])
+
+if __name__ == '__main__':
+    unittest.main()
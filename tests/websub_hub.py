@@ -0,0 +1,106 @@
+"""
+Hub WebSub (PubSubHubbub) local, usado nos testes do modo push.
+
+Faz o papel do hub do YouTube sem acessar a internet: aceita pedidos de
+inscrição e cancelamento, verifica a intenção chamando o callback com um
+desafio (hub.challenge) e entrega notificações Atom assinadas com o segredo
+da inscrição, como o pubsubhubbub.appspot.com.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timezone
+
+from aiohttp import ClientSession, web
+
+from src.websub import topic_for
+
+def atom_notification(video_id, channel_id, title='Vídeo', published=None):
+    """Notificação Atom no formato enviado pelo YouTube; published=False omite a data"""
+    if published is None:
+        published = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    published_element = f"<published>{published}</published>" if published else ''
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+        f'<entry><id>yt:video:{video_id}</id>'
+        f'<yt:videoId>{video_id}</yt:videoId><yt:channelId>{channel_id}</yt:channelId>'
+        f'<title>{title}</title>'
+        f'<link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>'
+        f'{published_element}</entry></feed>'
+    ).encode('utf-8')
+
+class LocalHub:
+    """Hub WebSub mínimo, em 127.0.0.1 e numa porta livre"""
+
+    def __init__(self):
+        self.subscriptions = {}  # (callback, tópico) -> segredo
+        self.verifications = asyncio.Queue()  # (modo, tópico, verificado) de cada verificação feita
+        self.url = None
+        self._runner = None
+        self._session = None
+        self._tasks = set()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/subscribe', self._handle_request)
+        self._session = ClientSession()
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', 0).start()
+        port = self._runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}/subscribe'
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+        if self._session:
+            await self._session.close()
+
+    async def _handle_request(self, request):
+        """Aceita o pedido e verifica a intenção depois de responder, como no modo hub.verify=async"""
+        form = await request.post()
+        mode = form.get('hub.mode')
+        if mode not in ('subscribe', 'unsubscribe') or not form.get('hub.callback') or not form.get('hub.topic'):
+            return web.Response(status=400)
+
+        task = asyncio.ensure_future(self._verify(
+            mode, form['hub.callback'], form['hub.topic'], form.get('hub.secret', ''), form.get('hub.lease_seconds')
+        ))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202)
+
+    async def _verify(self, mode, callback, topic, secret, lease_seconds):
+        challenge = secrets.token_hex(8)
+        params = {'hub.mode': mode, 'hub.topic': topic, 'hub.challenge': challenge}
+        if mode == 'subscribe' and lease_seconds:
+            params['hub.lease_seconds'] = lease_seconds
+        async with self._session.get(callback, params=params) as response:
+            verified = response.status == 200 and await response.text() == challenge
+
+        if verified and mode == 'subscribe':
+            self.subscriptions[(callback, topic)] = secret
+        elif verified:
+            self.subscriptions.pop((callback, topic), None)
+        await self.verifications.put((mode, topic, verified))
+
+    async def publish(self, channel_id, body, signature=None):
+        """Entrega a notificação a todos os inscritos do canal; retorna os status HTTP das entregas"""
+        topic = topic_for(channel_id)
+        statuses = []
+        for (callback, subscribed_topic), secret in list(self.subscriptions.items()):
+            if subscribed_topic != topic:
+                continue
+            headers = {'Content-Type': 'application/atom+xml'}
+            if signature is not None:
+                headers['X-Hub-Signature'] = signature
+            elif secret:
+                headers['X-Hub-Signature'] = 'sha1=' + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+            async with self._session.post(callback, data=body, headers=headers) as response:
+                statuses.append(response.status)
+        return statuses